@@ -2,10 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from django.db import IntegrityError, transaction
-from django.db.models import F, QuerySet, Sum
-from django.db.models.functions import Coalesce
-from tqdm import tqdm
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q, QuerySet
 
 # Import only the asset paths models
 from dandiapi.api.models.asset_paths import AssetPath, AssetPathRelation
@@ -208,47 +206,291 @@ def _delete_asset_paths(asset: Asset, version: Version):
     AssetPath.objects.filter(aggregate_files=0).delete()
 
 
+def _refresh_dandiset_listing(dandiset_id: int):
+    # The size of a dandiset in its listing is the size of its latest version's root paths
+    from dandiapi.api.dandiset_listing import refresh_dandiset_listings
+
+    refresh_dandiset_listings([dandiset_id])
+
+
 @transaction.atomic
 def add_asset_paths(asset: Asset, version: Version):
     _add_asset_paths(asset, version)
+    _refresh_dandiset_listing(version.dandiset_id)
 
 
 @transaction.atomic
 def delete_asset_paths(asset: Asset, version: Version):
     _delete_asset_paths(asset, version)
+    _refresh_dandiset_listing(version.dandiset_id)
 
 
 @transaction.atomic
 def update_asset_paths(old_asset: Asset, new_asset: Asset, version: Version):
     _delete_asset_paths(old_asset, version)
     _add_asset_paths(new_asset, version)
+    _refresh_dandiset_listing(version.dandiset_id)
+
+
+# The following statements build the path tree of many assets in bulk, operating on every asset
+# at once, so that the number of queries is constant regardless of the number of assets. The
+# `asset_ids` placeholder is a subquery selecting the IDs of the assets to add.
+_INSERT_LEAF_PATHS_SQL = """
+INSERT INTO {asset_path} (path, asset_id, version_id, aggregate_files, aggregate_size)
+SELECT asset.path, asset.id, %(version_id)s, 0, 0
+FROM {asset} asset
+WHERE asset.id IN ({asset_ids})
+{on_conflict}
+"""
+
+# Every proper prefix of a leaf path is a folder
+_INSERT_FOLDER_PATHS_SQL = """
+INSERT INTO {asset_path} (path, asset_id, version_id, aggregate_files, aggregate_size)
+SELECT folder.path, NULL, %(version_id)s, 0, 0
+FROM (
+    SELECT DISTINCT array_to_string(leaf.parts[1:n], '/') AS path
+    FROM (
+        SELECT string_to_array(path, '/') AS parts
+        FROM {asset_path}
+        WHERE version_id = %(version_id)s AND asset_id IN ({asset_ids})
+    ) leaf
+    CROSS JOIN LATERAL generate_series(1, cardinality(leaf.parts) - 1) AS n
+) folder
+ON CONFLICT DO NOTHING
+"""
+
+# Link every leaf and folder of the added assets to itself and each of its ancestors, with the
+# depth being the difference in the number of path segments
+_INSERT_PATH_RELATIONS_SQL = """
+INSERT INTO {asset_path_relation} (parent_id, child_id, depth)
+SELECT parent.id, child.id, cardinality(node.parts) - n
+FROM (
+    SELECT DISTINCT leaf.parts[1:m] AS parts
+    FROM (
+        SELECT string_to_array(path, '/') AS parts
+        FROM {asset_path}
+        WHERE version_id = %(version_id)s AND asset_id IN ({asset_ids})
+    ) leaf
+    CROSS JOIN LATERAL generate_series(1, cardinality(leaf.parts)) AS m
+) node
+CROSS JOIN LATERAL generate_series(1, cardinality(node.parts)) AS n
+JOIN {asset_path} child
+    ON child.version_id = %(version_id)s AND child.path = array_to_string(node.parts, '/')
+JOIN {asset_path} parent
+    ON parent.version_id = %(version_id)s AND parent.path = array_to_string(node.parts[1:n], '/')
+ON CONFLICT DO NOTHING
+"""
+
+# The file count and size contributed by the given leaves to each of their ancestors (and
+# themselves), substituted for the `aggregates` placeholder below. The `leaf_size` placeholder is
+# either the current size of the asset, or the size previously recorded on the leaf.
+_PATH_AGGREGATES_SQL = """
+SELECT relation.parent_id, COUNT(*) AS files, COALESCE(SUM({leaf_size}), 0) AS size
+FROM {asset_path_relation} relation
+JOIN {asset_path} leaf ON leaf.id = relation.child_id
+JOIN {asset} asset ON asset.id = leaf.asset_id
+LEFT JOIN {asset_blob} blob ON blob.id = asset.blob_id
+LEFT JOIN {zarr_archive} zarr ON zarr.id = asset.zarr_id
+WHERE leaf.version_id = %(version_id)s AND leaf.asset_id IN ({asset_ids})
+GROUP BY relation.parent_id
+"""
+
+# Compute the file count and size of every path from all of the leaves beneath it. Rows which
+# already hold the correct values are skipped, to avoid needlessly rewriting them.
+_SET_PATH_AGGREGATES_SQL = """
+UPDATE {asset_path} path
+SET aggregate_files = aggregate.files, aggregate_size = aggregate.size
+FROM ({aggregates}) aggregate
+WHERE path.id = aggregate.parent_id
+    AND (path.aggregate_files, path.aggregate_size)
+        IS DISTINCT FROM (aggregate.files, aggregate.size)
+"""
+
+# Add or subtract the file count and size of the given leaves to/from each of their ancestors
+_ADJUST_PATH_AGGREGATES_SQL = """
+UPDATE {asset_path} path
+SET
+    aggregate_files = path.aggregate_files {sign} aggregate.files,
+    aggregate_size = path.aggregate_size {sign} aggregate.size
+FROM ({aggregates}) aggregate
+WHERE path.id = aggregate.parent_id
+"""
+
+
+# Subqueries selecting the assets to add, for the `asset_ids` placeholder above
+_VERSION_ASSET_IDS_SQL = 'SELECT asset_id FROM {version_asset} WHERE version_id = %(version_id)s'
+_ASSET_IDS_SQL = 'SELECT unnest(%(asset_ids)s::bigint[])'
+
+
+def _asset_path_tables() -> dict[str, str]:
+    from dandiapi.api.models import Asset, AssetBlob
+    from dandiapi.zarr.models import ZarrArchive
+
+    return {
+        'asset': Asset._meta.db_table,
+        'asset_blob': AssetBlob._meta.db_table,
+        'asset_path': AssetPath._meta.db_table,
+        'asset_path_relation': AssetPathRelation._meta.db_table,
+        'version_asset': Asset.versions.through._meta.db_table,
+        'zarr_archive': ZarrArchive._meta.db_table,
+    }
+
+
+def _asset_path_sql_format(**placeholders: str) -> dict[str, str]:
+    """Return the values used to format the above statements, given any extra placeholders."""
+    sql_format = {**_asset_path_tables(), **placeholders}
+    sql_format['aggregates'] = _PATH_AGGREGATES_SQL.format(**sql_format)
+    return sql_format
 
 
 @transaction.atomic
 def add_version_asset_paths(version: Version):
-    """Add every asset from a version."""
-    # Leaves
-    for asset in tqdm(version.assets.all()):
-        insert_asset_paths(asset, version)
-
-    # Compute aggregate file size + count for each asset path, instead of when each asset
-    # is added. This is done because updating the same row many times within a transaction is slow.
-    # https://stackoverflow.com/a/60221875
-
-    # Get all nodes which haven't been computed yet
-    nodes = AssetPath.objects.filter(version=version, aggregate_files=0)
-    for node in tqdm(nodes):
-        child_link_ids = node.child_links.distinct('child_id').values_list('child_id', flat=True)
-        child_leaves = AssetPath.objects.filter(id__in=child_link_ids, asset__isnull=False)
-
-        # Get all aggregates
-        sizes = child_leaves.aggregate(
-            size=Coalesce(Sum('asset__blob__size'), 0), zsize=Coalesce(Sum('asset__zarr__size'), 0)
+    """
+    Add every asset from a version.
+
+    Rather than inserting each asset individually, the leaves, folders, relations and aggregate
+    fields are each computed for the whole version with a single statement.
+    """
+    tables = _asset_path_tables()
+    sql_format = _asset_path_sql_format(
+        asset_ids=_VERSION_ASSET_IDS_SQL.format(**tables),
+        on_conflict='ON CONFLICT DO NOTHING',
+        leaf_size='COALESCE(blob.size, zarr.size)',
+    )
+    params = {'version_id': version.id}
+    with connection.cursor() as cursor:
+        for statement in (
+            _INSERT_LEAF_PATHS_SQL,
+            _INSERT_FOLDER_PATHS_SQL,
+            _INSERT_PATH_RELATIONS_SQL,
+            _SET_PATH_AGGREGATES_SQL,
+        ):
+            cursor.execute(statement.format(**sql_format), params)
+
+    _refresh_dandiset_listing(version.dandiset_id)
+
+
+@transaction.atomic
+def add_asset_paths_many(assets: list[Asset], version: Version):
+    """
+    Add the paths of many assets, which must not yet have any paths in this version.
+
+    This is the bulk equivalent of `add_asset_paths`, and performs a constant number of queries.
+    """
+    if not assets:
+        return
+
+    sql_format = _asset_path_sql_format(
+        asset_ids=_ASSET_IDS_SQL,
+        on_conflict='',
+        leaf_size='COALESCE(blob.size, zarr.size)',
+        sign='+',
+    )
+    params = {'version_id': version.id, 'asset_ids': [asset.id for asset in assets]}
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(_INSERT_LEAF_PATHS_SQL.format(**sql_format), params)
+        except IntegrityError as e:
+            from dandiapi.api.services.asset.exceptions import AssetAlreadyExistsError
+
+            if 'unique-version-path' in str(e):
+                raise AssetAlreadyExistsError from e
+            raise
+
+        for statement in (
+            _INSERT_FOLDER_PATHS_SQL,
+            _INSERT_PATH_RELATIONS_SQL,
+            _ADJUST_PATH_AGGREGATES_SQL,
+        ):
+            cursor.execute(statement.format(**sql_format), params)
+
+    _refresh_dandiset_listing(version.dandiset_id)
+
+
+@transaction.atomic
+def delete_asset_paths_many(assets: list[Asset], version: Version):
+    """
+    Remove the paths of many assets from a version.
+
+    This is the bulk equivalent of `delete_asset_paths`, and performs a constant number of queries.
+    """
+    if not assets:
+        return
+
+    # Use the previously computed size of each leaf node, not the current asset size,
+    # in case the size of the AssetBlob/ZarrArchive that it points to has changed
+    sql_format = _asset_path_sql_format(
+        asset_ids=_ASSET_IDS_SQL, leaf_size='leaf.aggregate_size', sign='-'
+    )
+    params = {'version_id': version.id, 'asset_ids': [asset.id for asset in assets]}
+    with connection.cursor() as cursor:
+        cursor.execute(_ADJUST_PATH_AGGREGATES_SQL.format(**sql_format), params)
+
+    # Delete the leaf nodes and any other paths with no contained files
+    AssetPath.objects.filter(version=version, aggregate_files=0).delete()
+    _refresh_dandiset_listing(version.dandiset_id)
+
+
+def get_related_leaf_paths(paths: list[str], version: Version) -> dict[str, int]:
+    """
+    Return every leaf path which could conflict with any of the given paths.
+
+    These are the leaves located at any of the given paths or their ancestors, as well as the
+    leaves nested beneath any of the given paths. The result maps each path to its asset ID.
+    """
+    ancestor_paths = {ancestor for path in paths for ancestor in extract_paths(path)}
+    leaves = AssetPath.objects.filter(version=version, asset__isnull=False).filter(
+        Q(path__in=ancestor_paths)
+        | Q(
+            parent_links__parent__version=version,
+            parent_links__parent__asset__isnull=True,
+            parent_links__parent__path__in=paths,
         )
+    )
+    return dict(leaves.values_list('path', 'asset_id').distinct())
+
+
+# Copy every path of one version to another, remapping the IDs of the copied relations through
+# the (path -> new ID) mapping returned by the path insertion.
+_COPY_VERSION_ASSET_PATHS_SQL = """
+WITH copied_path AS (
+    INSERT INTO {asset_path} (path, asset_id, version_id, aggregate_files, aggregate_size)
+    SELECT path, asset_id, %(target_version_id)s, aggregate_files, aggregate_size
+    FROM {asset_path}
+    WHERE version_id = %(source_version_id)s
+    RETURNING id, path
+), id_mapping AS (
+    SELECT source_path.id AS source_id, copied_path.id AS target_id
+    FROM {asset_path} source_path
+    JOIN copied_path ON copied_path.path = source_path.path
+    WHERE source_path.version_id = %(source_version_id)s
+)
+INSERT INTO {asset_path_relation} (parent_id, child_id, depth)
+SELECT parent_mapping.target_id, child_mapping.target_id, relation.depth
+FROM {asset_path_relation} relation
+JOIN id_mapping parent_mapping ON parent_mapping.source_id = relation.parent_id
+JOIN id_mapping child_mapping ON child_mapping.source_id = relation.child_id
+"""
+
+
+@transaction.atomic
+def copy_version_asset_paths(source: Version, target: Version):
+    """
+    Copy the entire path tree of one version to another, which must not have any paths yet.
+
+    This is only correct if both versions contain exactly the same assets, such as when a
+    version is published from a draft, in which case it is much cheaper than rebuilding the
+    tree with `add_version_asset_paths`.
+    """
+    tables = {
+        'asset_path': AssetPath._meta.db_table,
+        'asset_path_relation': AssetPathRelation._meta.db_table,
+    }
+    params = {'source_version_id': source.id, 'target_version_id': target.id}
+    with connection.cursor() as cursor:
+        cursor.execute(_COPY_VERSION_ASSET_PATHS_SQL.format(**tables), params)
 
-        node.aggregate_files += child_leaves.count()
-        node.aggregate_size += sizes['size'] + sizes['zsize']
-        node.save()
+    _refresh_dandiset_listing(target.dandiset_id)
 
 
 @transaction.atomic
@@ -259,6 +501,8 @@ def add_zarr_paths(zarr: ZarrArchive):
         for version in asset.versions.filter(version='draft').iterator():
             _add_asset_paths(asset, version)
 
+    _refresh_dandiset_listing(zarr.dandiset_id)
+
 
 @transaction.atomic
 def delete_zarr_paths(zarr: ZarrArchive):
@@ -267,3 +511,5 @@ def delete_zarr_paths(zarr: ZarrArchive):
     for asset in zarr.assets.filter(published=False).iterator():
         for version in asset.versions.filter(version='draft').iterator():
             _delete_asset_paths(asset, version)
+
+    _refresh_dandiset_listing(zarr.dandiset_id)
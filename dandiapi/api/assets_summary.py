@@ -0,0 +1,366 @@
+"""
+Incrementally maintained assetsSummary of draft versions.
+
+Rather than rescanning every asset of a version, the summary is stored as running totals, along
+with a reference count for every distinct value of its list fields. The contribution of an asset
+is added when it becomes VALID, and removed when it leaves the version or stops being VALID.
+
+The totals of a version are rebuilt from scratch whenever they are missing, so any change that
+isn't tracked incrementally only needs to delete them with `invalidate_assets_summaries`. In case a
+change is missed anyway, `reconcile_assets_summary` periodically checks the totals against a full
+rescan, and rebuilds them if they differ.
+
+Every function which modifies the totals of a version must hold a lock on its row, which the
+callers already take when marking the version as modified.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+import json
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from dandischema.consts import ALLOWED_INPUT_SCHEMAS
+from dandischema.models import (
+    AssetsSummary,
+    bids_standard,
+    nwb_standard,
+    ome_ngff_standard,
+)
+from dandischema.utils import sanitize_value
+from django.db import connection, transaction
+from django.db.models import F
+
+from dandiapi.api.asset_metadata import AssetMetadataAssembler
+from dandiapi.api.models.asset import Asset
+from dandiapi.api.models.assets_summary import VersionAssetsSummary, VersionAssetsSummaryValue
+from dandiapi.api.models.version import Version
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from django.db.models import QuerySet
+
+logger = logging.getLogger(__name__)
+
+# The fields of the stats collected by dandischema which hold lists of distinct values
+_LIST_FIELDS = [
+    'approach',
+    'measurementTechnique',
+    'variableMeasured',
+    'species',
+    'subjects',
+    'cell',
+    'slice',
+    'tissuesample',
+    'dataStandard',
+]
+
+# The list fields which are only reported as the number of distinct values
+_COUNTED_FIELDS = {'subjects', 'cell', 'slice', 'tissuesample'}
+
+# Merge the changes of values which are equal as JSON, but were encoded differently
+_VALUE_CHANGES_SQL = """
+SELECT change.field, change.value::jsonb AS value, sum(change.delta) AS delta
+FROM unnest(%(fields)s::text[], %(values)s::text[], %(deltas)s::integer[])
+    AS change(field, value, delta)
+GROUP BY change.field, change.value::jsonb
+"""
+
+_ADD_VALUES_SQL = """
+INSERT INTO {values_table} (summary_id, field, value, count)
+SELECT %(summary_id)s, change.field, change.value, change.delta FROM ({changes}) AS change
+ON CONFLICT (summary_id, field, value)
+    DO UPDATE SET count = {values_table}.count + EXCLUDED.count
+"""
+
+# Values being removed must already be counted, so they can be updated in place
+_REMOVE_VALUES_SQL = """
+UPDATE {values_table} AS summary_value
+SET count = summary_value.count - change.delta
+FROM ({changes}) AS change
+WHERE summary_value.summary_id = %(summary_id)s
+    AND summary_value.field = change.field
+    AND summary_value.value = change.value
+"""
+
+
+def _add_stat(stats: dict[str, Any], field: str, value: Any) -> None:
+    if value not in stats[field]:
+        stats[field].append(value)
+
+
+def _add_samples(sample: dict, stats: dict[str, Any]) -> None:
+    while True:
+        if 'sampleType' in sample:
+            _add_stat(stats, sample['sampleType']['name'], sanitize_value(sample['identifier']))
+        sample = next(
+            (
+                entity
+                for entity in sample.get('wasDerivedFrom') or []
+                if entity.get('schemaKey') == 'BioSample'
+            ),
+            None,
+        )
+        if sample is None:
+            return
+
+
+def _add_path_stats(metadata: dict[str, Any], stats: dict[str, Any]) -> None:
+    path = Path(metadata['path'])
+    for part in path.name.split('.')[0].split('_'):
+        if part.startswith('sub-'):
+            _add_stat(stats, 'subjects', part.replace('sub-', ''))
+        if part.startswith('sample-'):
+            _add_stat(stats, 'tissuesample', part.replace('sample-', ''))
+
+    if 'nwb' in metadata['encodingFormat']:
+        _add_stat(stats, 'dataStandard', nwb_standard)
+    if path.name == 'dataset_description.json':
+        _add_stat(stats, 'dataStandard', bids_standard)
+    if path.suffixes == ['.ome', '.zarr']:
+        _add_stat(stats, 'dataStandard', ome_ngff_standard)
+
+
+def _check_schema_version(metadata: dict[str, Any]) -> None:
+    schema_version = metadata.get('schemaVersion')
+    if schema_version is None:
+        raise ValueError('Provided metadata has no schema version')
+    if schema_version not in ALLOWED_INPUT_SCHEMAS:
+        raise ValueError(
+            f'Metadata version {schema_version} is not allowed. '
+            f'Allowed are: {", ".join(ALLOWED_INPUT_SCHEMAS)}.'
+        )
+
+
+def _asset_stats(metadata: dict[str, Any]) -> dict[str, Any]:
+    """
+    Collect the stats of a single asset, which its version's assetsSummary is aggregated from.
+
+    This follows `dandischema.metadata.aggregate_assets_summary`, which only exposes the stats
+    of all of the assets together, without the values that the summary is counted from.
+    """
+    _check_schema_version(metadata)
+    stats: dict[str, Any] = {
+        'numberOfBytes': metadata['contentSize'],
+        'numberOfFiles': 1,
+        **{field: [] for field in _LIST_FIELDS},
+    }
+    for field in ['approach', 'measurementTechnique', 'variableMeasured']:
+        for value in metadata.get(field) or []:
+            _add_stat(stats, field, value['value'] if field == 'variableMeasured' else value)
+
+    for participant in metadata.get('wasAttributedTo', []):
+        if participant.get('schemaKey') == 'Participant':
+            if 'species' in participant:
+                _add_stat(stats, 'species', participant['species'])
+            if participant.get('identifier'):
+                _add_stat(stats, 'subjects', sanitize_value(participant['identifier']))
+
+    for sample in metadata.get('wasDerivedFrom') or []:
+        if sample.get('schemaKey') == 'BioSample':
+            _add_samples(sample, stats)
+            break
+
+    _add_path_stats(metadata, stats)
+    return stats
+
+
+class _Contribution:
+    """The part of the assetsSummary of a version which is contributed by some of its assets."""
+
+    def __init__(self) -> None:
+        self.number_of_bytes = 0
+        self.number_of_files = 0
+        self._assembler = AssetMetadataAssembler()
+
+        # Keyed by field and JSON encoded value, so that unhashable values can be counted
+        self.values: Counter[tuple[str, str]] = Counter()
+
+    def add(self, asset: Asset) -> None:
+        stats = _asset_stats(self._assembler.full_metadata(asset))
+
+        self.number_of_bytes += stats['numberOfBytes']
+        self.number_of_files += stats['numberOfFiles']
+        for field in _LIST_FIELDS:
+            self.values.update((field, json.dumps(value, sort_keys=True)) for value in stats[field])
+
+    @classmethod
+    def of(cls, assets: Iterable[Asset]) -> _Contribution:
+        contribution = cls()
+        for asset in assets:
+            contribution.add(asset)
+        return contribution
+
+
+def _valid_assets(assets: QuerySet[Asset]) -> QuerySet[Asset]:
+    # Select everything needed to compute the full metadata of the assets
+    return assets.filter(status=Asset.Status.VALID).select_related('blob', 'zarr', 'zarr__dandiset')
+
+
+def _apply_contribution(version: Version, contribution: _Contribution, sign: int) -> None:
+    if not contribution.number_of_files:
+        return
+
+    # If the totals don't exist, they will be rebuilt with this change included
+    updated = VersionAssetsSummary.objects.filter(version=version).update(
+        number_of_bytes=F('number_of_bytes') + sign * contribution.number_of_bytes,
+        number_of_files=F('number_of_files') + sign * contribution.number_of_files,
+    )
+    if not updated or not contribution.values:
+        return
+
+    changes = list(contribution.values.items())
+    sql = _ADD_VALUES_SQL if sign > 0 else _REMOVE_VALUES_SQL
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.format(
+                values_table=VersionAssetsSummaryValue._meta.db_table,
+                changes=_VALUE_CHANGES_SQL,
+            ),
+            {
+                'summary_id': version.id,
+                'fields': [field for (field, _), _ in changes],
+                'values': [value for (_, value), _ in changes],
+                'deltas': [count for _, count in changes],
+            },
+        )
+    if sign < 0:
+        VersionAssetsSummaryValue.objects.filter(summary_id=version.id, count=0).delete()
+
+
+def remove_assets_from_summary(asset_ids: Iterable[int], version: Version) -> None:
+    """Remove the assets which are counted in the assetsSummary of a version from it."""
+    assets = _valid_assets(Asset.objects.filter(id__in=asset_ids))
+    _apply_contribution(version, _Contribution.of(assets.iterator()), -1)
+
+
+def update_asset_validity(asset: Asset, *, was_valid: bool) -> None:
+    """Add or remove a newly (in)validated asset from the assetsSummary of its draft versions."""
+    is_valid = asset.status == Asset.Status.VALID
+    if is_valid == was_valid:
+        return
+
+    contribution = _Contribution.of([asset])
+    for version in Version.objects.filter(assets=asset, version='draft'):
+        _apply_contribution(version, contribution, 1 if is_valid else -1)
+
+
+def add_valid_assets_to_summaries(assets: Iterable[Asset]) -> None:
+    """Count a batch of newly VALID assets in the assetsSummary of their draft versions."""
+    assets_by_id = {asset.id: asset for asset in assets}
+    contributions: defaultdict[int, _Contribution] = defaultdict(_Contribution)
+    for version_id, asset_id in (
+        Version.assets.through.objects.filter(asset_id__in=assets_by_id, version__version='draft')
+        .values_list('version_id', 'asset_id')
+        .iterator()
+    ):
+        contributions[version_id].add(assets_by_id[asset_id])
+
+    for version in Version.objects.filter(id__in=contributions):
+        _apply_contribution(version, contributions[version.id], 1)
+
+
+def invalidate_assets_summaries(versions: QuerySet[Version]) -> None:
+    """Delete the stored assetsSummary of some versions, so that it is rebuilt when next used."""
+    VersionAssetsSummary.objects.filter(version__in=versions).delete()
+
+
+@transaction.atomic
+def _rebuild_assets_summary(version: Version) -> VersionAssetsSummary:
+    # Lock the version, so that no assets are validated or removed while the totals are rebuilt
+    Version.objects.select_for_update().filter(id=version.id).first()
+
+    summary = VersionAssetsSummary.objects.filter(version=version).first()
+    if summary is not None:
+        # The totals were rebuilt by someone else while waiting for the lock
+        return summary
+
+    contribution = _Contribution.of(_valid_assets(version.assets.all()).iterator())
+    summary = VersionAssetsSummary.objects.create(
+        version=version,
+        number_of_bytes=contribution.number_of_bytes,
+        number_of_files=contribution.number_of_files,
+    )
+    VersionAssetsSummaryValue.objects.bulk_create(
+        [
+            VersionAssetsSummaryValue(
+                summary=summary, field=field, value=json.loads(value), count=count
+            )
+            for (field, value), count in contribution.values.items()
+        ],
+        batch_size=5_000,
+    )
+
+    return summary
+
+
+def _has_drifted(version: Version) -> bool:
+    """Return whether the stored totals of a version differ from those of its assets."""
+    summary = VersionAssetsSummary.objects.filter(version=version).first()
+    if summary is None:
+        return False
+
+    expected = _Contribution.of(_valid_assets(version.assets.all()).iterator())
+    values = Counter(
+        {
+            (field, json.dumps(value, sort_keys=True)): count
+            for field, value, count in summary.values.values_list('field', 'value', 'count')
+        }
+    )
+    return (
+        summary.number_of_bytes != expected.number_of_bytes
+        or summary.number_of_files != expected.number_of_files
+        or values != expected.values
+    )
+
+
+def reconcile_assets_summary(version: Version) -> bool:
+    """
+    Check the stored totals of a version against its assets, and rebuild them if they've drifted.
+
+    The totals can drift if a change to the assets of a version is ever made without updating
+    them, which would otherwise go unnoticed. They're first checked without locking the version,
+    and only checked again under the lock if they seem to have drifted, in case that was just a
+    change made while checking. Return whether they were rebuilt.
+    """
+    if not _has_drifted(version):
+        return False
+
+    with transaction.atomic():
+        Version.objects.select_for_update().filter(id=version.id).first()
+        if not _has_drifted(version):
+            return False
+
+        logger.warning('The assetsSummary totals of version %s had drifted, rebuilding', version.id)
+        VersionAssetsSummary.objects.filter(version=version).delete()
+        _rebuild_assets_summary(version)
+    return True
+
+
+def get_assets_summary(version: Version) -> dict:
+    """Return the assetsSummary of a version, as produced by dandischema."""
+    summary = VersionAssetsSummary.objects.filter(version=version).first()
+    if summary is None:
+        summary = _rebuild_assets_summary(version)
+
+    values: dict[str, list] = {field: [] for field in _LIST_FIELDS}
+    for field, value in summary.values.order_by('id').values_list('field', 'value'):
+        values[field].append(value)
+
+    # Mirror the way dandischema turns the collected stats into an AssetsSummary
+    stats: dict[str, Any] = {
+        'numberOfBytes': summary.number_of_bytes,
+        'numberOfFiles': summary.number_of_files,
+    }
+    if summary.number_of_files:
+        stats.update(
+            {field: values[field] for field in _LIST_FIELDS if field not in _COUNTED_FIELDS}
+        )
+    stats['numberOfSubjects'] = len(values['subjects']) or None
+    stats['numberOfSamples'] = (len(values['tissuesample']) + len(values['slice'])) or None
+    stats['numberOfCells'] = len(values['cell']) or None
+
+    return AssetsSummary(**stats).model_dump(mode='json', exclude_none=True)
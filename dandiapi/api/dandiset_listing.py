@@ -0,0 +1,83 @@
+"""
+Denormalized values used to sort the dandiset listing.
+
+Every dandiset has a `DandisetListing` row, holding the name, modification time and size of its
+most recently created version, along with its star count. These are kept up to date as versions,
+asset paths and stars change, so that sorting the listing doesn't require any subqueries.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery
+
+from dandiapi.api.models.asset_paths import AssetPath
+from dandiapi.api.models.dandiset import DandisetStar
+from dandiapi.api.models.dandiset_listing import DandisetListing
+from dandiapi.api.models.version import Version
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from django.db.models import QuerySet
+
+    from dandiapi.api.models.dandiset import Dandiset
+
+# Stars are counted incrementally, so an existing star count is left alone
+_REFRESH_LISTINGS_SQL = """
+INSERT INTO {listing} (dandiset_id, latest_version_id, name, modified, size, star_count)
+SELECT
+    latest.dandiset_id,
+    latest.id,
+    latest.name,
+    latest.modified,
+    COALESCE(
+        (
+            SELECT sum(path.aggregate_size) FROM {asset_path} path
+            WHERE path.version_id = latest.id AND strpos(path.path, '/') = 0
+        ),
+        0
+    ),
+    (SELECT count(*) FROM {star} star WHERE star.dandiset_id = latest.dandiset_id)
+FROM (
+    SELECT DISTINCT ON (version.dandiset_id)
+        version.id, version.dandiset_id, version.name, version.modified
+    FROM {version} version
+    WHERE version.dandiset_id = ANY(%(dandiset_ids)s)
+    ORDER BY version.dandiset_id, version.created DESC
+) AS latest
+ON CONFLICT (dandiset_id) DO UPDATE SET
+    latest_version_id = EXCLUDED.latest_version_id,
+    name = EXCLUDED.name,
+    modified = EXCLUDED.modified,
+    size = EXCLUDED.size
+"""
+
+
+def refresh_dandiset_listings(dandiset_ids: Iterable[int]) -> None:
+    """Recompute the listing of some dandisets, after their versions or asset paths changed."""
+    tables = {
+        'listing': DandisetListing._meta.db_table,
+        'asset_path': AssetPath._meta.db_table,
+        'star': DandisetStar._meta.db_table,
+        'version': Version._meta.db_table,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(_REFRESH_LISTINGS_SQL.format(**tables), {'dandiset_ids': list(dandiset_ids)})
+
+
+def touch_dandiset_listings(versions: QuerySet[Version]) -> None:
+    """Copy the modification time of some versions to the listings they are the latest of."""
+    DandisetListing.objects.filter(latest_version__in=versions).update(
+        modified=Subquery(
+            Version.objects.filter(id=OuterRef('latest_version_id')).values('modified')
+        )
+    )
+
+
+def add_dandiset_listing_stars(dandiset: Dandiset, count: int) -> None:
+    """Add to (or remove from, if negative) the star count of a dandiset."""
+    if count:
+        DandisetListing.objects.filter(dandiset=dandiset).update(star_count=F('star_count') + count)
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+import hashlib
+import logging
 import tempfile
 from typing import IO, TYPE_CHECKING, Any
-from urllib.parse import urlparse, urlunparse
 
 from django.conf import settings
 from django.core.files.base import File
@@ -11,18 +13,18 @@ from django.core.files.storage import default_storage
 from rest_framework.renderers import JSONRenderer
 import yaml
 
+from dandiapi.api.asset_metadata import AssetMetadataAssembler
 from dandiapi.api.models import Asset, Version
 
 if TYPE_CHECKING:
-    from collections.abc import Generator, Iterable
+    from collections.abc import Generator, Iterable, Iterator, Mapping
+
+logger = logging.getLogger(__name__)
 
 
 def _s3_url(path: str) -> str:
     """Turn an object path into a fully qualified S3 URL."""
-    signed_url = default_storage.url(path)
-    # Strip off the query parameters from the presigning, as they are different every time
-    parsed = urlparse(signed_url)
-    return urlunparse((parsed[0], parsed[1], parsed[2], '', '', ''))
+    return default_storage.unsigned_url(path)
 
 
 def _manifests_path(version: Version) -> str:
@@ -71,44 +73,91 @@ def all_manifest_filepaths(version: Version) -> list[str]:
     ]
 
 
+def _upload_file(path: str, stream: IO[bytes], *, embargoed: bool) -> None:
+    stream.seek(0)
+    default_storage.save(path, File(stream))
+
+    if embargoed:
+        default_storage.put_tags(path, {'embargoed': 'true'})
+
+
 @contextmanager
 def _streaming_file_upload(path: str, *, embargoed: bool) -> Generator[IO[bytes]]:
     with tempfile.NamedTemporaryFile(mode='r+b') as outfile:
         yield outfile
-        outfile.seek(0)
+        _upload_file(path, outfile, embargoed=embargoed)
 
-        default_storage.save(path, File(outfile))
 
-    if embargoed:
-        default_storage.put_tags(path, {'embargoed': 'true'})
+def _yaml_dump_sequence_item(stream: IO[bytes], obj: Any) -> None:
+    for i, line in enumerate(
+        yaml.dump(obj, encoding='utf-8', Dumper=yaml.CSafeDumper, allow_unicode=True).splitlines()
+    ):
+        stream.write(b'- ' if i == 0 else b'  ')
+        stream.write(line)
+        stream.write(b'\n')
 
 
 def _yaml_dump_sequence_from_generator(stream: IO[bytes], generator: Iterable[Any]) -> None:
     for obj in generator:
-        for i, line in enumerate(
-            yaml.dump(
-                obj, encoding='utf-8', Dumper=yaml.CSafeDumper, allow_unicode=True
-            ).splitlines()
-        ):
-            stream.write(b'- ' if i == 0 else b'  ')
-            stream.write(line)
-            stream.write(b'\n')
+        _yaml_dump_sequence_item(stream, obj)
+
+
+def _encode_dandiset_jsonld(version: Version, stream: IO[bytes]) -> None:
+    stream.write(JSONRenderer().render(version.metadata))
+
+
+def _encode_dandiset_yaml(version: Version, stream: IO[bytes]) -> None:
+    yaml.dump(
+        version.metadata, stream, encoding='utf-8', Dumper=yaml.CSafeDumper, allow_unicode=True
+    )
+
+
+def _encode_collection_jsonld(version: Version, asset_ids: list[str], stream: IO[bytes]) -> None:
+    stream.write(
+        JSONRenderer().render(
+            {
+                '@context': version.metadata['@context'],
+                'id': version.metadata['id'],
+                '@type': 'prov:Collection',
+                'hasMember': asset_ids,
+            },
+        )
+    )
+
+
+def _manifest_assets(version: Version) -> Iterator[Asset]:
+    return (
+        version.assets.select_related('blob', 'zarr', 'zarr__dandiset')
+        .order_by('created')
+        .iterator()
+    )
+
+
+def _forget_manifest_checksum(version: Version, path: str) -> None:
+    """Forget the checksum of a manifest file which was written without being recorded."""
+    if path in version.manifest_checksums:
+        version.manifest_checksums = {
+            key: value for key, value in version.manifest_checksums.items() if key != path
+        }
+        Version.objects.filter(id=version.id).update(manifest_checksums=version.manifest_checksums)
+
+
+@contextmanager
+def _manifest_file_upload(version: Version, path: str) -> Generator[IO[bytes]]:
+    _forget_manifest_checksum(version, path)
+    with _streaming_file_upload(path, embargoed=version.dandiset.embargoed) as stream:
+        yield stream
 
 
 def write_dandiset_jsonld(version: Version) -> None:
-    embargoed = version.dandiset.embargoed
-    with _streaming_file_upload(_dandiset_jsonld_path(version), embargoed=embargoed) as stream:
-        stream.write(JSONRenderer().render(version.metadata))
+    with _manifest_file_upload(version, _dandiset_jsonld_path(version)) as stream:
+        _encode_dandiset_jsonld(version, stream)
 
 
 def write_assets_jsonld(version: Version) -> None:
     # Use full metadata when writing externally
-    assets_metadata = (
-        asset.full_metadata
-        for asset in version.assets.select_related('blob', 'zarr', 'zarr__dandiset').iterator()
-    )
-    embargoed = version.dandiset.embargoed
-    with _streaming_file_upload(_assets_jsonld_path(version), embargoed=embargoed) as stream:
+    assets_metadata = AssetMetadataAssembler().iter_full_metadata(_manifest_assets(version))
+    with _manifest_file_upload(version, _assets_jsonld_path(version)) as stream:
         stream.write(b'[')
         for i, obj in enumerate(assets_metadata):
             if i > 0:
@@ -119,25 +168,16 @@ def write_assets_jsonld(version: Version) -> None:
 
 
 def write_dandiset_yaml(version: Version) -> None:
-    embargoed = version.dandiset.embargoed
-    with _streaming_file_upload(_dandiset_yaml_path(version), embargoed=embargoed) as stream:
-        yaml.dump(
-            version.metadata, stream, encoding='utf-8', Dumper=yaml.CSafeDumper, allow_unicode=True
-        )
+    with _manifest_file_upload(version, _dandiset_yaml_path(version)) as stream:
+        _encode_dandiset_yaml(version, stream)
 
 
 def write_assets_yaml(version: Version) -> None:
-    embargoed = version.dandiset.embargoed
-    with _streaming_file_upload(_assets_yaml_path(version), embargoed=embargoed) as stream:
+    with _manifest_file_upload(version, _assets_yaml_path(version)) as stream:
         _yaml_dump_sequence_from_generator(
             stream,
             # Use full metadata when writing externally
-            (
-                asset.full_metadata
-                for asset in version.assets.select_related('blob', 'zarr', 'zarr__dandiset')
-                .order_by('created')
-                .iterator()
-            ),
+            AssetMetadataAssembler().iter_full_metadata(_manifest_assets(version)),
         )
 
 
@@ -146,15 +186,75 @@ def write_collection_jsonld(version: Version) -> None:
         Asset.dandi_asset_id(asset_id)
         for asset_id in version.assets.values_list('asset_id', flat=True)
     ]
+    with _manifest_file_upload(version, _collection_jsonld_path(version)) as stream:
+        _encode_collection_jsonld(version, asset_ids, stream)
+
+
+def _encode_manifests(version: Version, streams: Mapping[str, IO[bytes]]) -> None:
+    """Encode every manifest file of a version, only iterating over its assets once."""
+    _encode_dandiset_jsonld(version, streams[_dandiset_jsonld_path(version)])
+    _encode_dandiset_yaml(version, streams[_dandiset_yaml_path(version)])
+
+    renderer = JSONRenderer()
+    assets_jsonld = streams[_assets_jsonld_path(version)]
+    assets_yaml = streams[_assets_yaml_path(version)]
+    asset_ids: list[str] = []
+    assets_jsonld.write(b'[')
+    # Use full metadata when writing externally
+    assets_metadata = AssetMetadataAssembler().iter_full_metadata(_manifest_assets(version))
+    for i, metadata in enumerate(assets_metadata):
+        if i > 0:
+            assets_jsonld.write(b',')
+        assets_jsonld.write(renderer.render(metadata))
+        _yaml_dump_sequence_item(assets_yaml, metadata)
+        asset_ids.append(metadata['id'])
+    assets_jsonld.write(b']')
+
+    _encode_collection_jsonld(version, asset_ids, streams[_collection_jsonld_path(version)])
+
+
+def write_manifests(version: Version) -> None:
+    """
+    Write all manifest files of a version.
+
+    The manifests are encoded in a single pass over the assets. Each one is only uploaded if its
+    checksum differs from the one recorded when it was last written, with the changed manifests
+    being uploaded concurrently.
+    """
     embargoed = version.dandiset.embargoed
-    with _streaming_file_upload(_collection_jsonld_path(version), embargoed=embargoed) as stream:
-        stream.write(
-            JSONRenderer().render(
-                {
-                    '@context': version.metadata['@context'],
-                    'id': version.metadata['id'],
-                    '@type': 'prov:Collection',
-                    'hasMember': asset_ids,
-                },
-            )
-        )
+    # The checksums loaded with the version may have been changed by another write since
+    version.manifest_checksums = Version.objects.values_list('manifest_checksums', flat=True).get(
+        id=version.id
+    )
+    checksums = dict(version.manifest_checksums)
+    with ExitStack() as stack:
+        streams = {
+            path: stack.enter_context(tempfile.NamedTemporaryFile(mode='w+b'))
+            for path in all_manifest_filepaths(version)
+        }
+        _encode_manifests(version, streams)
+
+        changed: dict[str, str] = {}
+        for path, stream in streams.items():
+            stream.seek(0)
+            checksum = hashlib.file_digest(stream, 'sha256').hexdigest()
+            if checksums.get(path) != checksum:
+                changed[path] = checksum
+
+        if not changed:
+            logger.info('Manifests of version %s are unchanged', version.id)
+            return
+
+        with ThreadPoolExecutor(max_workers=len(changed)) as executor:
+            futures = {
+                executor.submit(_upload_file, path, streams[path], embargoed=embargoed): path
+                for path in changed
+            }
+            # Record each checksum as soon as its upload succeeds, so that a failed write only
+            # needs to upload the remaining manifests when it is retried
+            for future in as_completed(futures):
+                future.result()
+                path = futures[future]
+                checksums[path] = changed[path]
+                version.manifest_checksums = checksums
+                Version.objects.filter(id=version.id).update(manifest_checksums=checksums)
@@ -6,6 +6,8 @@ from django.utils.deprecation import MiddlewareMixin
 from oauth2_provider.contrib.rest_framework import OAuth2Authentication
 from rest_framework.authentication import SessionAuthentication, TokenAuthentication
 
+from dandiapi.api.services.permissions.dandiset import ownership_cache
+
 # Context variable for username
 _current_username: ContextVar[str] = ContextVar('current_username', default='AnonymousUser')
 
@@ -66,3 +68,14 @@ class GunicornUsernameMiddleware(MiddlewareMixin):
         response['X-Request-Username'] = username
 
         return response
+
+
+class OwnershipCacheMiddleware:
+    """Middleware to cache the dandisets owned by each user for the duration of a request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ownership_cache():
+            return self.get_response(request)
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:41
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('api', '0029_merge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionAssetsSummary',
+            fields=[
+                (
+                    'version',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='assets_summary_totals',
+                        serialize=False,
+                        to='api.version',
+                    ),
+                ),
+                ('number_of_bytes', models.PositiveBigIntegerField(default=0)),
+                ('number_of_files', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VersionAssetsSummaryValue',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('field', models.CharField(max_length=32)),
+                ('value', models.JSONField()),
+                ('count', models.PositiveIntegerField()),
+                (
+                    'summary',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='values',
+                        to='api.versionassetssummary',
+                    ),
+                ),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('summary', 'field', 'value'), name='unique-summary-field-value'
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:02
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('api', '0030_version_assets_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='manifest_checksums',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:12
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_DANDISET_LISTINGS_SQL = """
+INSERT INTO api_dandisetlisting (dandiset_id, latest_version_id, name, modified, size, star_count)
+SELECT
+    latest.dandiset_id,
+    latest.id,
+    latest.name,
+    latest.modified,
+    COALESCE(
+        (
+            SELECT sum(path.aggregate_size) FROM api_assetpath path
+            WHERE path.version_id = latest.id AND strpos(path.path, '/') = 0
+        ),
+        0
+    ),
+    (SELECT count(*) FROM api_dandisetstar star WHERE star.dandiset_id = latest.dandiset_id)
+FROM (
+    SELECT DISTINCT ON (version.dandiset_id)
+        version.id, version.dandiset_id, version.name, version.modified
+    FROM api_version version
+    ORDER BY version.dandiset_id, version.created DESC
+) AS latest
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('api', '0031_version_manifest_checksums'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DandisetListing',
+            fields=[
+                (
+                    'dandiset',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='listing',
+                        serialize=False,
+                        to='api.dandiset',
+                    ),
+                ),
+                ('name', models.CharField(max_length=300)),
+                ('modified', models.DateTimeField()),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('star_count', models.PositiveIntegerField(default=0)),
+                (
+                    'latest_version',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='+',
+                        to='api.version',
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['name'], name='api_dandise_name_7120e7_idx'),
+                    models.Index(fields=['modified'], name='api_dandise_modifie_56c33c_idx'),
+                    models.Index(fields=['size'], name='api_dandise_size_40ff4a_idx'),
+                    models.Index(fields=['star_count'], name='api_dandise_star_co_fae4d9_idx'),
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_DANDISET_LISTINGS_SQL, migrations.RunSQL.noop),
+    ]
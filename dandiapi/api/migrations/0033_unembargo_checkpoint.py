@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:18
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('api', '0032_dandiset_listing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnembargoCheckpoint',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('manifests_untagged', models.BooleanField(default=False)),
+                ('asset_blob_id', models.BigIntegerField(default=0)),
+                ('zarr_archive_id', models.BigIntegerField(default=0)),
+                ('zarr_key', models.TextField(blank=True, db_collation='C')),
+                ('modified', models.DateTimeField(auto_now=True)),
+                (
+                    'dandiset',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='unembargo_checkpoint',
+                        to='api.dandiset',
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:23
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('api', '0033_unembargo_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='unembargocheckpoint',
+            name='asset_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='unembargocheckpoint',
+            name='stage',
+            field=models.CharField(
+                choices=[
+                    ('TAGS', 'Removing tags'),
+                    ('ASSET_BLOBS', 'Unembargoing asset blobs'),
+                    ('ASSETS', 'Resetting assets'),
+                    ('VERSION', 'Opening the dandiset'),
+                ],
+                default='TAGS',
+                max_length=11,
+            ),
+        ),
+    ]
@@ -2,10 +2,13 @@ from __future__ import annotations
 
 from .asset import Asset, AssetBlob, AssetStatus
 from .asset_paths import AssetPath, AssetPathRelation
+from .assets_summary import VersionAssetsSummary, VersionAssetsSummaryValue
 from .audit import AuditRecord
 from .dandiset import Dandiset, DandisetStar
+from .dandiset_listing import DandisetListing
 from .garbage_collection import GarbageCollectionEvent, GarbageCollectionEventRecord
 from .stats import ApplicationStats
+from .unembargo import UnembargoCheckpoint
 from .upload import Upload
 from .user import UserMetadata
 from .version import Version
@@ -19,10 +22,14 @@ __all__ = [
     'AssetStatus',
     'AuditRecord',
     'Dandiset',
+    'DandisetListing',
     'DandisetStar',
     'GarbageCollectionEvent',
     'GarbageCollectionEventRecord',
+    'UnembargoCheckpoint',
     'Upload',
     'UserMetadata',
     'Version',
+    'VersionAssetsSummary',
+    'VersionAssetsSummaryValue',
 ]
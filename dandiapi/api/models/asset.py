@@ -3,20 +3,17 @@ from __future__ import annotations
 import datetime
 import re
 from typing import TYPE_CHECKING
-from urllib.parse import urlparse, urlunparse
 import uuid
 
 from dandischema.digests.dandietag import DandiETag
-from dandischema.models import AccessType
-from django.conf import settings
 from django.contrib.postgres.indexes import HashIndex
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from django.db import models
 from django.db.models import Q
-from django.urls import reverse
 from django_extensions.db.models import TimeStampedModel
 
+from dandiapi.api.asset_metadata import AssetMetadataAssembler
 from dandiapi.api.models.metadata import PublishableMetadataMixin
 
 from .version import Version
@@ -91,10 +88,7 @@ class AssetBlob(TimeStampedModel):
 
     @property
     def s3_url(self) -> str:
-        signed_url = self.blob.url
-        # Strip off the query parameters from the presigning, as they are different every time
-        parsed = urlparse(signed_url)
-        return urlunparse((parsed[0], parsed[1], parsed[2], '', '', ''))
+        return self.blob.storage.unsigned_url(self.blob.name)
 
     def __str__(self) -> str:
         return self.blob.name
@@ -236,35 +230,8 @@ class Asset(PublishableMetadataMixin, TimeStampedModel):
 
     @property
     def full_metadata(self):
-        download_url = settings.DANDI_API_URL + reverse(
-            'asset-download',
-            kwargs={'asset_id': str(self.asset_id)},
-        )
-        metadata = {
-            **self.metadata,
-            'id': self.dandi_asset_id(self.asset_id),
-            'access': [
-                {
-                    'schemaKey': 'AccessRequirements',
-                    'status': AccessType.EmbargoedAccess.value
-                    if self.is_embargoed
-                    else AccessType.OpenAccess.value,
-                }
-            ],
-            'path': self.path,
-            'identifier': str(self.asset_id),
-            'contentUrl': [download_url, self.s3_url],
-            'contentSize': self.size,
-            'digest': self.digest,
-        }
-        schema_version = metadata['schemaVersion']
-        metadata['@context'] = (
-            'https://raw.githubusercontent.com/dandi/schema/master/releases/'
-            f'{schema_version}/context.json'
-        )
-        if self.zarr is not None:
-            metadata['encodingFormat'] = 'application/x-zarr'
-        return metadata
+        # Prefer an AssetMetadataAssembler when assembling the metadata of many assets
+        return AssetMetadataAssembler().full_metadata(self)
 
     def published_metadata(self):
         """Generate the metadata of this asset as if it were being published."""
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from django.db import models
+
+
+class VersionAssetsSummary(models.Model):
+    """The running totals of the assetsSummary of a version, kept up to date as assets change."""
+
+    # Cascade deletion, as the summary is meaningless without its version
+    version = models.OneToOneField(
+        'Version',
+        primary_key=True,
+        related_name='assets_summary_totals',
+        on_delete=models.CASCADE,
+    )
+
+    number_of_bytes = models.PositiveBigIntegerField(default=0)
+    number_of_files = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f'{self.version}: {self.number_of_files} files, {self.number_of_bytes} bytes'
+
+
+class VersionAssetsSummaryValue(models.Model):
+    """A distinct value of a list field of the assetsSummary, such as a species or approach."""
+
+    summary = models.ForeignKey(
+        VersionAssetsSummary, related_name='values', on_delete=models.CASCADE
+    )
+    field = models.CharField(max_length=32)
+    value = models.JSONField()
+
+    # The number of assets in the version that contribute this value
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['summary', 'field', 'value'], name='unique-summary-field-value'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.field}: {self.value}'
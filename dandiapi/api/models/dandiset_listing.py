@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from django.db import models
+
+
+class DandisetListing(models.Model):
+    """
+    The values used to sort the dandiset listing, kept up to date as dandisets change.
+
+    These all refer to the most recently created version of the dandiset.
+    """
+
+    # Cascade deletion, as the listing is meaningless without its dandiset
+    dandiset = models.OneToOneField(
+        'Dandiset', primary_key=True, related_name='listing', on_delete=models.CASCADE
+    )
+    latest_version = models.ForeignKey('Version', related_name='+', on_delete=models.CASCADE)
+
+    name = models.CharField(max_length=300)
+    modified = models.DateTimeField()
+    size = models.PositiveBigIntegerField(default=0)
+    star_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name']),
+            models.Index(fields=['modified']),
+            models.Index(fields=['size']),
+            models.Index(fields=['star_count']),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.dandiset}: {self.name}'
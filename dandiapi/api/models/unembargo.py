@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from django.db import models
+
+from .dandiset import Dandiset
+
+
+class UnembargoCheckpoint(models.Model):
+    """How far the unembargo of a dandiset has got, so that it can carry on if interrupted."""
+
+    class Stage(models.TextChoices):
+        TAGS = 'TAGS', 'Removing tags'
+        ASSET_BLOBS = 'ASSET_BLOBS', 'Unembargoing asset blobs'
+        ASSETS = 'ASSETS', 'Resetting assets'
+        VERSION = 'VERSION', 'Opening the dandiset'
+
+    dandiset = models.OneToOneField(
+        Dandiset, on_delete=models.CASCADE, related_name='unembargo_checkpoint'
+    )
+    stage = models.CharField(
+        max_length=max(len(choice[0]) for choice in Stage.choices),
+        choices=Stage.choices,
+        default=Stage.TAGS,
+    )
+    manifests_untagged = models.BooleanField(default=False)
+    # Asset blobs and zarr archives are untagged in order of ID, up to and including these
+    asset_blob_id = models.BigIntegerField(default=0)
+    zarr_archive_id = models.BigIntegerField(default=0)
+    # The last object untagged within the zarr archive after `zarr_archive_id`
+    zarr_key = models.TextField(db_collation='C', blank=True)
+    # Assets are reset in order of ID, up to and including this
+    asset_id = models.BigIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.dandiset.identifier}: {self.stage}'
+
+    def advance(self, stage: UnembargoCheckpoint.Stage) -> None:
+        self.stage = stage
+        self.save(update_fields=['stage', 'modified'])
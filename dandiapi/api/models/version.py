@@ -54,6 +54,10 @@ class Version(PublishableMetadataMixin, TimeStampedModel):
     )
     validation_errors = models.JSONField(default=list, blank=True, null=True)
 
+    # The sha256 checksums of the manifest files last written for this version, keyed by path.
+    # These are only written by queryset updates as the manifests are written, and never by save.
+    manifest_checksums = models.JSONField(default=dict, blank=True)
+
     class Meta:
         ordering = ['version']
         unique_together = ['dandiset', 'version']
@@ -264,8 +268,22 @@ class Version(PublishableMetadataMixin, TimeStampedModel):
         return metadata
 
     def save(self, *args, **kwargs):
+        from dandiapi.api.dandiset_listing import refresh_dandiset_listings
+        from dandiapi.search.documents import refresh_version_search_documents
+
         self.metadata = self._populate_metadata()
+        if not self._state.adding and self.pk is not None and not args and not kwargs:
+            # Don't overwrite the manifest checksums with those loaded along with this version
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != 'manifest_checksums'
+                and field.attname not in self.get_deferred_fields()
+            ]
         super().save(*args, **kwargs)
+        refresh_dandiset_listings([self.dandiset_id])
+        refresh_version_search_documents([self.id])
 
     def __str__(self) -> str:
         return f'{self.dandiset.identifier}/{self.version}'
@@ -1,45 +1,73 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from collections import Counter
+from typing import TYPE_CHECKING, Literal, TypedDict
 
+from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.utils import timezone
 
-from dandiapi.api.asset_paths import add_asset_paths, delete_asset_paths, get_conflicting_paths
+from dandiapi.api.asset_paths import (
+    add_asset_paths,
+    add_asset_paths_many,
+    delete_asset_paths,
+    delete_asset_paths_many,
+    extract_paths,
+    get_conflicting_paths,
+    get_related_leaf_paths,
+)
+from dandiapi.api.assets_summary import remove_assets_from_summary
+from dandiapi.api.dandiset_listing import touch_dandiset_listings
 from dandiapi.api.models.asset import Asset, AssetBlob
 from dandiapi.api.models.dandiset import Dandiset
 from dandiapi.api.models.version import Version
 from dandiapi.api.services import audit
 from dandiapi.api.services.asset.exceptions import (
     AssetAlreadyExistsError,
+    AssetNotFoundError,
     AssetPathConflictError,
     DandisetOwnerRequiredError,
     DraftDandisetNotModifiableError,
     ZarrArchiveBelongsToDifferentDandisetError,
 )
+from dandiapi.api.services.exceptions import DandiError
 from dandiapi.api.services.permissions.dandiset import is_dandiset_owner
 from dandiapi.api.tasks import remove_asset_blob_embargoed_tag_task
+from dandiapi.search.asset_search import sync_asset_search
 
 if TYPE_CHECKING:
+    from dandiapi.api.models.audit import AuditRecordType
     from dandiapi.zarr.models import ZarrArchive
 
 
-def _create_asset(
+def _build_asset(
     *,
     path: str,
     asset_blob: AssetBlob | None = None,
     zarr_archive: ZarrArchive | None = None,
     metadata: dict,
-):
+) -> Asset:
     metadata = Asset.strip_metadata(metadata)
 
-    asset = Asset(
+    return Asset(
         path=path,
         blob=asset_blob,
         zarr=zarr_archive,
         metadata=metadata,
         status=Asset.Status.PENDING,
     )
+
+
+def _create_asset(
+    *,
+    path: str,
+    asset_blob: AssetBlob | None = None,
+    zarr_archive: ZarrArchive | None = None,
+    metadata: dict,
+):
+    asset = _build_asset(
+        path=path, asset_blob=asset_blob, zarr_archive=zarr_archive, metadata=metadata
+    )
     asset.full_clean(validate_constraints=False)
     asset.save()
 
@@ -60,10 +88,13 @@ def _add_asset_to_version(
     version.assets.add(asset)
     add_asset_paths(asset, version)
 
-    # Trigger a version metadata validation, as saving the version might change the metadata
+    # Trigger a version metadata validation, as saving the version might change the metadata.
+    # The new asset is PENDING, so it only counts towards the assetsSummary once it's validated.
     Version.objects.filter(id=version.id).update(
         status=Version.Status.PENDING, modified=timezone.now()
     )
+    touch_dandiset_listings(Version.objects.filter(id=version.id))
+    sync_asset_search(version.dandiset_id, [asset.id])
 
     return asset
 
@@ -77,6 +108,11 @@ def _remove_asset_from_version(*, asset: Asset, version: Version):
     Version.objects.filter(id=version.id).update(
         status=Version.Status.PENDING, modified=timezone.now()
     )
+    touch_dandiset_listings(Version.objects.filter(id=version.id))
+
+    # Now that the version is locked, remove the asset from its assetsSummary
+    remove_assets_from_summary([asset.id], version)
+    sync_asset_search(version.dandiset_id, [asset.id])
 
 
 def change_asset(  # noqa: PLR0913
@@ -205,3 +241,238 @@ def remove_asset_from_version(*, user, asset: Asset, version: Version) -> Versio
         audit.remove_asset(dandiset=version.dandiset, user=user, asset=asset)
 
     return version
+
+
+class AssetOperation(TypedDict):
+    """
+    A single operation to be applied by `apply_asset_operations`.
+
+    The `asset` is the existing asset to update or delete, and must be `None` when creating an
+    asset. The blob, zarr archive and metadata are only used when creating or updating an asset.
+    """
+
+    action: Literal['create', 'update', 'delete']
+    asset: Asset | None
+    asset_blob: AssetBlob | None
+    zarr_archive: ZarrArchive | None
+    metadata: dict | None
+
+
+class _PathOccupancy:
+    """
+    Track the leaf paths of a version while a batch of operations is applied to it.
+
+    Only the leaves which could conflict with any of the paths being added are loaded. Leaves
+    added by the batch itself have no asset ID yet, and are tracked with an ID of `None`.
+    """
+
+    def __init__(self, version: Version, new_paths: list[str]) -> None:
+        self.leaves: dict[str, int | None] = {}
+        self.folders: Counter[str] = Counter()
+        for path, asset_id in get_related_leaf_paths(new_paths, version).items():
+            self.add(path, asset_id)
+
+    def add(self, path: str, asset_id: int | None) -> None:
+        self.leaves[path] = asset_id
+        self.folders.update(extract_paths(path)[:-1])
+
+    def remove(self, path: str, asset_id: int) -> None:
+        if path in self.leaves and self.leaves[path] == asset_id:
+            del self.leaves[path]
+            self.folders.subtract(extract_paths(path)[:-1])
+
+    def check(self, path: str) -> None:
+        """Raise an error if an asset can't be added at the given path."""
+        if path in self.leaves:
+            raise AssetAlreadyExistsError
+
+        if self.folders[path]:
+            conflicts = sorted(leaf for leaf in self.leaves if leaf.startswith(f'{path}/'))
+        else:
+            conflicts = [folder for folder in extract_paths(path)[:-1] if folder in self.leaves]
+        if conflicts:
+            raise AssetPathConflictError(new_path=path, existing_paths=conflicts)
+
+
+def _build_operation_asset(*, version: Version, operation: AssetOperation) -> Asset:
+    metadata = operation['metadata']
+    if metadata is None or 'path' not in metadata:
+        raise ValueError('Path must be present in metadata')
+
+    asset_blob, zarr_archive = operation['asset_blob'], operation['zarr_archive']
+    if not asset_blob and not zarr_archive:
+        raise ValueError('One of zarr_archive or asset_blob must be given')
+    if zarr_archive and zarr_archive.dandiset_id != version.dandiset_id:
+        raise ZarrArchiveBelongsToDifferentDandisetError
+
+    asset = _build_asset(
+        path=metadata['path'], asset_blob=asset_blob, zarr_archive=zarr_archive, metadata=metadata
+    )
+    try:
+        # Skip the checks that would cost a query per asset. The blob and zarr archive have
+        # already been fetched, and the only unique field is the randomly generated asset_id,
+        # which is enforced by the database anyway.
+        asset.full_clean(
+            exclude=['blob', 'zarr'], validate_unique=False, validate_constraints=False
+        )
+    except ValidationError as e:
+        raise DandiError(' '.join(e.messages), 400) from e
+
+    return asset
+
+
+def _resolve_asset_operation(
+    *,
+    version: Version,
+    operation: AssetOperation,
+    occupancy: _PathOccupancy,
+    removed_asset_ids: set[int],
+) -> tuple[Asset | None, Asset | None]:
+    """Validate a single operation, returning the asset it removes and the asset it adds."""
+    old_asset = operation['asset']
+    if old_asset is not None and old_asset.id in removed_asset_ids:
+        # The asset was already removed by a previous operation
+        raise AssetNotFoundError
+
+    if operation['action'] == 'delete':
+        if old_asset is None:
+            raise ValueError('An asset must be given to delete')
+        occupancy.remove(old_asset.path, old_asset.id)
+        return old_asset, None
+
+    if operation['action'] == 'create' and old_asset is not None:
+        raise ValueError('An asset must not be given to create')
+
+    if old_asset is not None:
+        metadata = operation['metadata'] or {}
+        if not old_asset.is_different_from(
+            asset_blob=operation['asset_blob'],
+            zarr_archive=operation['zarr_archive'],
+            metadata=Asset.strip_metadata(metadata),
+            path=metadata.get('path'),
+        ):
+            return None, None
+        occupancy.remove(old_asset.path, old_asset.id)
+
+    try:
+        new_asset = _build_operation_asset(version=version, operation=operation)
+        occupancy.check(new_asset.path)
+    except DandiError:
+        # Put back the asset that would have been replaced
+        if old_asset is not None:
+            occupancy.add(old_asset.path, old_asset.id)
+        raise
+
+    occupancy.add(new_asset.path, None)
+    return old_asset, new_asset
+
+
+def _write_asset_operations(
+    *,
+    user,
+    version: Version,
+    removed_assets: list[Asset],
+    added_assets: list[Asset],
+    audit_changes: list[tuple[AuditRecordType, Asset]],
+) -> None:
+    # Creating an asset in an OPEN dandiset that points to an
+    # embargoed blob results in that blob being unembargoed.
+    if version.dandiset.embargo_status == Dandiset.EmbargoStatus.OPEN:
+        embargoed_blob_ids = {
+            asset.blob.blob_id
+            for asset in added_assets
+            if asset.blob is not None and asset.blob.embargoed
+        }
+        AssetBlob.objects.filter(blob_id__in=embargoed_blob_ids).update(embargoed=False)
+        for blob_id in embargoed_blob_ids:
+            transaction.on_commit(
+                lambda blob_id=blob_id: remove_asset_blob_embargoed_tag_task.delay(blob_id=blob_id)
+            )
+
+    delete_asset_paths_many(removed_assets, version)
+    version.assets.remove(*removed_assets)
+
+    Asset.objects.bulk_create(added_assets)
+    version.assets.add(*added_assets)
+    add_asset_paths_many(added_assets, version)
+
+    # Trigger a single version metadata validation for all of the changes
+    Version.objects.filter(id=version.id).update(
+        status=Version.Status.PENDING, modified=timezone.now()
+    )
+    touch_dandiset_listings(Version.objects.filter(id=version.id))
+    remove_assets_from_summary([asset.id for asset in removed_assets], version)
+    sync_asset_search(version.dandiset_id, [asset.id for asset in removed_assets + added_assets])
+
+    audit.change_assets(dandiset=version.dandiset, user=user, changes=audit_changes)
+
+
+def apply_asset_operations(
+    *, user, version: Version, operations: list[AssetOperation]
+) -> list[Asset | DandiError | None]:
+    """
+    Create, update and remove many assets of a draft version at once.
+
+    The operations are validated as if they were applied one at a time in the given order, but
+    are written to the database with a constant number of queries. The result of each operation
+    is the resulting asset (`None` for removals), or the error that prevented it from being
+    applied, in which case it is skipped.
+    """
+    if not is_dandiset_owner(version.dandiset, user):
+        raise DandisetOwnerRequiredError
+    if version.version != 'draft':
+        raise DraftDandisetNotModifiableError
+
+    new_paths = [
+        operation['metadata']['path']
+        for operation in operations
+        if operation['action'] != 'delete' and operation['metadata'] is not None
+    ]
+    occupancy = _PathOccupancy(version, new_paths)
+
+    results: list[Asset | DandiError | None] = []
+    removed_assets: list[Asset] = []
+    removed_asset_ids: set[int] = set()
+    added_assets: list[Asset] = []
+    audit_changes: list[tuple[AuditRecordType, Asset]] = []
+    for operation in operations:
+        try:
+            removed_asset, added_asset = _resolve_asset_operation(
+                version=version,
+                operation=operation,
+                occupancy=occupancy,
+                removed_asset_ids=removed_asset_ids,
+            )
+        except DandiError as e:
+            results.append(e)
+            continue
+
+        if removed_asset is not None:
+            removed_assets.append(removed_asset)
+            removed_asset_ids.add(removed_asset.id)
+        if added_asset is not None:
+            added_assets.append(added_asset)
+
+        if operation['action'] == 'delete':
+            audit_changes.append(('remove_asset', removed_asset))
+            results.append(None)
+        elif added_asset is None:
+            # The asset was left unchanged
+            results.append(operation['asset'])
+        else:
+            audit_changes.append(
+                ('update_asset' if removed_asset is not None else 'add_asset', added_asset)
+            )
+            results.append(added_asset)
+
+    if audit_changes:
+        with transaction.atomic():
+            _write_asset_operations(
+                user=user,
+                version=version,
+                removed_assets=removed_assets,
+                added_assets=added_assets,
+                audit_changes=audit_changes,
+            )
+
+    return results
@@ -14,7 +14,7 @@ if TYPE_CHECKING:
     from dandiapi.zarr.models import ZarrArchive
 
 
-def _make_audit_record(
+def _build_audit_record(
     *,
     dandiset: Dandiset,
     user: User | None,
@@ -26,7 +26,7 @@ def _make_audit_record(
     if not admin and user is None:
         raise ValueError('Non-null `user` required when `admin` is False')
 
-    audit_record = AuditRecord(
+    return AuditRecord(
         dandiset_id=dandiset.id,
         username=user.username if user else '',
         user_email=user.email if user else '',
@@ -36,6 +36,25 @@ def _make_audit_record(
         admin=admin,
         description=description,
     )
+
+
+def _make_audit_record(
+    *,
+    dandiset: Dandiset,
+    user: User | None,
+    record_type: AuditRecordType,
+    details: dict,
+    admin: bool = False,
+    description: str = '',
+) -> AuditRecord:
+    audit_record = _build_audit_record(
+        dandiset=dandiset,
+        user=user,
+        record_type=record_type,
+        details=details,
+        admin=admin,
+        description=description,
+    )
     audit_record.save()
 
     return audit_record
@@ -164,6 +183,13 @@ def update_asset(
     )
 
 
+def _removed_asset_details(asset: Asset) -> dict:
+    return {
+        'path': asset.path,
+        'asset_id': str(asset.asset_id),
+    }
+
+
 def remove_asset(
     *,
     dandiset: Dandiset,
@@ -172,10 +198,7 @@ def remove_asset(
     admin: bool = False,
     description: str = '',
 ) -> AuditRecord:
-    details = {
-        'path': asset.path,
-        'asset_id': str(asset.asset_id),
-    }
+    details = _removed_asset_details(asset)
     return _make_audit_record(
         dandiset=dandiset,
         user=user,
@@ -186,6 +209,38 @@ def remove_asset(
     )
 
 
+def change_assets(
+    *,
+    dandiset: Dandiset,
+    user: User | None,
+    changes: list[tuple[AuditRecordType, Asset]],
+    admin: bool = False,
+    description: str = '',
+) -> list[AuditRecord]:
+    """
+    Record many asset additions, updates and removals at once.
+
+    Each change is a pair of the record type (`add_asset`, `update_asset` or `remove_asset`) and
+    the affected asset. The records are equivalent to those of the individual functions above.
+    """
+    audit_records = [
+        _build_audit_record(
+            dandiset=dandiset,
+            user=user,
+            record_type=record_type,
+            details=(
+                _removed_asset_details(asset)
+                if record_type == 'remove_asset'
+                else _asset_details(asset)
+            ),
+            admin=admin,
+            description=description,
+        )
+        for record_type, asset in changes
+    ]
+    return AuditRecord.objects.bulk_create(audit_records)
+
+
 def create_zarr(
     *,
     dandiset: Dandiset,
@@ -11,6 +11,7 @@ if TYPE_CHECKING:
 
 from dandischema.models import AccessRequirements, AccessType, Organization, RoleType
 
+from dandiapi.api.dandiset_listing import add_dandiset_listing_stars
 from dandiapi.api.models.dandiset import Dandiset, DandisetStar
 from dandiapi.api.models.version import Version
 from dandiapi.api.services import audit
@@ -23,6 +24,7 @@ from dandiapi.api.services.exceptions import (
 )
 from dandiapi.api.services.permissions.dandiset import add_dandiset_owner, is_dandiset_owner
 from dandiapi.api.services.version.metadata import _normalize_version_metadata
+from dandiapi.search.asset_search import sync_asset_search
 
 
 def _create_dandiset(
@@ -154,6 +156,10 @@ def delete_dandiset(*, user, dandiset: Dandiset) -> None:
         audit.delete_dandiset(dandiset=dandiset, user=user)
 
         dandiset.versions.all().delete()
+
+        # Without any versions, none of the assets can be searched anymore
+        sync_asset_search(dandiset.id)
+
         dandiset.delete()
 
 
@@ -171,7 +177,10 @@ def star_dandiset(*, user, dandiset: Dandiset) -> int:
     if not user.is_authenticated:
         raise NotAuthenticatedError
 
-    DandisetStar.objects.get_or_create(user=user, dandiset=dandiset)
+    with transaction.atomic():
+        _, created = DandisetStar.objects.get_or_create(user=user, dandiset=dandiset)
+        if created:
+            add_dandiset_listing_stars(dandiset, 1)
     return dandiset.star_count
 
 
@@ -189,5 +198,7 @@ def unstar_dandiset(*, user, dandiset: Dandiset) -> int:
     if not user.is_authenticated:
         raise NotAuthenticatedError
 
-    DandisetStar.objects.filter(user=user, dandiset=dandiset).delete()
+    with transaction.atomic():
+        deleted, _ = DandisetStar.objects.filter(user=user, dandiset=dandiset).delete()
+        add_dandiset_listing_stars(dandiset, -deleted)
     return dandiset.star_count
@@ -5,15 +5,19 @@ from typing import TYPE_CHECKING
 
 from django.db import transaction
 
+from dandiapi.api.assets_summary import remove_assets_from_summary
 from dandiapi.api.mail import send_dandiset_unembargoed_message
-from dandiapi.api.models import AssetBlob, Dandiset, Version
+from dandiapi.api.models import AssetBlob, Dandiset, UnembargoCheckpoint, Version
 from dandiapi.api.models.asset import Asset
 from dandiapi.api.services import audit
 from dandiapi.api.services.asset.exceptions import DandisetOwnerRequiredError
 from dandiapi.api.services.embargo.utils import remove_dandiset_embargo_tags
 from dandiapi.api.services.exceptions import DandiError
 from dandiapi.api.services.metadata import validate_version_metadata
-from dandiapi.api.services.permissions.dandiset import is_dandiset_owner
+from dandiapi.api.services.permissions.dandiset import (
+    invalidate_dandiset_embargo_status,
+    is_dandiset_owner,
+)
 from dandiapi.api.tasks import unembargo_dandiset_task
 
 from .exceptions import (
@@ -28,10 +32,19 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# The number of rows updated by each transaction while unembargoing
+UNEMBARGO_BATCH_SIZE = 5000
+
 
-@transaction.atomic()
 def unembargo_dandiset(ds: Dandiset, user: User):
-    """Unembargo a dandiset by copying all embargoed asset blobs to the public bucket."""
+    """
+    Unembargo a dandiset, by removing the embargoed tag from all of its objects and opening it.
+
+    This is done in stages, each of which commits its progress in short transactions, so that
+    no rows are locked while S3 is updated, or for longer than a batch. Progress is recorded in
+    the `UnembargoCheckpoint` of the dandiset, so an unembargo which is interrupted carries on
+    from where it got to.
+    """
     logger.info('Unembargoing Dandiset %s', ds.identifier)
     logger.info('\t%s assets', ds.draft_version.assets.count())
 
@@ -43,22 +56,69 @@ def unembargo_dandiset(ds: Dandiset, user: User):
     if ds.uploads.all().exists():
         raise DandisetActiveUploadsError(http_status_code=500)
 
-    # Remove tags in S3
-    logger.info('Removing tags...')
-    remove_dandiset_embargo_tags(ds)
+    checkpoint, _ = UnembargoCheckpoint.objects.get_or_create(dandiset=ds)
+    if checkpoint.stage != UnembargoCheckpoint.Stage.TAGS:
+        logger.info('Resuming at stage %s', checkpoint.stage)
+
+    if checkpoint.stage == UnembargoCheckpoint.Stage.TAGS:
+        # Remove tags in S3
+        logger.info('Removing tags...')
+        remove_dandiset_embargo_tags(ds)
+        checkpoint.advance(UnembargoCheckpoint.Stage.ASSET_BLOBS)
+
+    if checkpoint.stage == UnembargoCheckpoint.Stage.ASSET_BLOBS:
+        _unembargo_asset_blobs(ds)
+        checkpoint.advance(UnembargoCheckpoint.Stage.ASSETS)
+
+    if checkpoint.stage == UnembargoCheckpoint.Stage.ASSETS:
+        _reset_assets(ds, checkpoint)
+        checkpoint.advance(UnembargoCheckpoint.Stage.VERSION)
+
+    _open_dandiset(ds, user)
+
+    # Notify owners of completed unembargo
+    send_dandiset_unembargoed_message(ds)
+    logger.info('Dandiset owners notified.')
+
+    logger.info('...Done')
+
 
-    # Set all assets to pending
-    updated_assets = Asset.objects.filter(versions__dandiset=ds).update(status=Asset.Status.PENDING)
+def _unembargo_asset_blobs(ds: Dandiset):
     # Update embargoed flag on asset blobs
     # Zarrs have no such property as it is derived from the dandiset
-    updated_blobs = AssetBlob.objects.filter(embargoed=True, assets__versions__dandiset=ds).update(
-        embargoed=False
-    )
-    logger.info('Set %s assets to PENDING', updated_assets)
+    embargoed_blobs = AssetBlob.objects.filter(embargoed=True, assets__versions__dandiset=ds)
+    updated_blobs = 0
+    while ids := list(embargoed_blobs.values_list('id', flat=True)[:UNEMBARGO_BATCH_SIZE]):
+        updated_blobs += AssetBlob.objects.filter(id__in=ids).update(embargoed=False)
     logger.info('Updated %s asset blobs', updated_blobs)
 
+
+def _reset_assets(ds: Dandiset, checkpoint: UnembargoCheckpoint):
+    assets = Asset.objects.filter(versions__dandiset=ds).distinct().order_by('id')
+    updated_assets = 0
+    while ids := list(
+        assets.filter(id__gt=checkpoint.asset_id).values_list('id', flat=True)[
+            :UNEMBARGO_BATCH_SIZE
+        ]
+    ):
+        with transaction.atomic():
+            # Lock the draft version while its assetsSummary is modified
+            draft_version = Version.objects.select_for_update().get(dandiset=ds, version='draft')
+            # Remove the assets from the assetsSummary before setting them to pending, so that they
+            # are counted again once they're revalidated
+            remove_assets_from_summary(ids, draft_version)
+            updated_assets += Asset.objects.filter(id__in=ids).update(status=Asset.Status.PENDING)
+            checkpoint.asset_id = ids[-1]
+            checkpoint.save(update_fields=['asset_id', 'modified'])
+
+    logger.info('Set %s assets to PENDING', updated_assets)
+
+
+@transaction.atomic()
+def _open_dandiset(ds: Dandiset, user: User):
     # Set status to OPEN
     Dandiset.objects.filter(pk=ds.pk).update(embargo_status=Dandiset.EmbargoStatus.OPEN)
+    invalidate_dandiset_embargo_status(ds.pk)
     logger.info('Dandiset embargo status updated')
 
     # Fetch version to ensure changed embargo_status is included
@@ -73,12 +133,8 @@ def unembargo_dandiset(ds: Dandiset, user: User):
     validate_version_metadata(version=v)
     logger.info('Version metadata validated')
 
-    # Notify owners of completed unembargo
-    send_dandiset_unembargoed_message(ds)
-    logger.info('Dandiset owners notified.')
-
-    logger.info('...Done')
-
+    # The dandiset is open, so there's nothing left to resume
+    UnembargoCheckpoint.objects.filter(dandiset=ds).delete()
     audit.unembargo_dandiset(dandiset=ds, user=user)
 
 
@@ -105,4 +161,5 @@ def kickoff_dandiset_unembargo(*, user: User, dandiset: Dandiset):
         Dandiset.objects.filter(pk=dandiset.pk).update(
             embargo_status=Dandiset.EmbargoStatus.UNEMBARGOING
         )
+        invalidate_dandiset_embargo_status(dandiset.pk)
         transaction.on_commit(lambda: unembargo_dandiset_task.delay(dandiset.pk, user.id))
@@ -1,21 +1,24 @@
 from __future__ import annotations
 
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import logging
 from typing import TYPE_CHECKING
 
 from django.conf import settings
 from django.core.files.storage import default_storage
-from django.db.models import Q
-from more_itertools import chunked
 
 from dandiapi.api.manifests import all_manifest_filepaths
-from dandiapi.api.models.asset import Asset
+from dandiapi.api.models import AssetBlob, UnembargoCheckpoint
 from dandiapi.zarr.models import ZarrArchive, zarr_s3_path
 
 from .exceptions import AssetTagRemovalError
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from mypy_boto3_s3.client import S3Client
+
     from dandiapi.api.models.dandiset import Dandiset
 
 
@@ -23,29 +26,30 @@ logger = logging.getLogger(__name__)
 TAG_REMOVAL_CHUNK_SIZE = 5000
 
 
-def _delete_object_tags(blob: str):
-    existing_tags: dict[str, str] = default_storage.get_tags(blob)
-    filtered_tags = {key: val for key, val in existing_tags.items() if key != 'embargoed'}
-    default_storage.put_tags(blob, filtered_tags)
+def _delete_object_tags(client: S3Client, bucket: str, *, blob: str) -> None:
+    tags = client.get_object_tagging(Bucket=bucket, Key=blob)['TagSet']
+    filtered_tags = [tag for tag in tags if tag['Key'] != 'embargoed']
+    if len(filtered_tags) == len(tags):
+        # Already untagged, by an earlier attempt at unembargoing
+        return
+    if filtered_tags:
+        client.put_object_tagging(Bucket=bucket, Key=blob, Tagging={'TagSet': filtered_tags})
+    else:
+        # There's nothing to keep, so there's no need to rewrite the tags
+        client.delete_object_tagging(Bucket=bucket, Key=blob)
 
 
-def _delete_zarr_object_tags(zarr: str):
-    paginator = ZarrArchive.storage.s3_client.get_paginator('list_objects_v2')
-    pages = paginator.paginate(
-        Bucket=settings.DANDI_DANDISETS_BUCKET_NAME, Prefix=zarr_s3_path(zarr_id=zarr)
-    )
+def _untag_objects(
+    executor: ThreadPoolExecutor, untag: Callable[..., None], keys: list[str], message: str
+) -> None:
+    futures = [executor.submit(untag, blob=key) for key in keys]
 
-    # Constant low thread number to limit memory usage, as each thread
-    # creates its own boto client, consuming memory in the process
-    with ThreadPoolExecutor(max_workers=4) as e:
-        for page in pages:
-            keys = [obj['Key'] for obj in page.get('Contents', [])]
-            futures = [e.submit(_delete_object_tags, blob=key) for key in keys]
-
-            # Check if any failed and raise exception if so
-            failed = [key for i, key in enumerate(keys) if futures[i].exception() is not None]
-            if failed:
-                raise AssetTagRemovalError('Some zarr files failed to remove tags', blobs=failed)
+    # Check if any failed and raise exception if so
+    failed = [
+        key for key, future in zip(keys, futures, strict=True) if future.exception() is not None
+    ]
+    if failed:
+        raise AssetTagRemovalError(message, blobs=failed)
 
 
 def _remove_dandiset_manifest_tags(dandiset: Dandiset):
@@ -55,40 +59,88 @@ def _remove_dandiset_manifest_tags(dandiset: Dandiset):
     logger.info('Removing tags from dandiset %s', dandiset.identifier)
     for path in paths:
         try:
-            existing_tags: dict[str, str] = default_storage.get_tags(path)
-            filtered_tags = {key: val for key, val in existing_tags.items() if key != 'embargoed'}
-            default_storage.put_tags(path, filtered_tags)
+            _delete_object_tags(default_storage.s3_client, default_storage.bucket_name, blob=path)
         except default_storage.s3_client.exceptions.NoSuchKey:
             logger.info('\tManifest file not found at %s. Continuing...', path)
             continue
 
 
-def remove_dandiset_embargo_tags(dandiset: Dandiset):
-    _remove_dandiset_manifest_tags(dandiset=dandiset)
-
-    embargoed_assets = (
-        Asset.objects.filter(versions__dandiset=dandiset)
-        # zarrs have no embargoed flag themselves and so are all included
-        .filter(Q(blob__embargoed=True) | Q(zarr__isnull=False))
-        .values_list('blob__blob', 'zarr__zarr_id')
-        .iterator(chunk_size=TAG_REMOVAL_CHUNK_SIZE)
+def _remove_asset_blob_tags(
+    dandiset: Dandiset,
+    checkpoint: UnembargoCheckpoint,
+    executor: ThreadPoolExecutor,
+    untag: Callable[..., None],
+) -> None:
+    embargoed_blobs = (
+        AssetBlob.objects.filter(embargoed=True, assets__versions__dandiset=dandiset)
+        .distinct()
+        .order_by('id')
     )
+    while chunk := list(
+        embargoed_blobs.filter(id__gt=checkpoint.asset_blob_id).values_list('id', 'blob')[
+            :TAG_REMOVAL_CHUNK_SIZE
+        ]
+    ):
+        _untag_objects(
+            executor, untag, [blob for _, blob in chunk], 'Some assets failed to remove tags'
+        )
+        checkpoint.asset_blob_id = chunk[-1][0]
+        checkpoint.save(update_fields=['asset_blob_id', 'modified'])
+
+
+def _remove_zarr_tags(
+    dandiset: Dandiset,
+    checkpoint: UnembargoCheckpoint,
+    executor: ThreadPoolExecutor,
+    untag: Callable[..., None],
+    client: S3Client,
+) -> None:
+    # zarrs have no embargoed flag themselves and so are all included
+    zarrs = list(
+        ZarrArchive.objects.filter(
+            assets__versions__dandiset=dandiset, id__gt=checkpoint.zarr_archive_id
+        )
+        .distinct()
+        .order_by('id')
+        .values_list('id', 'zarr_id')
+    )
+    paginator = client.get_paginator('list_objects_v2')
+    for zarr_archive_id, zarr_id in zarrs:
+        pages = paginator.paginate(
+            Bucket=ZarrArchive.storage.bucket_name,
+            Prefix=zarr_s3_path(zarr_id=str(zarr_id)),
+            StartAfter=checkpoint.zarr_key,
+        )
+        for page in pages:
+            keys = [obj['Key'] for obj in page.get('Contents', [])]
+            if not keys:
+                continue
+            _untag_objects(executor, untag, keys, 'Some zarr files failed to remove tags')
+            checkpoint.zarr_key = keys[-1]
+            checkpoint.save(update_fields=['zarr_key', 'modified'])
 
-    # Chunk the blobs so we're never storing a list of all embargoed blobs
-    chunks = chunked(embargoed_assets, TAG_REMOVAL_CHUNK_SIZE)
-    for chunk in chunks:
-        futures = []
-
-        # Constant low thread number to limit memory usage, as each thread
-        # creates its own boto client, consuming memory in the process
-        with ThreadPoolExecutor(max_workers=4) as e:
-            for blob, zarr in chunk:
-                if blob is not None:
-                    futures.append(e.submit(_delete_object_tags, blob=blob))
-                if zarr is not None:
-                    futures.append(e.submit(_delete_zarr_object_tags, zarr=zarr))
-
-        # Check if any failed and raise exception if so
-        failed = [blob for i, blob in enumerate(chunk) if futures[i].exception() is not None]
-        if failed:
-            raise AssetTagRemovalError('Some assets failed to remove tags', blobs=failed)
+        checkpoint.zarr_archive_id = zarr_archive_id
+        checkpoint.zarr_key = ''
+        checkpoint.save(update_fields=['zarr_archive_id', 'zarr_key', 'modified'])
+
+
+def remove_dandiset_embargo_tags(dandiset: Dandiset):
+    """
+    Remove the embargoed tag from every object of a dandiset.
+
+    Every object is untagged by the same pool of threads, which share a single S3 client. Progress
+    is recorded in the `UnembargoCheckpoint` of the dandiset after each batch of objects, so that
+    if this is interrupted, calling it again carries on from where it got to.
+    """
+    checkpoint, _ = UnembargoCheckpoint.objects.get_or_create(dandiset=dandiset)
+    if not checkpoint.manifests_untagged:
+        _remove_dandiset_manifest_tags(dandiset=dandiset)
+        checkpoint.manifests_untagged = True
+        checkpoint.save(update_fields=['manifests_untagged', 'modified'])
+
+    workers = settings.DANDI_UNEMBARGO_TAG_WORKERS
+    client = default_storage.create_shared_s3_client(max_pool_connections=workers)
+    untag = partial(_delete_object_tags, client, default_storage.bucket_name)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        _remove_asset_blob_tags(dandiset, checkpoint, executor, untag)
+        _remove_zarr_tags(dandiset, checkpoint, executor, untag, client)
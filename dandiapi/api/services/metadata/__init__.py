@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import json
 from typing import TYPE_CHECKING
 
 from celery.utils.log import get_task_logger
 from dandischema.conf import get_instance_config
 import dandischema.exceptions
-from dandischema.metadata import aggregate_assets_summary, validate
+from dandischema.metadata import validate
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models.query_utils import Q
 from django.utils import timezone
 
+from dandiapi.api.assets_summary import (
+    add_valid_assets_to_summaries,
+    get_assets_summary,
+    update_asset_validity,
+)
+from dandiapi.api.dandiset_listing import touch_dandiset_listings
 from dandiapi.api.models import Asset, Version
 from dandiapi.api.services.metadata.exceptions import (
     AssetHasBeenPublishedError,
@@ -18,12 +25,28 @@ from dandiapi.api.services.metadata.exceptions import (
     VersionMetadataConcurrentlyModifiedError,
 )
 from dandiapi.api.services.publish import _build_publishable_version_from_draft
+from dandiapi.search.documents import refresh_version_search_documents
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     import jsonschema.exceptions
 
 logger = get_task_logger(__name__)
 
+# Apply the results of validating a batch of assets, unless they were modified in the meantime
+_UPDATE_ASSET_VALIDATION_SQL = """
+UPDATE {asset_table} AS asset
+SET status = result.status, validation_errors = result.errors::jsonb
+FROM unnest(%(ids)s::bigint[], %(metadata)s::text[], %(statuses)s::text[], %(errors)s::text[])
+    AS result(id, metadata, status, errors)
+WHERE asset.id = result.id
+    AND asset.status = %(pending)s
+    AND asset.metadata = result.metadata::jsonb
+    AND NOT asset.published
+RETURNING asset.id
+"""
+
 
 def _encode_pydantic_error(error) -> dict[str, str]:
     return {'field': error['loc'][0], 'message': error['msg']}
@@ -45,6 +68,22 @@ def _collect_validation_errors(
     return [encoder(error) for error in error.errors]
 
 
+def _get_asset_validation_result(asset: Asset) -> tuple[Asset.Status, list[dict[str, str]]]:
+    try:
+        metadata = asset.published_metadata()
+        validate(metadata, schema_key='PublishedAsset', json_validation=True)
+    except dandischema.exceptions.ValidationError as e:
+        logger.info('Error while validating asset %s', asset.id)
+        return (Asset.Status.INVALID, _collect_validation_errors(e))
+    except ValueError as e:
+        # A bare ValueError is thrown when dandischema generates its own exceptions, like a
+        # mismatched schemaVersion.
+        return (Asset.Status.INVALID, [{'field': '', 'message': str(e)}])
+
+    logger.info('Successfully validated asset %s', asset.id)
+    return (Asset.Status.VALID, [])
+
+
 def validate_asset_metadata(*, asset: Asset) -> bool:
     logger.info('Validating asset metadata for asset %s', asset.id)
 
@@ -56,46 +95,91 @@ def validate_asset_metadata(*, asset: Asset) -> bool:
     asset_state = asset.status
 
     with transaction.atomic():
-        try:
-            metadata = asset.published_metadata()
-            validate(metadata, schema_key='PublishedAsset', json_validation=True)
-            logger.info('Successfully validated asset %s', asset.id)
-            asset.status = Asset.Status.VALID
-            asset.validation_errors = []
-        except dandischema.exceptions.ValidationError as e:
-            logger.info('Error while validating asset %s', asset.id)
-            asset.status = Asset.Status.INVALID
-
-            validation_errors = _collect_validation_errors(e)
-            asset.validation_errors = validation_errors
-        except ValueError as e:
-            # A bare ValueError is thrown when dandischema generates its own exceptions, like a
-            # mismatched schemaVersion.
-            asset.status = Asset.Status.INVALID
-            asset.validation_errors = [{'field': '', 'message': str(e)}]
+        asset.status, asset.validation_errors = _get_asset_validation_result(asset)
 
         updated_asset = Asset.objects.filter(
             id=asset.id, status=asset_state, metadata=asset.metadata, published=False
         ).update(status=asset.status, validation_errors=asset.validation_errors)
         if updated_asset:
             # Update modified timestamps on all draft versions this asset belongs to
-            asset.versions.filter(version='draft').update(modified=timezone.now())
+            draft_versions = asset.versions.filter(version='draft')
+            draft_versions.update(modified=timezone.now())
+            touch_dandiset_listings(draft_versions)
+
+            # With the draft versions locked, count the asset in their assetsSummary if it
+            # became VALID, or stop counting it if it no longer is
+            update_asset_validity(asset, was_valid=asset_state == Asset.Status.VALID)
         else:
             logger.info('Asset %s was modified while validating', asset.id)
 
         return updated_asset
 
 
+def validate_asset_metadata_batch(asset_ids: Iterable[int]) -> int:
+    """
+    Validate the metadata of a batch of PENDING assets, returning how many were updated.
+
+    Like `validate_asset_metadata`, an asset is only updated if it wasn't modified while being
+    validated.
+    """
+    assets = list(
+        Asset.objects.filter(id__in=asset_ids, status=Asset.Status.PENDING, published=False)
+        .select_related('blob', 'zarr', 'zarr__dandiset')
+        .order_by('id')
+    )
+    if not assets:
+        return 0
+
+    # Validate before opening the transaction, so that no locks are held while doing so
+    results = [_get_asset_validation_result(asset) for asset in assets]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            _UPDATE_ASSET_VALIDATION_SQL.format(asset_table=Asset._meta.db_table),
+            {
+                'pending': Asset.Status.PENDING,
+                'ids': [asset.id for asset in assets],
+                'metadata': [json.dumps(asset.metadata) for asset in assets],
+                'statuses': [status for status, _ in results],
+                'errors': [json.dumps(errors) for _, errors in results],
+            },
+        )
+        updated_ids = {row[0] for row in cursor.fetchall()}
+        if not updated_ids:
+            return 0
+
+        # Lock the draft versions in a consistent order, to avoid deadlocking with other batches
+        draft_versions = Version.objects.filter(
+            version='draft', assets__id__in=updated_ids
+        ).distinct()
+        locked_version_ids = list(
+            Version.objects.select_for_update()
+            .filter(id__in=draft_versions.values('id'))
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        Version.objects.filter(id__in=locked_version_ids).update(modified=timezone.now())
+        touch_dandiset_listings(Version.objects.filter(id__in=locked_version_ids))
+
+        # Every updated asset was PENDING, so only the ones that became VALID need to be counted
+        add_valid_assets_to_summaries(
+            asset
+            for asset, (status, _) in zip(assets, results, strict=True)
+            if asset.id in updated_ids and status == Asset.Status.VALID
+        )
+
+    if len(updated_ids) < len(assets):
+        logger.info('%s assets were modified while validating', len(assets) - len(updated_ids))
+
+    return len(updated_ids)
+
+
 def version_aggregate_assets_summary(version: Version) -> None:
     if version.version != 'draft':
         raise VersionHasBeenPublishedError
 
-    assets_summary = aggregate_assets_summary(
-        asset.full_metadata
-        for asset in version.assets.filter(status=Asset.Status.VALID)
-        .select_related('blob', 'zarr', 'zarr__dandiset')
-        .iterator()
-    )
+    # The summary is maintained incrementally, so this doesn't need to scan the assets
+    assets_summary = get_assets_summary(version)
 
     updated_metadata = {**version.metadata, 'assetsSummary': assets_summary}
 
@@ -106,6 +190,9 @@ def version_aggregate_assets_summary(version: Version) -> None:
         logger.info('Skipped updating assetsSummary for version %s', version.id)
         raise VersionMetadataConcurrentlyModifiedError
 
+    touch_dandiset_listings(Version.objects.filter(id=version.id))
+    refresh_version_search_documents([version.id])
+
 
 def validate_version_metadata(*, version: Version) -> None:
     def _build_validatable_version_metadata(version: Version) -> dict:
@@ -189,3 +276,4 @@ def validate_version_metadata(*, version: Version) -> None:
         version_qs.update(status=Version.Status.VALIDATING)
         status, errors = _get_version_validation_result(current_version)
         version_qs.update(status=status, validation_errors=errors, modified=timezone.now())
+        touch_dandiset_listings(version_qs)
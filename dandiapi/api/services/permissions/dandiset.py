@@ -1,23 +1,139 @@
-"""Abstracts over django guardian to provide an internal permission framework."""
+"""
+Abstracts over django guardian to provide an internal permission framework.
+
+Within an `ownership_cache` block, such as a request, the IDs of the dandisets owned by a user are
+loaded once, and every later ownership check of that user is answered from memory. When the Django
+cache is shared by every process (such as Redis), the owned IDs and the embargo status of
+dandisets are also kept there, so that they are only queried again once they change. A cache
+local to each process isn't used for these, as a change made by one process couldn't be seen by
+the caches of the others.
+"""
 
 from __future__ import annotations
 
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import wraps
 import typing
 
 from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
 from django.db import transaction
 from django.db.models import Q, QuerySet
+from django.http import HttpResponseForbidden
+from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
-from guardian.decorators import permission_required
 from guardian.shortcuts import assign_perm, get_objects_for_user, get_users_with_perms
 
 from dandiapi.api.models.dandiset import Dandiset, DandisetUserObjectPermission
 
 if typing.TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
     from django.contrib.auth.base_user import AbstractBaseUser
+    from django.core.cache.backends.base import BaseCache
 
     from dandiapi.api.models.asset import Asset
 
+# Entries are invalidated whenever they change, so this only bounds the damage of a missed change
+_SHARED_CACHE_TIMEOUT = timedelta(minutes=10).total_seconds()
+
+# The IDs of the dandisets owned by each user, keyed by user ID, while ownership is being cached
+_owned_dandiset_ids: ContextVar[dict[int, frozenset[int]] | None] = ContextVar(
+    'owned_dandiset_ids', default=None
+)
+
+
+def _shared_cache() -> BaseCache | None:
+    """Return the default cache if every process shares it, or `None` otherwise."""
+    cache = caches['default']
+    if isinstance(cache, LocMemCache | DummyCache):
+        return None
+    return cache
+
+
+def _owned_dandiset_ids_key(user_id: int) -> str:
+    return f'owned-dandiset-ids:{user_id}'
+
+
+def _embargo_status_key(dandiset_id: int) -> str:
+    return f'dandiset-embargo-status:{dandiset_id}'
+
+
+def _delete_from_shared_cache(keys: list[str]) -> None:
+    cache = _shared_cache()
+    if cache is None:
+        return
+
+    # Delete again once committed, in case the old value was cached again in the meantime
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@contextmanager
+def ownership_cache() -> Iterator[None]:
+    """Cache the dandisets owned by each user until the end of the block."""
+    token = _owned_dandiset_ids.set({})
+    try:
+        yield
+    finally:
+        _owned_dandiset_ids.reset(token)
+
+
+def _invalidate_ownership_cache(user_ids: Iterable[int]) -> None:
+    owned_dandiset_ids = _owned_dandiset_ids.get()
+    if owned_dandiset_ids is not None:
+        owned_dandiset_ids.clear()
+    _delete_from_shared_cache([_owned_dandiset_ids_key(user_id) for user_id in user_ids])
+
+
+def _load_owned_dandiset_ids(user: User) -> frozenset[int]:
+    cache = _shared_cache()
+    key = _owned_dandiset_ids_key(user.pk)
+    ids: frozenset[int] | None = None if cache is None else cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            get_objects_for_user(user, 'owner', Dandiset, with_superuser=False).values_list(
+                'pk', flat=True
+            )
+        )
+        if cache is not None:
+            cache.set(key, ids, _SHARED_CACHE_TIMEOUT)
+    return ids
+
+
+def _get_owned_dandiset_ids(user: User) -> frozenset[int] | None:
+    """Return the IDs of the dandisets owned by a user, or `None` if ownership isn't cached."""
+    owned_dandiset_ids = _owned_dandiset_ids.get()
+    if owned_dandiset_ids is None:
+        return None
+
+    if user.pk not in owned_dandiset_ids:
+        owned_dandiset_ids[user.pk] = _load_owned_dandiset_ids(user)
+    return owned_dandiset_ids[user.pk]
+
+
+def get_dandiset_embargo_status(dandiset_id: int) -> str | None:
+    """Return the embargo status of a dandiset, or `None` if it doesn't exist."""
+    cache = _shared_cache()
+    key = _embargo_status_key(dandiset_id)
+    embargo_status: str | None = None if cache is None else cache.get(key)
+    if embargo_status is None:
+        embargo_status = (
+            Dandiset.objects.filter(pk=dandiset_id).values_list('embargo_status', flat=True).first()
+        )
+        if cache is not None and embargo_status is not None:
+            cache.set(key, embargo_status, _SHARED_CACHE_TIMEOUT)
+    return embargo_status
+
+
+def invalidate_dandiset_embargo_status(dandiset_id: int) -> None:
+    """Forget the cached embargo status of a dandiset, after it changed."""
+    _delete_from_shared_cache([_embargo_status_key(dandiset_id)])
+
 
 def get_dandiset_owners(dandiset: Dandiset) -> QuerySet[User]:
     qs = typing.cast('QuerySet[User]', get_users_with_perms(dandiset, only_with_perms_in=['owner']))
@@ -26,6 +142,7 @@ def get_dandiset_owners(dandiset: Dandiset) -> QuerySet[User]:
 
 def add_dandiset_owner(dandiset: Dandiset, user: User):
     assign_perm('owner', user, dandiset)
+    _invalidate_ownership_cache([user.pk])
 
 
 def replace_dandiset_owners(dandiset: Dandiset, users: list[User]):
@@ -39,6 +156,8 @@ def replace_dandiset_owners(dandiset: Dandiset, users: list[User]):
             content_object=dandiset.pk, permission__codename='owner'
         ).delete()
 
+        _invalidate_ownership_cache(user.pk for user in existing_owner_set)
+
         # Set owners to new list
         for user in users:
             add_dandiset_owner(dandiset, user)
@@ -54,7 +173,14 @@ def is_dandiset_owner(dandiset: Dandiset, user: AbstractBaseUser | AnonymousUser
         return False
 
     user = typing.cast('User', user)
-    return user.has_perm('owner', dandiset)
+    owned_dandiset_ids = _get_owned_dandiset_ids(user)
+    if owned_dandiset_ids is None:
+        return user.has_perm('owner', dandiset)
+
+    # Mirror the checks made by has_perm
+    if not user.is_active:
+        return False
+    return user.is_superuser or dandiset.pk in owned_dandiset_ids
 
 
 def is_owned_asset(asset: Asset, user: AbstractBaseUser | AnonymousUser) -> bool:
@@ -63,6 +189,10 @@ def is_owned_asset(asset: Asset, user: AbstractBaseUser | AnonymousUser) -> bool
         return False
 
     user = typing.cast('User', user)
+    owned_dandiset_ids = _get_owned_dandiset_ids(user)
+    if owned_dandiset_ids is not None:
+        return asset.versions.filter(dandiset_id__in=owned_dandiset_ids).exists()
+
     asset_dandisets = Dandiset.objects.filter(versions__in=asset.versions.all())
     asset_dandisets_owned_by_user = DandisetUserObjectPermission.objects.filter(
         content_object__in=asset_dandisets,
@@ -77,7 +207,20 @@ def get_owned_dandisets(
     user: AbstractBaseUser | AnonymousUser,
     include_superusers=True,  # noqa: FBT002
 ) -> QuerySet[Dandiset]:
-    return get_objects_for_user(user, 'owner', Dandiset, with_superuser=include_superusers)
+    if user.is_anonymous:
+        # Anonymous users own nothing, but guardian needs a query to find out
+        if _owned_dandiset_ids.get() is not None:
+            return Dandiset.objects.none()
+        return get_objects_for_user(user, 'owner', Dandiset, with_superuser=include_superusers)
+
+    user = typing.cast('User', user)
+    owned_dandiset_ids = _get_owned_dandiset_ids(user)
+    if owned_dandiset_ids is None:
+        return get_objects_for_user(user, 'owner', Dandiset, with_superuser=include_superusers)
+
+    if include_superusers and user.is_superuser:
+        return Dandiset.objects.all()
+    return Dandiset.objects.filter(pk__in=owned_dandiset_ids)
 
 
 def get_visible_dandisets(user: AbstractBaseUser | AnonymousUser) -> QuerySet[Dandiset]:
@@ -111,8 +254,15 @@ def require_dandiset_owner_or_403(pk_path: str):
 
     The `pk_path` argument is the Dandiset ID URL path variable that DRF passes into the request.
     """
-    return method_decorator(
-        permission_required(
-            perm='owner', lookup_variables=(Dandiset, 'pk', pk_path), return_403=True
-        )
-    )
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            dandiset = get_object_or_404(Dandiset, pk=kwargs[pk_path])
+            if not is_dandiset_owner(dandiset, request.user):
+                return HttpResponseForbidden()
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return method_decorator(decorator)
@@ -11,7 +11,7 @@ from django.db import transaction
 from more_itertools import ichunked
 
 from dandiapi.api import doi
-from dandiapi.api.asset_paths import add_version_asset_paths
+from dandiapi.api.asset_paths import copy_version_asset_paths
 from dandiapi.api.models import Asset, Dandiset, Version
 from dandiapi.api.services import audit
 from dandiapi.api.services.exceptions import NotAllowedError
@@ -25,6 +25,7 @@ from dandiapi.api.services.publish.exceptions import (
     DandisetValidationPendingError,
 )
 from dandiapi.api.tasks import write_manifest_files
+from dandiapi.search.asset_search import sync_asset_search
 
 if TYPE_CHECKING:
     from django.db.models import QuerySet
@@ -148,15 +149,19 @@ def _publish_dandiset(dandiset_id: int, user_id: int) -> None:
             )
 
         draft_assets: QuerySet[Asset] = old_version.assets.filter(published=False)
+        # Only the draft assets change, so only their search rows need updating
+        draft_asset_ids: list[int] = []
 
         # Batch bulk creates to avoid blowing up memory when there are a lot of assets
         for asset_ids_batch in ichunked(
             draft_assets.values_list('id', flat=True).iterator(), 5_000
         ):
+            asset_ids = list(asset_ids_batch)
+            draft_asset_ids.extend(asset_ids)
             AssetVersions.objects.bulk_create(
                 [
                     AssetVersions(asset_id=asset_id, version_id=new_version.id)
-                    for asset_id in asset_ids_batch
+                    for asset_id in asset_ids
                 ]
             )
 
@@ -164,6 +169,9 @@ def _publish_dandiset(dandiset_id: int, user_id: int) -> None:
         for draft_asset in draft_assets.iterator():
             publish_asset(asset=draft_asset)
 
+        # Publishing changes the metadata of the draft assets
+        sync_asset_search(old_version.dandiset_id, draft_asset_ids)
+
         # Since all assets in new_version are published, their metadata is already compliant,
         # and there is no need to use `.full_metadata`
         new_version.metadata['assetsSummary'] = aggregate_assets_summary(
@@ -171,8 +179,9 @@ def _publish_dandiset(dandiset_id: int, user_id: int) -> None:
         )
         new_version.save()
 
-        # Add asset paths with new version
-        add_version_asset_paths(version=new_version)
+        # The new version contains exactly the same assets as the draft, so its asset paths
+        # can be copied directly, rather than rebuilt from scratch
+        copy_version_asset_paths(source=old_version, target=new_version)
 
         # Copy the finalized assetsSummary to the draft version in case it wasn't up to date
         # before starting the publish.
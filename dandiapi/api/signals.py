@@ -3,11 +3,12 @@ from __future__ import annotations
 from allauth.account.signals import user_signed_up
 from corsheaders.signals import check_request_enabled
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from rest_framework.authtoken.models import Token
 
-from dandiapi.api.models import UserMetadata
+from dandiapi.api.models import Dandiset, UserMetadata
+from dandiapi.api.services.permissions.dandiset import invalidate_dandiset_embargo_status
 
 
 @receiver(check_request_enabled, dispatch_uid='cors_allow_anyone_read_only')
@@ -31,3 +32,10 @@ def user_signed_up_listener(*, sender, user, **kwargs):
     else:
         status = UserMetadata.Status.INCOMPLETE
     UserMetadata.objects.get_or_create(user=user, status=status)
+
+
+@receiver(post_save, sender=Dandiset, dispatch_uid='invalidate_saved_dandiset_embargo_status')
+@receiver(post_delete, sender=Dandiset, dispatch_uid='invalidate_deleted_dandiset_embargo_status')
+def invalidate_embargo_status(*, sender, instance, **kwargs):
+    """Forget the cached embargo status of a dandiset whenever it is saved or deleted."""
+    invalidate_dandiset_embargo_status(instance.pk)
@@ -9,13 +9,7 @@ from django.contrib.auth.models import User
 
 from dandiapi.api.doi import delete_doi
 from dandiapi.api.mail import send_dandiset_unembargo_failed_message
-from dandiapi.api.manifests import (
-    write_assets_jsonld,
-    write_assets_yaml,
-    write_collection_jsonld,
-    write_dandiset_jsonld,
-    write_dandiset_yaml,
-)
+from dandiapi.api.manifests import write_manifests
 from dandiapi.api.models import Asset, AssetBlob, Version
 from dandiapi.api.models.dandiset import Dandiset
 
@@ -55,11 +49,7 @@ def write_manifest_files(version_id: int) -> None:
     version: Version = Version.objects.get(id=version_id)
     logger.info('Writing manifests for version %s:%s', version.dandiset.identifier, version.version)
 
-    write_dandiset_yaml(version)
-    write_assets_yaml(version)
-    write_dandiset_jsonld(version)
-    write_assets_jsonld(version)
-    write_collection_jsonld(version)
+    write_manifests(version)
 
 
 @shared_task(soft_time_limit=10)
@@ -73,6 +63,13 @@ def validate_asset_metadata_task(asset_id: int) -> None:
         logger.debug('Asset %s not found or already validated', asset_id)
 
 
+@shared_task(soft_time_limit=60)
+def validate_asset_metadata_batch_task(asset_ids: list[int]) -> None:
+    from dandiapi.api.services.metadata import validate_asset_metadata_batch
+
+    validate_asset_metadata_batch(asset_ids)
+
+
 @shared_task(soft_time_limit=30)
 def validate_version_metadata_task(version_id: int) -> None:
     from dandiapi.api.services.metadata import validate_version_metadata
@@ -93,8 +90,13 @@ def publish_dandiset_task(dandiset_id: int, user_id: int):
     _publish_dandiset(dandiset_id=dandiset_id, user_id=user_id)
 
 
-@shared_task(soft_time_limit=1200)
-def unembargo_dandiset_task(dandiset_id: int, user_id: int):
+# Removing the tags of a large dandiset can take many times the time limit of a single run, but
+# progress is checkpointed, so each retry carries on from where the last one got to
+UNEMBARGO_MAX_RETRIES = 100
+
+
+@shared_task(bind=True, soft_time_limit=1200, max_retries=UNEMBARGO_MAX_RETRIES)
+def unembargo_dandiset_task(self, dandiset_id: int, user_id: int):
     from dandiapi.api.services.embargo import unembargo_dandiset
 
     ds = Dandiset.objects.get(pk=dandiset_id)
@@ -103,6 +105,12 @@ def unembargo_dandiset_task(dandiset_id: int, user_id: int):
     # If the unembargo fails for any reason, send an email, but continue the error propagation
     try:
         unembargo_dandiset(ds, user)
+    except SoftTimeLimitExceeded as e:
+        if self.request.retries < self.max_retries:
+            logger.info('Unembargo of dandiset %s timed out, resuming', ds.identifier)
+            raise self.retry(exc=e, countdown=0) from e
+        send_dandiset_unembargo_failed_message(ds)
+        raise
     except Exception:
         send_dandiset_unembargo_failed_message(ds)
         raise
@@ -16,11 +16,13 @@ from celery.schedules import crontab
 from celery.utils.log import get_task_logger
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import connection
 from django.db.models.query_utils import Q
+from django.utils import timezone
+from more_itertools import chunked
 
+from dandiapi.api.assets_summary import reconcile_assets_summary
 from dandiapi.api.mail import send_pending_users_message
-from dandiapi.api.models import UserMetadata, Version
+from dandiapi.api.models import UserMetadata, Version, VersionAssetsSummary
 from dandiapi.api.models.asset import Asset
 from dandiapi.api.models.dandiset import Dandiset
 from dandiapi.api.models.stats import ApplicationStats
@@ -28,7 +30,7 @@ from dandiapi.api.services.garbage_collection import garbage_collect
 from dandiapi.api.services.metadata import version_aggregate_assets_summary
 from dandiapi.api.services.metadata.exceptions import VersionMetadataConcurrentlyModifiedError
 from dandiapi.api.tasks import (
-    validate_asset_metadata_task,
+    validate_asset_metadata_batch_task,
     validate_version_metadata_task,
     write_manifest_files,
 )
@@ -41,6 +43,13 @@ if TYPE_CHECKING:
 
 logger = get_task_logger(__name__)
 
+# The number of assets validated by each task
+VALIDATE_ASSET_METADATA_BATCH_SIZE = 100
+
+# How far back the daily reconciliation of assetsSummary totals looks for modified drafts, which
+# overlaps the previous run in case it was late
+RECONCILE_ASSETS_SUMMARIES_WINDOW = timedelta(days=1, hours=1)
+
 
 def throttled_iterator(iterable: Iterable, max_per_second: int = 100) -> Iterable:
     """
@@ -64,6 +73,27 @@ def aggregate_assets_summary_task(version_id: int):
     version_aggregate_assets_summary(version)
 
 
+@shared_task(soft_time_limit=600)
+def reconcile_assets_summary_task(version_id: int):
+    version = Version.objects.get(id=version_id)
+    reconcile_assets_summary(version)
+
+
+@shared_task(soft_time_limit=60)
+def reconcile_assets_summaries():
+    """Check the stored assetsSummary totals of recently modified drafts against their assets."""
+    # The totals can only drift when the assets of a version change, which modifies it
+    modified_since = timezone.now() - RECONCILE_ASSETS_SUMMARIES_WINDOW
+    for version_id in (
+        VersionAssetsSummary.objects.filter(
+            version__version='draft', version__modified__gte=modified_since
+        )
+        .values_list('version_id', flat=True)
+        .iterator()
+    ):
+        reconcile_assets_summary_task.delay(version_id)
+
+
 @shared_task(soft_time_limit=30)
 def validate_pending_asset_metadata():
     validatable_assets = (
@@ -81,8 +111,10 @@ def validate_pending_asset_metadata():
     validatable_assets_count = validatable_assets.count()
     if validatable_assets_count > 0:
         logger.info('Found %s assets to validate', validatable_assets_count)
-        for asset_id in throttled_iterator(validatable_assets.iterator()):
-            validate_asset_metadata_task.delay(asset_id)
+        for asset_ids in throttled_iterator(
+            chunked(validatable_assets.iterator(), VALIDATE_ASSET_METADATA_BATCH_SIZE)
+        ):
+            validate_asset_metadata_batch_task.delay(asset_ids)
     else:
         logger.debug('Found no assets to validate')
 
@@ -117,30 +149,6 @@ def send_pending_users_email() -> None:
         send_pending_users_message(pending_users)
 
 
-REFRESH_MATERIALIZED_VIEW_TIMEOUT = timedelta(minutes=3).total_seconds()
-
-
-@shared_task(soft_time_limit=REFRESH_MATERIALIZED_VIEW_TIMEOUT)
-def refresh_materialized_view_search() -> None:
-    """
-    Execute a REFRESH MATERIALIZED VIEW query to update the view used by asset search.
-
-    Note that this is a "concurrent" refresh, which means that the view will be
-    updated without locking the table.
-    """
-    with connection.cursor() as cursor:
-        # This query may take a long time, so we explicitly set a timeout with
-        # postgres that is slightly less (5 seconds) than the Celery soft_time_limit to
-        # avoid it running too long.
-        # Note that setting Celery time limits alone is not sufficient. If the task times out,
-        # Celery will stop the Python execution, but not the DB query.
-        cursor.execute('BEGIN;')
-        statement_timeout = (REFRESH_MATERIALIZED_VIEW_TIMEOUT * 1000) - 5000
-        cursor.execute('SET LOCAL statement_timeout = %s;', [statement_timeout])
-        cursor.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY asset_search;')
-        cursor.execute('COMMIT;')
-
-
 @shared_task(soft_time_limit=60)
 def garbage_collection() -> None:
     garbage_collect()
@@ -177,8 +185,8 @@ def register_scheduled_tasks(sender: Celery, **kwargs):
     # Send daily email to admins containing a list of users awaiting approval
     sender.add_periodic_task(crontab(hour=0, minute=0), send_pending_users_email.s())
 
-    # Refresh the materialized view used by asset search every 10 mins.
-    sender.add_periodic_task(timedelta(minutes=10), refresh_materialized_view_search.s())
+    # Check that the incrementally maintained assetsSummary totals haven't drifted once a day
+    sender.add_periodic_task(crontab(hour=3, minute=0), reconcile_assets_summaries.s())
 
     # Refresh the application stats every 6 hours
     sender.add_periodic_task(timedelta(hours=6), compute_application_stats.s())
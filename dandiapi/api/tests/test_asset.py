@@ -1,17 +1,22 @@
 from __future__ import annotations
 
 import json
+from urllib.parse import urlparse, urlunparse
 from uuid import uuid4
 
 from dandischema.models import AccessType
 from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 import pytest
 import requests
 
+from dandiapi.api.asset_metadata import AssetMetadataAssembler
 from dandiapi.api.asset_paths import add_asset_paths, extract_paths
-from dandiapi.api.models import Asset, Version
+from dandiapi.api.models import Asset, AuditRecord, Version
 from dandiapi.api.models.asset_paths import AssetPath
 from dandiapi.api.models.dandiset import Dandiset
 from dandiapi.api.services.asset import add_asset_to_version
@@ -24,6 +29,8 @@ from dandiapi.api.tests.factories import (
     PublishedVersionFactory,
     UserFactory,
 )
+from dandiapi.api.views.asset import NestedAssetViewSet
+from dandiapi.storage import PresignedUrlCache
 from dandiapi.zarr.models import ZarrArchiveStatus
 from dandiapi.zarr.tasks import ingest_zarr_archive
 from dandiapi.zarr.tests.factories import ZarrArchiveFactory
@@ -110,6 +117,11 @@ def test_asset_s3_url(asset_blob):
     assert signed_url.split('?')[0] == s3_url
 
 
+@pytest.mark.parametrize('name', ['blobs/abc/def/foo', 'blobs/a b/c+d~e%f=g.nwb', 'zarr/ünï/0.0'])
+def test_storage_unsigned_url(name):
+    assert default_storage.unsigned_url(name) == default_storage.url(name).split('?')[0]
+
+
 @pytest.mark.django_db
 def test_publish_asset(draft_asset: Asset):
     draft_asset_id = draft_asset.asset_id
@@ -272,6 +284,51 @@ def test_asset_full_metadata_access(
     ]
 
 
+@pytest.mark.django_db
+def test_asset_metadata_assembler(draft_asset_factory, asset_blob_factory, mocker):
+    raw_metadata = {'foo': 'bar', 'schemaVersion': settings.DANDI_SCHEMA_VERSION}
+    assets = [
+        draft_asset_factory(metadata=raw_metadata, blob=asset_blob_factory()) for _ in range(3)
+    ]
+    assets.append(
+        draft_asset_factory(metadata=raw_metadata, blob=None, zarr=ZarrArchiveFactory.create())
+    )
+
+    def expected_metadata(asset: Asset) -> dict:
+        # Build the metadata the way each asset built it before it was batched
+        if asset.blob is not None:
+            signed_url = asset.blob.blob.url
+        else:
+            signed_url = asset.zarr.storage.url(asset.zarr.s3_path(''))
+        parsed = urlparse(signed_url)
+        metadata = {
+            **raw_metadata,
+            'id': f'dandiasset:{asset.asset_id}',
+            'access': [{'schemaKey': 'AccessRequirements', 'status': AccessType.OpenAccess.value}],
+            'path': asset.path,
+            'identifier': str(asset.asset_id),
+            'contentUrl': [
+                settings.DANDI_API_URL
+                + reverse('asset-download', kwargs={'asset_id': str(asset.asset_id)}),
+                urlunparse((parsed[0], parsed[1], parsed[2], '', '', '')),
+            ],
+            'contentSize': asset.size,
+            'digest': asset.digest,
+            '@context': f'https://raw.githubusercontent.com/dandi/schema/master/releases/{settings.DANDI_SCHEMA_VERSION}/context.json',
+        }
+        if asset.zarr is not None:
+            metadata['encodingFormat'] = 'application/x-zarr'
+        return metadata
+
+    expected = [expected_metadata(asset) for asset in assets]
+    assert expected[-1]['encodingFormat'] == 'application/x-zarr'
+
+    # None of the assets needs a presigned URL
+    url = mocker.spy(default_storage, 'url')
+    assert list(AssetMetadataAssembler().iter_full_metadata(assets)) == expected
+    assert not url.called
+
+
 # API Tests
 
 
@@ -439,6 +496,59 @@ def test_asset_rest_list_ordering(api_client, version, asset_factory, order_para
     assert result_paths == ordering
 
 
+@pytest.mark.django_db
+def test_asset_rest_export(api_client, version, asset_factory, monkeypatch):
+    # Use a tiny chunk size so that the export spans several chunks
+    monkeypatch.setattr(NestedAssetViewSet, 'EXPORT_CHUNK_SIZE', 2)
+    assets = [asset_factory(path=path) for path in ['b', 'a/c', 'a/b', 'c', 'a']]
+    version.assets.add(*assets)
+
+    r = api_client.get(
+        f'/api/dandisets/{version.dandiset.identifier}/versions/{version.version}/assets/export/'
+    )
+    assert r.status_code == 200
+    assert r['Content-Type'] == 'application/x-ndjson'
+
+    lines = b''.join(r.streaming_content).decode().splitlines()
+    exported = [json.loads(line) for line in lines]
+    assert [asset['path'] for asset in exported] == ['a', 'a/b', 'a/c', 'b', 'c']
+    assert all('metadata' not in asset for asset in exported)
+
+
+@pytest.mark.django_db
+def test_asset_rest_export_include_metadata(api_client, version, asset, asset_factory):
+    version.assets.add(asset)
+
+    r = api_client.get(
+        f'/api/dandisets/{version.dandiset.identifier}/versions/{version.version}/assets/export/',
+        {'metadata': True},
+    )
+    (line,) = b''.join(r.streaming_content).decode().splitlines()
+    exported = json.loads(line)
+    assert exported['asset_id'] == str(asset.asset_id)
+    assert exported['metadata'] == asset.full_metadata
+
+
+@pytest.mark.django_db
+def test_asset_rest_export_embargoed(api_client, draft_asset_factory, embargoed_asset_blob):
+    owner = UserFactory.create()
+    version = DraftVersionFactory.create(
+        dandiset__embargo_status=Dandiset.EmbargoStatus.EMBARGOED, dandiset__owners=[owner]
+    )
+    version.assets.add(draft_asset_factory(blob=embargoed_asset_blob))
+    url = f'/api/dandisets/{version.dandiset.identifier}/versions/{version.version}/assets/export/'
+
+    assert api_client.get(url).status_code == 401
+
+    api_client.force_authenticate(user=UserFactory.create())
+    assert api_client.get(url).status_code == 403
+
+    api_client.force_authenticate(user=owner)
+    r = api_client.get(url)
+    assert r.status_code == 200
+    assert len(b''.join(r.streaming_content).splitlines()) == 1
+
+
 @pytest.mark.parametrize(
     ('order_param', 'expected_order'),
     [
@@ -596,6 +706,20 @@ def test_asset_rest_retrieve(api_client, version, asset, asset_factory):
     )
 
 
+@pytest.mark.django_db
+def test_asset_rest_retrieve_conditional(api_client, published_version, published_asset):
+    published_version.assets.add(published_asset)
+    url = f'/api/assets/{published_asset.asset_id}/'
+
+    resp = api_client.get(url)
+    assert resp.status_code == 200
+    assert 'immutable' in resp['Cache-Control']
+
+    resp = api_client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+    assert resp.status_code == 304
+    assert 'immutable' in resp['Cache-Control']
+
+
 @pytest.mark.django_db
 def test_asset_rest_retrieve_no_sha256(api_client, version, asset):
     version.assets.add(asset)
@@ -1704,6 +1828,215 @@ def test_asset_rest_delete_published_version(api_client, asset):
     assert response.data == 'Only draft versions can be modified.'
 
 
+@pytest.mark.django_db
+def test_asset_rest_batch(api_client, draft_asset_factory, asset_blob_factory):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    api_client.force_authenticate(user=user)
+
+    updated_asset = draft_asset_factory(path='foo/updated.txt')
+    deleted_asset = draft_asset_factory(path='bar/deleted.txt')
+    for asset in [updated_asset, deleted_asset]:
+        draft_version.assets.add(asset)
+        add_asset_paths(asset, draft_version)
+
+    asset_blob = asset_blob_factory()
+    operations = [
+        {
+            'action': 'create',
+            'metadata': {'path': 'foo/created.txt'},
+            'blob_id': asset_blob.blob_id,
+        },
+        {
+            'action': 'update',
+            'asset_id': updated_asset.asset_id,
+            'metadata': {'path': 'foo/renamed.txt'},
+            'blob_id': asset_blob.blob_id,
+        },
+        {'action': 'delete', 'asset_id': deleted_asset.asset_id},
+        # The path of the deleted asset is free to be used again
+        {'action': 'create', 'metadata': {'path': 'bar'}, 'blob_id': asset_blob.blob_id},
+    ]
+    resp = api_client.post(
+        f'/api/dandisets/{draft_version.dandiset.identifier}'
+        f'/versions/{draft_version.version}/assets/batch/',
+        {'operations': operations},
+        format='json',
+    )
+    assert resp.status_code == 200
+    results = resp.json()['results']
+    assert [result['status'] for result in results] == [200, 200, 204, 200]
+    assert results[0]['asset']['path'] == 'foo/created.txt'
+    assert results[1]['asset']['path'] == 'foo/renamed.txt'
+    assert results[1]['asset']['asset_id'] != str(updated_asset.asset_id)
+
+    assert set(draft_version.assets.values_list('path', flat=True)) == {
+        'foo/created.txt',
+        'foo/renamed.txt',
+        'bar',
+    }
+    assert set(AssetPath.objects.filter(version=draft_version).values_list('path', flat=True)) == {
+        'foo',
+        'foo/created.txt',
+        'foo/renamed.txt',
+        'bar',
+    }
+    foo = AssetPath.objects.get(version=draft_version, path='foo')
+    assert foo.aggregate_files == 2
+    assert foo.aggregate_size == 2 * asset_blob.size
+
+    # The version is revalidated once for all of the changes
+    draft_version.refresh_from_db()
+    assert draft_version.status == Version.Status.PENDING
+
+    assert list(
+        AuditRecord.objects.filter(dandiset_id=draft_version.dandiset.id)
+        .order_by('id')
+        .values_list('record_type', 'details__path')
+    ) == [
+        ('add_asset', 'foo/created.txt'),
+        ('update_asset', 'foo/renamed.txt'),
+        ('remove_asset', 'bar/deleted.txt'),
+        ('add_asset', 'bar'),
+    ]
+
+
+@pytest.mark.django_db
+def test_asset_rest_batch_failures(api_client, draft_asset_factory, asset_blob):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    api_client.force_authenticate(user=user)
+
+    existing_asset = draft_asset_factory(path='foo/bar.txt')
+    draft_version.assets.add(existing_asset)
+    add_asset_paths(existing_asset, draft_version)
+
+    operations = [
+        # Conflicts with an existing asset
+        {'action': 'create', 'metadata': {'path': 'foo/bar.txt'}, 'blob_id': asset_blob.blob_id},
+        {'action': 'create', 'metadata': {'path': 'foo'}, 'blob_id': asset_blob.blob_id},
+        # Conflicts with an asset created earlier in the same batch
+        {'action': 'create', 'metadata': {'path': 'baz'}, 'blob_id': asset_blob.blob_id},
+        {'action': 'create', 'metadata': {'path': 'baz/qux'}, 'blob_id': asset_blob.blob_id},
+        # Invalid operations
+        {'action': 'create', 'metadata': {'path': '/invalid'}, 'blob_id': asset_blob.blob_id},
+        {'action': 'update', 'metadata': {'path': 'foo/bar.txt'}, 'blob_id': asset_blob.blob_id},
+        {
+            'action': 'create',
+            'asset_id': existing_asset.asset_id,
+            'metadata': {'path': 'foo/bar.txt'},
+            'blob_id': asset_blob.blob_id,
+        },
+        {'action': 'delete', 'asset_id': str(uuid4())},
+        {'action': 'create', 'metadata': {'path': 'new'}, 'blob_id': str(uuid4())},
+        # Deleting the same asset twice only succeeds once
+        {'action': 'delete', 'asset_id': existing_asset.asset_id},
+        {'action': 'delete', 'asset_id': existing_asset.asset_id},
+    ]
+    resp = api_client.post(
+        f'/api/dandisets/{draft_version.dandiset.identifier}'
+        f'/versions/{draft_version.version}/assets/batch/',
+        {'operations': operations},
+        format='json',
+    )
+    assert resp.status_code == 200
+    results = resp.json()['results']
+    assert [result['status'] for result in results] == [
+        409,
+        409,
+        200,
+        409,
+        400,
+        400,
+        400,
+        404,
+        404,
+        204,
+        404,
+    ]
+    assert results[6]['detail'] == {
+        'asset_id': ['An asset_id must not be specified to create an asset.']
+    }
+    assert results[1]['detail'] == (
+        'Path of new asset "foo" conflicts with existing assets: [\'foo/bar.txt\']'
+    )
+
+    assert list(draft_version.assets.values_list('path', flat=True)) == ['baz']
+    assert list(AssetPath.objects.filter(version=draft_version).values_list('path', flat=True)) == [
+        'baz'
+    ]
+
+
+@pytest.mark.django_db
+def test_asset_rest_batch_constant_queries(api_client, asset_blob, django_assert_max_num_queries):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    api_client.force_authenticate(user=user)
+
+    def create_many(prefix: str, count: int):
+        return api_client.post(
+            f'/api/dandisets/{draft_version.dandiset.identifier}'
+            f'/versions/{draft_version.version}/assets/batch/',
+            {
+                'operations': [
+                    {
+                        'action': 'create',
+                        'metadata': {'path': f'{prefix}/{i}/file.txt'},
+                        'blob_id': asset_blob.blob_id,
+                    }
+                    for i in range(count)
+                ]
+            },
+            format='json',
+        )
+
+    with CaptureQueriesContext(connection) as few:
+        assert create_many('few', 2).status_code == 200
+    with django_assert_max_num_queries(len(few)):
+        assert create_many('many', 50).status_code == 200
+
+    assert draft_version.assets.count() == 52
+
+
+@pytest.mark.django_db
+def test_asset_rest_batch_not_an_owner(api_client, asset_blob):
+    api_client.force_authenticate(user=UserFactory.create())
+    draft_version = DraftVersionFactory.create()
+
+    resp = api_client.post(
+        f'/api/dandisets/{draft_version.dandiset.identifier}'
+        f'/versions/{draft_version.version}/assets/batch/',
+        {
+            'operations': [
+                {'action': 'create', 'metadata': {'path': 'a'}, 'blob_id': asset_blob.blob_id}
+            ]
+        },
+        format='json',
+    )
+    assert resp.status_code == 403
+    assert not draft_version.assets.exists()
+
+
+@pytest.mark.django_db
+def test_asset_rest_batch_published_version(api_client, asset_blob):
+    user = UserFactory.create()
+    published_version = PublishedVersionFactory.create(dandiset__owners=[user])
+    api_client.force_authenticate(user=user)
+
+    resp = api_client.post(
+        f'/api/dandisets/{published_version.dandiset.identifier}'
+        f'/versions/{published_version.version}/assets/batch/',
+        {
+            'operations': [
+                {'action': 'create', 'metadata': {'path': 'a'}, 'blob_id': asset_blob.blob_id}
+            ]
+        },
+        format='json',
+    )
+    assert resp.status_code == 405
+    assert resp.data == 'Only draft versions can be modified.'
+
+
 @pytest.mark.django_db
 def test_asset_download(api_client, version, asset):
     version.assets.add(asset)
@@ -1761,6 +2094,44 @@ def test_asset_download_embargo(
         assert download.content == reader.read()
 
 
+@pytest.mark.django_db
+def test_asset_download_cached_url(api_client, asset, mocker):
+    url = mocker.spy(default_storage, 'url')
+
+    def download(content_disposition: str) -> str:
+        response = api_client.get(
+            f'/api/assets/{asset.asset_id}/download/', {'content_disposition': content_disposition}
+        )
+        assert response.status_code == 302
+        return response['Location']
+
+    # Repeated downloads reuse the same presigned URL
+    assert download('attachment') == download('attachment')
+    assert url.call_count == 1
+
+    assert download('inline') != download('attachment')
+    assert url.call_count == 2
+
+
+def test_presigned_url_cache(mocker):
+    monotonic = mocker.patch('dandiapi.storage.time.monotonic', return_value=0)
+    cache = PresignedUrlCache(maxsize=2, ttl=10)
+
+    assert cache.get_or_create('a', lambda: 'a1') == 'a1'
+    assert cache.get_or_create('a', lambda: 'a2') == 'a1'
+
+    # The least recently used URL is evicted first
+    cache.get_or_create('b', lambda: 'b1')
+    cache.get_or_create('a', lambda: 'a3')
+    cache.get_or_create('c', lambda: 'c1')
+    assert cache.get_or_create('a', lambda: 'a4') == 'a1'
+    assert cache.get_or_create('b', lambda: 'b2') == 'b2'
+
+    # URLs expire after the TTL
+    monotonic.return_value = 10
+    assert cache.get_or_create('a', lambda: 'a5') == 'a5'
+
+
 @pytest.mark.django_db
 def test_asset_download_zarr(api_client, version, asset_factory):
     zarr_archive = ZarrArchiveFactory.create()
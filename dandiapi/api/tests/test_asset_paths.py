@@ -6,8 +6,10 @@ import pytest
 
 from dandiapi.api.asset_paths import (
     add_asset_paths,
+    add_asset_paths_many,
     add_version_asset_paths,
     delete_asset_paths,
+    delete_asset_paths_many,
     extract_paths,
     get_root_paths,
     get_root_paths_many,
@@ -22,6 +24,21 @@ from dandiapi.api.tasks import publish_dandiset_task
 from dandiapi.api.tests.factories import DraftVersionFactory, UserFactory
 
 
+def _path_tree(version: Version):
+    """Return the paths and relations of a version, in a form comparable across versions."""
+    paths = set(
+        AssetPath.objects.filter(version=version).values_list(
+            'path', 'asset', 'aggregate_files', 'aggregate_size'
+        )
+    )
+    relations = set(
+        AssetPathRelation.objects.filter(parent__version=version).values_list(
+            'parent__path', 'child__path', 'depth'
+        )
+    )
+    return paths, relations
+
+
 @pytest.fixture
 def ingested_asset(asset_factory) -> Asset:
     asset: Asset = asset_factory()
@@ -182,6 +199,59 @@ def test_asset_path_add_version_asset_paths_idempotent(asset_factory):
         assert path.aggregate_size == path.asset.size
 
 
+@pytest.mark.django_db
+def test_asset_path_add_version_asset_paths_matches_add_asset_paths(asset_factory):
+    version: Version = DraftVersionFactory.create()
+    bulk_version: Version = DraftVersionFactory.create()
+    for path in ['a/b/c.txt', 'a/b/d.txt', 'a/e.txt', 'f/g/h/i.txt', 'j.txt']:
+        asset = asset_factory(path=path)
+        version.assets.add(asset)
+        bulk_version.assets.add(asset)
+        add_asset_paths(asset, version)
+
+    add_version_asset_paths(bulk_version)
+
+    assert _path_tree(bulk_version) == _path_tree(version)
+
+
+@pytest.mark.django_db
+def test_asset_path_add_delete_asset_paths_many(asset_factory):
+    version: Version = DraftVersionFactory.create()
+    bulk_version: Version = DraftVersionFactory.create()
+    assets = [
+        asset_factory(path=path)
+        for path in ['a/b/c.txt', 'a/b/d.txt', 'a/e.txt', 'f/g/h/i.txt', 'j.txt']
+    ]
+    for asset in assets:
+        version.assets.add(asset)
+        bulk_version.assets.add(asset)
+        add_asset_paths(asset, version)
+
+    add_asset_paths_many(assets[:2], bulk_version)
+    add_asset_paths_many(assets[2:], bulk_version)
+    assert _path_tree(bulk_version) == _path_tree(version)
+
+    for asset in assets[1:4]:
+        delete_asset_paths(asset, version)
+    delete_asset_paths_many(assets[1:4], bulk_version)
+    assert _path_tree(bulk_version) == _path_tree(version)
+
+
+@pytest.mark.django_db
+def test_asset_path_add_version_asset_paths_constant_queries(
+    asset_factory, django_assert_max_num_queries
+):
+    version: Version = DraftVersionFactory.create()
+    for i in range(20):
+        version.assets.add(asset_factory(path=f'foo/{i}/bar.txt'))
+
+    # The number of queries must not depend on the number of assets
+    with django_assert_max_num_queries(10):
+        add_version_asset_paths(version)
+
+    assert AssetPath.objects.get(version=version, path='foo').aggregate_files == 20
+
+
 @pytest.mark.django_db
 def test_asset_path_add_asset_shared_paths(asset_factory):
     # Create asset with version
@@ -333,6 +403,28 @@ def test_asset_path_publish_version(asset_factory):
         AssetPath.objects.get(path=path, version=published_version)
 
 
+@pytest.mark.django_db
+def test_asset_path_publish_version_copies_tree(draft_asset_factory):
+    user = UserFactory.create()
+    version: Version = DraftVersionFactory.create(status=Version.Status.PUBLISHING)
+    for path in ['foo/bar/a.txt', 'foo/bar/b.txt', 'foo/c.txt', 'd.txt']:
+        asset = draft_asset_factory(path=path, status=Asset.Status.VALID)
+        version.assets.add(asset)
+        add_asset_paths(asset, version)
+
+    publish_dandiset_task(version.dandiset.id, user.id)
+
+    published_version = version.dandiset.versions.exclude(version='draft').get()
+    assert _path_tree(published_version) == _path_tree(version)
+
+    # The copied relations must only reference paths of the published version
+    assert (
+        not AssetPathRelation.objects.filter(parent__version=published_version)
+        .exclude(child__version=published_version)
+        .exists()
+    )
+
+
 @pytest.mark.django_db
 def test_asset_path_get_root_paths(asset_factory):
     version = DraftVersionFactory.create()
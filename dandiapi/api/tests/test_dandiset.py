@@ -12,6 +12,7 @@ import pytest
 
 from dandiapi.api.asset_paths import add_asset_paths, add_version_asset_paths
 from dandiapi.api.models import Dandiset, Version
+from dandiapi.api.services.dandiset import star_dandiset, unstar_dandiset
 from dandiapi.api.services.permissions.dandiset import (
     get_dandiset_owners,
     get_visible_dandisets,
@@ -1308,6 +1309,32 @@ def test_dandiset_rest_search_multiple_words_and_logic(api_client):
     assert len(results) == 0
 
 
+@pytest.mark.django_db
+def test_dandiset_rest_search_order_relevance(api_client):
+    one_match = DraftVersionFactory.create()
+    one_match.metadata['description'] = 'Recordings of the mouse hippocampus'
+    one_match.save()
+    many_matches = DraftVersionFactory.create()
+    many_matches.metadata['description'] = 'Hippocampal recordings, across the hippocampus'
+    many_matches.save()
+
+    results = api_client.get(
+        '/api/dandisets/', {'search': 'hippocamp', 'ordering': 'relevance'}
+    ).data['results']
+    assert [result['identifier'] for result in results] == [
+        many_matches.dandiset.identifier,
+        one_match.dandiset.identifier,
+    ]
+
+    results = api_client.get(
+        '/api/dandisets/', {'search': 'hippocamp', 'ordering': '-relevance'}
+    ).data['results']
+    assert [result['identifier'] for result in results] == [
+        one_match.dandiset.identifier,
+        many_matches.dandiset.identifier,
+    ]
+
+
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     'contributors',
@@ -1529,6 +1556,45 @@ def test_dandiset_list_order_size(api_client, asset_factory):
     ]
 
 
+@pytest.mark.django_db
+def test_dandiset_list_order_stars(api_client):
+    users = [UserFactory.create() for _ in range(3)]
+    dandisets: list[Dandiset] = [
+        DraftVersionFactory.create(dandiset__starred_by=users[:i]).dandiset for i in range(3)
+    ]
+    unstar_dandiset(user=users[0], dandiset=dandisets[2])
+    star_dandiset(user=users[2], dandiset=dandisets[0])
+    star_dandiset(user=users[2], dandiset=dandisets[0])
+
+    # The star counts are now 1, 1 and 1, so break the tie
+    star_dandiset(user=users[2], dandiset=dandisets[2])
+
+    response = api_client.get('/api/dandisets/', {'ordering': '-stars'})
+    assert response.status_code == 200
+    assert response.data['results'][0]['identifier'] == dandisets[2].identifier
+    assert [d.listing.star_count for d in Dandiset.objects.order_by('id')] == [1, 1, 2]
+
+
+@pytest.mark.django_db
+def test_dandiset_listing_follows_latest_version(draft_version, asset_factory):
+    dandiset = draft_version.dandiset
+    asset = asset_factory(blob__size=100)
+    draft_version.assets.add(asset)
+    add_asset_paths(asset=asset, version=draft_version)
+
+    dandiset.listing.refresh_from_db()
+    assert dandiset.listing.latest_version == draft_version
+    assert dandiset.listing.name == draft_version.name
+    assert dandiset.listing.size == 100
+
+    published_version = PublishedVersionFactory.create(dandiset=dandiset, name='published')
+    dandiset.listing.refresh_from_db()
+    assert dandiset.listing.latest_version == published_version
+    assert dandiset.listing.name == 'published'
+    assert dandiset.listing.modified == published_version.modified
+    assert dandiset.listing.size == 0
+
+
 @pytest.mark.django_db
 def test_dandiset_list_starred_unauthenticated(api_client):
     response = api_client.get('/api/dandisets/', {'starred': True})
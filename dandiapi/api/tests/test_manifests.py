@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
-
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 import pytest
@@ -15,14 +13,12 @@ from dandiapi.api.manifests import (
     write_collection_jsonld,
     write_dandiset_jsonld,
     write_dandiset_yaml,
+    write_manifests,
 )
 from dandiapi.api.models import Version
 from dandiapi.api.models.dandiset import Dandiset
 from dandiapi.api.tests.factories import DraftVersionFactory
 
-if TYPE_CHECKING:
-    from dandiapi.api.models import Version
-
 
 @pytest.mark.parametrize(
     'embargo_status', [Dandiset.EmbargoStatus.OPEN, Dandiset.EmbargoStatus.EMBARGOED]
@@ -140,3 +136,79 @@ def test_write_assets_yaml_already_exists(version: Version, asset_factory):
 
     with default_storage.open(assets_yaml_path) as f:
         assert f.read() == expected
+
+
+@pytest.mark.django_db
+def test_write_manifests(version: Version, asset_factory):
+    version.assets.add(asset_factory(), asset_factory())
+    assets = list(version.assets.all())
+
+    write_manifests(version)
+
+    manifests_path = f'dandisets/{version.dandiset.identifier}/{version.version}'
+    expected = {
+        'dandiset.jsonld': JSONRenderer().render(version.metadata),
+        'dandiset.yaml': YAMLRenderer().render(version.metadata),
+        'assets.jsonld': JSONRenderer().render([asset.full_metadata for asset in assets]),
+        'assets.yaml': YAMLRenderer().render([asset.full_metadata for asset in assets]),
+        'collection.jsonld': JSONRenderer().render(
+            {
+                '@context': version.metadata['@context'],
+                'id': version.metadata['id'],
+                '@type': 'prov:Collection',
+                'hasMember': [asset.full_metadata['id'] for asset in assets],
+            }
+        ),
+    }
+    for name, contents in expected.items():
+        with default_storage.open(f'{manifests_path}/{name}') as f:
+            assert f.read() == contents
+
+    version.refresh_from_db()
+    assert set(version.manifest_checksums) == {f'{manifests_path}/{name}' for name in expected}
+
+
+@pytest.mark.django_db
+def test_write_manifests_skips_unchanged(version: Version, asset_factory, mocker):
+    version.assets.add(asset_factory())
+    version.refresh_from_db()
+    write_manifests(version)
+
+    upload_file = mocker.patch('dandiapi.api.manifests._upload_file')
+    write_manifests(version)
+    upload_file.assert_not_called()
+
+    # Only the manifests which list the assets are changed by adding one
+    version.assets.add(asset_factory())
+    write_manifests(version)
+    manifests_path = f'dandisets/{version.dandiset.identifier}/{version.version}'
+    assert {call.args[0] for call in upload_file.call_args_list} == {
+        f'{manifests_path}/assets.jsonld',
+        f'{manifests_path}/assets.yaml',
+        f'{manifests_path}/collection.jsonld',
+    }
+
+
+@pytest.mark.django_db
+def test_write_manifests_checksums_not_stale(version: Version, asset_factory, mocker):
+    asset = asset_factory()
+    write_manifests(version)
+    stale = Version.objects.get(id=version.id)
+    version.assets.add(asset)
+    write_manifests(version)
+
+    # Saving a version loaded before the manifests were last written keeps their checksums
+    stale.name = 'New name'
+    stale.save()
+    version.refresh_from_db()
+    assert version.name == 'New name'
+    assert version.manifest_checksums != stale.manifest_checksums
+
+    # The stale checksums match the manifests without the asset, but they aren't trusted
+    version.assets.remove(asset)
+    upload_file = mocker.patch('dandiapi.api.manifests._upload_file')
+    write_manifests(stale)
+    manifests_path = f'dandisets/{version.dandiset.identifier}/{version.version}'
+    assert f'{manifests_path}/assets.jsonld' in {
+        call.args[0] for call in upload_file.call_args_list
+    }
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from django.conf import settings
 import pytest
 
+from dandiapi.api.services.asset import add_asset_to_version
+from dandiapi.api.tests.factories import DraftVersionFactory, UserFactory
+
 
 @pytest.mark.django_db
 def test_asset_pagination(api_client, version, asset_factory):
@@ -33,3 +37,108 @@ def test_asset_pagination(api_client, version, asset_factory):
 
     # Assert full list is ordered the same as both paginated lists
     assert full_page == page_one + page_two
+
+
+def _walk_cursor_pages(api_client, endpoint, params) -> list[dict]:
+    """Follow the `next` links of a cursor paginated endpoint, returning each page."""
+    pages = [api_client.get(endpoint, {**params, 'cursor': ''}).json()]
+    while pages[-1]['next'] is not None:
+        pages.append(api_client.get(pages[-1]['next']).json())
+    return pages
+
+
+@pytest.mark.parametrize('order', ['created', '-created', 'path', '-path'])
+@pytest.mark.django_db
+def test_asset_cursor_pagination(api_client, version, asset_factory, order):
+    endpoint = f'/api/dandisets/{version.dandiset.identifier}/versions/{version.version}/assets/'
+
+    # Give some assets the same path prefix, so that a page boundary falls between them
+    for i in range(7):
+        version.assets.add(asset_factory(path=f'{i % 2}/{i}.txt'))
+
+    pages = _walk_cursor_pages(api_client, endpoint, {'order': order, 'page_size': 3})
+    assert [len(page['results']) for page in pages] == [3, 3, 1]
+    assert pages[0]['count'] == 7
+    assert all(page['count'] is None for page in pages[1:])
+    assert all(page['previous'] is None for page in pages)
+
+    # The concatenated pages must match the offset paginated listing
+    full_page = api_client.get(endpoint, {'order': order, 'page_size': 100}).json()['results']
+    assert [asset for page in pages for asset in page['results']] == full_page
+
+
+@pytest.mark.django_db
+def test_asset_cursor_pagination_invalid_cursor(api_client, version, asset_factory):
+    endpoint = f'/api/dandisets/{version.dandiset.identifier}/versions/{version.version}/assets/'
+    version.assets.add(asset_factory())
+
+    assert api_client.get(endpoint, {'cursor': 'not-a-cursor'}).status_code == 404
+
+
+@pytest.mark.django_db
+def test_asset_paths_cursor_pagination(api_client, asset_blob_factory):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    endpoint = (
+        f'/api/dandisets/{draft_version.dandiset.identifier}'
+        f'/versions/{draft_version.version}/assets/paths/'
+    )
+    for path in ['b.txt', 'a/1.txt', 'c/2.txt', 'a.txt', 'd.txt']:
+        add_asset_to_version(
+            user=user,
+            version=draft_version,
+            asset_blob=asset_blob_factory(),
+            metadata={'path': path, 'schemaVersion': settings.DANDI_SCHEMA_VERSION},
+        )
+
+    pages = _walk_cursor_pages(api_client, endpoint, {'path_prefix': '', 'page_size': 2})
+    paths = [path['path'] for page in pages for path in page['results']]
+    assert paths == ['a', 'a.txt', 'b.txt', 'c', 'd.txt']
+
+
+@pytest.mark.django_db
+def test_atpath_cursor_pagination(api_client, asset_blob_factory):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    for path in ['foo/b.txt', 'foo/a.txt', 'foo/bar/c.txt', 'baz.txt']:
+        add_asset_to_version(
+            user=user,
+            version=draft_version,
+            asset_blob=asset_blob_factory(),
+            metadata={'path': path, 'schemaVersion': settings.DANDI_SCHEMA_VERSION},
+        )
+
+    pages = _walk_cursor_pages(
+        api_client,
+        '/api/webdav/assets/atpath/',
+        {
+            'dandiset_id': draft_version.dandiset.identifier,
+            'version_id': draft_version.version,
+            'path': 'foo',
+            'children': True,
+            'page_size': 2,
+        },
+    )
+    paths = [result['resource']['path'] for page in pages for result in page['results']]
+    assert paths == ['foo', 'foo/a.txt', 'foo/b.txt', 'foo/bar']
+
+
+@pytest.mark.parametrize('ordering', [None, 'id', '-id'])
+@pytest.mark.django_db
+def test_dandiset_cursor_pagination(api_client, ordering):
+    DraftVersionFactory.create_batch(5)
+
+    params = {'page_size': 2} if ordering is None else {'page_size': 2, 'ordering': ordering}
+    pages = _walk_cursor_pages(api_client, '/api/dandisets/', params)
+    assert pages[0]['count'] == 5
+
+    full_page = api_client.get('/api/dandisets/', {**params, 'page_size': 100}).json()['results']
+    assert [dandiset for page in pages for dandiset in page['results']] == full_page
+
+
+@pytest.mark.django_db
+def test_dandiset_cursor_pagination_unsupported_ordering(api_client):
+    DraftVersionFactory.create()
+
+    resp = api_client.get('/api/dandisets/', {'cursor': '', 'ordering': 'name'})
+    assert resp.status_code == 400
@@ -1,8 +1,21 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.test import override_settings
 import pytest
 from rest_framework.permissions import SAFE_METHODS
 
+from dandiapi.api.models import Dandiset
+from dandiapi.api.services.permissions.dandiset import (
+    add_dandiset_owner,
+    get_dandiset_embargo_status,
+    get_owned_dandisets,
+    is_dandiset_owner,
+    ownership_cache,
+    replace_dandiset_owners,
+)
 from dandiapi.api.tests.factories import DandisetFactory, DraftVersionFactory, UserFactory
 
 
@@ -113,3 +126,104 @@ def test_approved_or_readonly(
 
     # The client is now authenticated but not an owner, so all response codes should be 403
     assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_ownership_cache(django_assert_num_queries):
+    user = UserFactory.create()
+    owned_dandiset, other_dandiset = DandisetFactory.create_batch(2)
+    add_dandiset_owner(owned_dandiset, user)
+
+    with ownership_cache():
+        # Owned dandisets are loaded once, by the first check
+        with django_assert_num_queries(1):
+            assert is_dandiset_owner(owned_dandiset, user)
+            assert not is_dandiset_owner(other_dandiset, user)
+        assert list(get_owned_dandisets(user)) == [owned_dandiset]
+
+        # Changing the owners invalidates the cache
+        replace_dandiset_owners(other_dandiset, [user])
+        assert is_dandiset_owner(other_dandiset, user)
+        assert set(get_owned_dandisets(user)) == {owned_dandiset, other_dandiset}
+
+
+@pytest.fixture
+def shared_cache(tmp_path):
+    # Files are shared by every process on a machine, so this stands in for a cache such as Redis
+    backend = 'django.core.cache.backends.filebased.FileBasedCache'
+    with override_settings(CACHES={'default': {'BACKEND': backend, 'LOCATION': str(tmp_path)}}):
+        yield
+
+
+def _in_other_process(func):
+    """Call a function with its own database connection and cache, as another process would."""
+
+    def run():
+        try:
+            func()
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(run).result()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('shared_cache')
+def test_ownership_cache_shared(django_assert_num_queries):
+    user = UserFactory.create()
+    dandiset, other_dandiset = DandisetFactory.create_batch(2)
+    add_dandiset_owner(dandiset, user)
+
+    with ownership_cache():
+        assert is_dandiset_owner(dandiset, user)
+
+    # Later requests reuse the owned dandisets of the first one
+    with ownership_cache(), django_assert_num_queries(0):
+        assert is_dandiset_owner(dandiset, user)
+        assert not is_dandiset_owner(other_dandiset, user)
+
+    # Changes of owners made by another process are seen by the next request
+    _in_other_process(lambda: replace_dandiset_owners(dandiset, []))
+    _in_other_process(lambda: replace_dandiset_owners(other_dandiset, [user]))
+    with ownership_cache():
+        assert not is_dandiset_owner(dandiset, user)
+        assert is_dandiset_owner(other_dandiset, user)
+
+
+@pytest.mark.django_db
+def test_ownership_cache_local(django_assert_num_queries):
+    user = UserFactory.create()
+    dandiset = DandisetFactory.create(
+        owners=[user], embargo_status=Dandiset.EmbargoStatus.EMBARGOED
+    )
+
+    with ownership_cache():
+        assert is_dandiset_owner(dandiset, user)
+        assert get_dandiset_embargo_status(dandiset.id) == Dandiset.EmbargoStatus.EMBARGOED
+
+    # A cache local to each process would miss the invalidations of the others, so it isn't used
+    with ownership_cache(), django_assert_num_queries(2):
+        assert is_dandiset_owner(dandiset, user)
+        assert get_dandiset_embargo_status(dandiset.id) == Dandiset.EmbargoStatus.EMBARGOED
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures('shared_cache')
+def test_dandiset_embargo_status_cache(django_assert_num_queries):
+    user = UserFactory.create()
+    dandiset = DandisetFactory.create(
+        owners=[user], embargo_status=Dandiset.EmbargoStatus.EMBARGOED
+    )
+
+    assert get_dandiset_embargo_status(dandiset.id) == Dandiset.EmbargoStatus.EMBARGOED
+    with django_assert_num_queries(0):
+        assert get_dandiset_embargo_status(dandiset.id) == Dandiset.EmbargoStatus.EMBARGOED
+
+    # A change of embargo status made by another process is seen by this one
+    def unembargo():
+        dandiset.embargo_status = Dandiset.EmbargoStatus.UNEMBARGOING
+        dandiset.save()
+
+    _in_other_process(unembargo)
+    assert get_dandiset_embargo_status(dandiset.id) == Dandiset.EmbargoStatus.UNEMBARGOING
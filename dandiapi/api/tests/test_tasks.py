@@ -17,7 +17,9 @@ from zarr_checksum.checksum import EMPTY_CHECKSUM
 from zarr_checksum.generators import ZarrArchiveFile
 
 from dandiapi.api import tasks
-from dandiapi.api.models import Asset, Version
+from dandiapi.api.assets_summary import get_assets_summary
+from dandiapi.api.models import Asset, Version, VersionAssetsSummary
+from dandiapi.api.services import metadata as metadata_services
 from dandiapi.api.tests.factories import DraftVersionFactory, UserFactory
 from dandiapi.zarr.models import ZarrArchiveStatus
 
@@ -158,6 +160,60 @@ def test_validate_asset_metadata_saves_version(draft_asset: Asset):
     assert draft_version.modified != old_datetime
 
 
+@pytest.mark.django_db
+def test_validate_asset_metadata_batch(draft_asset_factory):
+    draft_version = DraftVersionFactory.create()
+    valid_asset = draft_asset_factory()
+    invalid_asset = draft_asset_factory()
+    invalid_asset.metadata['schemaVersion'] = 'xxx'
+    invalid_asset.save()
+    draft_version.assets.add(valid_asset, invalid_asset)
+
+    # Update version with queryset so modified isn't auto incremented
+    old_datetime = datetime.datetime.fromtimestamp(1573782390).astimezone(datetime.UTC)
+    Version.objects.filter(id=draft_version.id).update(modified=old_datetime)
+
+    # Build the summary first, so that the valid asset is added to it incrementally
+    assert get_assets_summary(draft_version)['numberOfFiles'] == 0
+
+    tasks.validate_asset_metadata_batch_task([valid_asset.id, invalid_asset.id])
+
+    valid_asset.refresh_from_db()
+    assert valid_asset.status == Asset.Status.VALID
+    assert valid_asset.validation_errors == []
+
+    invalid_asset.refresh_from_db()
+    assert invalid_asset.status == Asset.Status.INVALID
+    assert invalid_asset.validation_errors[0]['message'].startswith(
+        'Metadata version xxx is not allowed.'
+    )
+
+    draft_version.refresh_from_db()
+    assert draft_version.modified != old_datetime
+    # The stored totals were updated in place, rather than rebuilt when read
+    assert VersionAssetsSummary.objects.get(version=draft_version).number_of_files == 1
+    assert get_assets_summary(draft_version)['numberOfFiles'] == 1
+
+
+@pytest.mark.django_db
+def test_validate_asset_metadata_batch_concurrently_modified(draft_asset: Asset, mocker):
+    validation_result = metadata_services._get_asset_validation_result
+
+    def modify_while_validating(asset: Asset):
+        Asset.objects.filter(id=asset.id).update(metadata={**asset.metadata, 'foo': 'bar'})
+        return validation_result(asset)
+
+    mocker.patch(
+        'dandiapi.api.services.metadata._get_asset_validation_result',
+        side_effect=modify_while_validating,
+    )
+
+    assert metadata_services.validate_asset_metadata_batch([draft_asset.id]) == 0
+
+    draft_asset.refresh_from_db()
+    assert draft_asset.status == Asset.Status.PENDING
+
+
 @pytest.mark.django_db
 def test_validate_version_metadata(asset: Asset):
     draft_version = DraftVersionFactory.create()
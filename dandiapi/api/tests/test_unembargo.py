@@ -2,11 +2,15 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from celery.exceptions import SoftTimeLimitExceeded
 import dandischema
 from django.core.files.storage import default_storage
 import pytest
 
+from dandiapi.api import assets_summary
+from dandiapi.api.assets_summary import get_assets_summary
 from dandiapi.api.manifests import all_manifest_filepaths
+from dandiapi.api.models import UnembargoCheckpoint
 from dandiapi.api.models.asset import Asset
 from dandiapi.api.models.dandiset import Dandiset
 from dandiapi.api.models.version import Version
@@ -20,7 +24,7 @@ from dandiapi.api.services.embargo.exceptions import (
     DandisetActiveUploadsError,
 )
 from dandiapi.api.services.embargo.utils import (
-    _delete_zarr_object_tags,
+    _delete_object_tags,
     _remove_dandiset_manifest_tags,
     remove_dandiset_embargo_tags,
 )
@@ -132,6 +136,7 @@ def test_remove_dandiset_embargo_tags_chunks(
     delete_asset_blob_tags_mock = mocker.patch(
         'dandiapi.api.services.embargo.utils._delete_object_tags'
     )
+    mocker.patch('dandiapi.api.services.embargo.utils._remove_dandiset_manifest_tags')
     chunk_size = mocker.patch('dandiapi.api.services.embargo.utils.TAG_REMOVAL_CHUNK_SIZE', 2)
 
     draft_version: Version = DraftVersionFactory.create(
@@ -157,6 +162,7 @@ def test_remove_dandiset_embargo_tags_fails_remove_tags(
 ):
     # Patch function to raise error when called
     mocker.patch('dandiapi.api.services.embargo.utils._delete_object_tags', side_effect=ValueError)
+    mocker.patch('dandiapi.api.services.embargo.utils._remove_dandiset_manifest_tags')
 
     # Create dandiset/version and add assets
     draft_version: Version = DraftVersionFactory.create(
@@ -186,17 +192,22 @@ def test_remove_asset_blob_embargoed_tag_fails_on_embargoed(embargoed_asset_blob
 
 
 @pytest.mark.django_db
-def test_delete_zarr_object_tags(zarr_file_factory, mocker):
-    zarr_archive = ZarrArchiveFactory.create()
+def test_remove_dandiset_embargo_tags_zarr(asset_factory, zarr_file_factory, mocker):
     mocked_delete_object_tags = mocker.patch(
         'dandiapi.api.services.embargo.utils._delete_object_tags'
     )
+    mocker.patch('dandiapi.api.services.embargo.utils._remove_dandiset_manifest_tags')
+    draft_version: Version = DraftVersionFactory.create(
+        dandiset__embargo_status=Dandiset.EmbargoStatus.UNEMBARGOING
+    )
+    zarr_archive = ZarrArchiveFactory.create(dandiset=draft_version.dandiset)
+    draft_version.assets.add(asset_factory(zarr=zarr_archive, blob=None))
 
     # Create files
     files = [zarr_file_factory(zarr_archive=zarr_archive) for _ in range(10)]
 
     # This should call the mocked function for each file
-    _delete_zarr_object_tags(zarr=zarr_archive.zarr_id)
+    remove_dandiset_embargo_tags(dandiset=draft_version.dandiset)
 
     assert mocked_delete_object_tags.call_count == len(files)
 
@@ -205,6 +216,67 @@ def test_delete_zarr_object_tags(zarr_file_factory, mocker):
     assert called_blobs == file_bucket_paths
 
 
+@pytest.mark.django_db
+def test_remove_dandiset_embargo_tags_resumes(
+    asset_factory, embargoed_asset_blob_factory, zarr_file_factory, mocker
+):
+    mocker.patch('dandiapi.api.services.embargo.utils.TAG_REMOVAL_CHUNK_SIZE', 2)
+    draft_version: Version = DraftVersionFactory.create(
+        dandiset__embargo_status=Dandiset.EmbargoStatus.UNEMBARGOING
+    )
+    dandiset: Dandiset = draft_version.dandiset
+    blobs = [embargoed_asset_blob_factory() for _ in range(3)]
+    for blob in blobs:
+        draft_version.assets.add(asset_factory(blob=blob))
+    zarr_archive = ZarrArchiveFactory.create(dandiset=dandiset)
+    draft_version.assets.add(asset_factory(zarr=zarr_archive, blob=None))
+    zarr_file = zarr_file_factory(zarr_archive=zarr_archive)
+
+    # Fail on the last asset blob, after the first chunk has been untagged
+    def delete_object_tags(client, bucket, *, blob):
+        if blob == blobs[2].blob.name:
+            raise ValueError
+        _delete_object_tags(client, bucket, blob=blob)
+
+    mocker.patch(
+        'dandiapi.api.services.embargo.utils._delete_object_tags', side_effect=delete_object_tags
+    )
+    with pytest.raises(AssetTagRemovalError):
+        remove_dandiset_embargo_tags(dandiset=dandiset)
+    assert dandiset.unembargo_checkpoint.asset_blob_id == blobs[1].id
+
+    # Carry on from the checkpoint
+    mocked_delete_object_tags = mocker.patch(
+        'dandiapi.api.services.embargo.utils._delete_object_tags', side_effect=_delete_object_tags
+    )
+    remove_dandiset_embargo_tags(dandiset=dandiset)
+    assert [call.kwargs['blob'] for call in mocked_delete_object_tags.mock_calls] == [
+        blobs[2].blob.name,
+        zarr_archive.s3_path(str(zarr_file.path)),
+    ]
+    for blob in blobs:
+        assert blob.blob.storage.get_tags(blob.blob.name) == {}
+
+    checkpoint = UnembargoCheckpoint.objects.get(dandiset=dandiset)
+    assert checkpoint.manifests_untagged
+    assert checkpoint.zarr_archive_id == zarr_archive.id
+
+
+@pytest.mark.django_db
+def test_delete_object_tags_keeps_other_tags(embargoed_asset_blob_factory, mocker):
+    tagged, untagged = embargoed_asset_blob_factory(), embargoed_asset_blob_factory()
+    default_storage.put_tags(tagged.blob.name, {'embargoed': 'true', 'foo': 'bar'})
+    client = default_storage.s3_client
+    put_object_tagging = mocker.spy(client, 'put_object_tagging')
+
+    _delete_object_tags(client, default_storage.bucket_name, blob=tagged.blob.name)
+    _delete_object_tags(client, default_storage.bucket_name, blob=untagged.blob.name)
+    assert default_storage.get_tags(tagged.blob.name) == {'foo': 'bar'}
+    assert default_storage.get_tags(untagged.blob.name) == {}
+    # Tags are only rewritten when there are others to keep
+    assert put_object_tagging.call_count == 1
+
+
 @pytest.mark.django_db
 def test_remove_dandiset_manifest_tags():
     draft_version: Version = DraftVersionFactory.create(
@@ -290,6 +362,75 @@ def test_unembargo_dandiset(
     assert owner_email_set == mailoutbox_to_email_set
 
 
+@pytest.mark.django_db
+def test_unembargo_dandiset_resumes(asset_factory, embargoed_asset_blob_factory, mocker):
+    from dandiapi.api.services import embargo as embargo_service
+
+    mocker.patch.object(embargo_service, 'UNEMBARGO_BATCH_SIZE', 2)
+    user = UserFactory.create()
+    draft_version: Version = DraftVersionFactory.create(
+        dandiset__embargo_status=Dandiset.EmbargoStatus.UNEMBARGOING, dandiset__owners=[user]
+    )
+    dandiset: Dandiset = draft_version.dandiset
+    assets = [
+        asset_factory(blob=embargoed_asset_blob_factory(), status=Asset.Status.VALID)
+        for _ in range(3)
+    ]
+    draft_version.assets.add(*assets)
+    assert get_assets_summary(draft_version)['numberOfFiles'] == 3
+
+    # Fail while resetting the second batch of assets
+    def remove_assets_from_summary(asset_ids, version):
+        if assets[2].id in asset_ids:
+            raise RuntimeError('Summary update failed')
+        assets_summary.remove_assets_from_summary(asset_ids, version)
+
+    mocker.patch.object(
+        embargo_service, 'remove_assets_from_summary', side_effect=remove_assets_from_summary
+    )
+    with pytest.raises(RuntimeError, match='Summary update failed'):
+        unembargo_dandiset(dandiset, user)
+
+    # The stages before it are committed, and so is the first batch
+    checkpoint = UnembargoCheckpoint.objects.get(dandiset=dandiset)
+    assert checkpoint.stage == UnembargoCheckpoint.Stage.ASSETS
+    assert checkpoint.asset_id == assets[1].id
+    assert not any(asset.is_embargoed for asset in draft_version.assets.all())
+    assert [asset.status for asset in draft_version.assets.order_by('id')] == [
+        Asset.Status.PENDING,
+        Asset.Status.PENDING,
+        Asset.Status.VALID,
+    ]
+    dandiset.refresh_from_db()
+    assert dandiset.embargo_status == Dandiset.EmbargoStatus.UNEMBARGOING
+
+    # The reset assets are no longer counted, so revalidating one counts it exactly once
+    assert get_assets_summary(draft_version)['numberOfFiles'] == 1
+    Asset.objects.filter(id=assets[0].id).update(status=Asset.Status.VALID)
+    assets_summary.add_valid_assets_to_summaries([Asset.objects.get(id=assets[0].id)])
+    assert get_assets_summary(draft_version)['numberOfFiles'] == 2
+
+    # Carry on from the checkpoint, without removing the tags again
+    mocker.stopall()
+    remove_tags = mocker.spy(embargo_service, 'remove_dandiset_embargo_tags')
+    unembargo_dandiset(dandiset, user)
+
+    assert not remove_tags.called
+    assert [asset.status for asset in draft_version.assets.order_by('id')] == [
+        Asset.Status.VALID,
+        Asset.Status.PENDING,
+        Asset.Status.PENDING,
+    ]
+    summary = get_assets_summary(draft_version)
+    assert summary['numberOfFiles'] == 1
+    assets_summary.invalidate_assets_summaries(Version.objects.filter(id=draft_version.id))
+    assert get_assets_summary(draft_version) == summary
+
+    dandiset.refresh_from_db()
+    assert dandiset.embargo_status == Dandiset.EmbargoStatus.OPEN
+    assert not UnembargoCheckpoint.objects.filter(dandiset=dandiset).exists()
+
+
 @pytest.mark.django_db
 def test_unembargo_dandiset_validate_version_metadata(asset_factory, mocker):
     from dandiapi.api.services import embargo as embargo_service
@@ -330,3 +471,23 @@ def test_unembargo_dandiset_task_failure(mailoutbox, api_client):
     payload = mailoutbox[0].message().get_payload()[0].get_payload()
     assert draft_version.dandiset.identifier in payload
     assert 'error during the unembargo' in payload
+
+
+@pytest.mark.django_db
+def test_unembargo_dandiset_task_resumes_after_timeout(mailoutbox, mocker):
+    from dandiapi.api.services import embargo as embargo_service
+
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(
+        dandiset__embargo_status=Dandiset.EmbargoStatus.UNEMBARGOING, dandiset__owners=[user]
+    )
+    unembargo = mocker.patch.object(
+        embargo_service, 'unembargo_dandiset', side_effect=[SoftTimeLimitExceeded, None]
+    )
+
+    # Let celery carry out the retry itself, rather than raising it
+    result = unembargo_dandiset_task.apply((draft_version.dandiset.pk, user.id), throw=False)
+
+    assert result.successful()
+    assert unembargo.call_count == 2
+    assert not mailoutbox
@@ -5,13 +5,26 @@ from time import sleep
 from typing import TYPE_CHECKING
 
 from dandischema.conf import get_instance_config
+import dandischema.metadata
+from dandischema.metadata import aggregate_assets_summary
 from dandischema.models import AccessType
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from freezegun import freeze_time
 import pytest
 
+from dandiapi.api.assets_summary import (
+    _asset_stats,
+    get_assets_summary,
+    reconcile_assets_summary,
+)
 from dandiapi.api.models.dandiset import Dandiset
-from dandiapi.api.services.metadata import version_aggregate_assets_summary
+from dandiapi.api.services.asset import add_asset_to_version, remove_asset_from_version
+from dandiapi.api.services.metadata import (
+    validate_asset_metadata,
+    version_aggregate_assets_summary,
+)
 from dandiapi.api.services.metadata.exceptions import VersionMetadataConcurrentlyModifiedError
 from dandiapi.api.tests.factories import (
     DandisetFactory,
@@ -25,8 +38,9 @@ if TYPE_CHECKING:
 
 from dandiapi.api import tasks
 from dandiapi.api.asset_paths import add_version_asset_paths
-from dandiapi.api.models import Asset, Version
+from dandiapi.api.models import Asset, Version, VersionAssetsSummary, VersionAssetsSummaryValue
 from dandiapi.api.services.publish import _build_publishable_version_from_draft
+from dandiapi.api.tasks.scheduled import reconcile_assets_summaries
 from dandiapi.zarr.tasks import ingest_zarr_archive
 
 from .fuzzy import (
@@ -256,6 +270,129 @@ def test_version_aggregate_assets_summary_valid_assets(draft_asset_factory):
     assert draft_version.metadata['assetsSummary']['numberOfFiles'] == 1
 
 
+@pytest.mark.django_db
+def test_version_aggregate_assets_summary_incremental(
+    asset_blob_factory, django_assert_max_num_queries
+):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+
+    # Store the empty summary, so that all further changes are applied incrementally
+    assert get_assets_summary(draft_version)['numberOfFiles'] == 0
+
+    species = {
+        'schemaKey': 'SpeciesType',
+        'identifier': 'http://purl.obolibrary.org/obo/NCBITaxon_10090',
+        'name': 'Mus musculus - House mouse',
+    }
+    assets = [
+        add_asset_to_version(
+            user=user,
+            version=draft_version,
+            asset_blob=asset_blob_factory(),
+            metadata={
+                'path': f'sub-{subject}/sub-{subject}_{name}.nwb',
+                'schemaKey': 'Asset',
+                'schemaVersion': settings.DANDI_SCHEMA_VERSION,
+                'encodingFormat': 'application/x-nwb',
+                'wasAttributedTo': [
+                    {'schemaKey': 'Participant', 'identifier': subject, 'species': species}
+                ],
+            },
+        )
+        for subject, name in [('a', 'one'), ('a', 'two'), ('b', 'one')]
+    ]
+
+    def expected_summary():
+        return aggregate_assets_summary(
+            asset.full_metadata
+            for asset in draft_version.assets.filter(status=Asset.Status.VALID).order_by('id')
+        )
+
+    # Pending assets aren't counted until they are validated
+    assert get_assets_summary(draft_version) == expected_summary()
+    for asset in assets:
+        assert validate_asset_metadata(asset=asset)
+        assert asset.status == Asset.Status.VALID, asset.validation_errors
+    assert get_assets_summary(draft_version)['numberOfSubjects'] == 2
+    assert get_assets_summary(draft_version) == expected_summary()
+
+    remove_asset_from_version(user=user, asset=assets[2], version=draft_version)
+    with django_assert_max_num_queries(2):
+        assets_summary = get_assets_summary(draft_version)
+    assert assets_summary['numberOfSubjects'] == 1
+    assert assets_summary == expected_summary()
+
+
+@pytest.mark.django_db
+def test_version_assets_summary_reconciled(draft_asset_factory):
+    draft_version = DraftVersionFactory.create()
+    draft_version.assets.add(*[draft_asset_factory(status=Asset.Status.VALID) for _ in range(2)])
+    expected_summary = get_assets_summary(draft_version)
+
+    # The version is only locked if the totals seem to have drifted
+    with CaptureQueriesContext(connection) as queries:
+        assert not reconcile_assets_summary(draft_version)
+    assert not any('FOR UPDATE' in query['sql'] for query in queries.captured_queries)
+
+    # Make the totals drift, as a change which wasn't tracked would
+    VersionAssetsSummary.objects.filter(version=draft_version).update(number_of_files=5)
+    VersionAssetsSummaryValue.objects.filter(summary_id=draft_version.id).update(count=3)
+    assert get_assets_summary(draft_version)['numberOfFiles'] == 5
+
+    # Drafts which haven't been modified recently aren't checked
+    modified = draft_version.modified
+    Version.objects.filter(id=draft_version.id).update(
+        modified=modified - datetime.timedelta(days=2)
+    )
+    reconcile_assets_summaries()
+    assert get_assets_summary(draft_version)['numberOfFiles'] == 5
+
+    Version.objects.filter(id=draft_version.id).update(modified=modified)
+    reconcile_assets_summaries()
+    assert get_assets_summary(draft_version) == expected_summary
+    assert not reconcile_assets_summary(draft_version)
+
+
+@pytest.mark.django_db
+def test_asset_stats_match_dandischema():
+    metadata = {
+        'schemaVersion': settings.DANDI_SCHEMA_VERSION,
+        'path': 'sub-a/sub-a_sample-b_ecephys.nwb',
+        'contentSize': 100,
+        'encodingFormat': 'application/x-nwb',
+        'approach': [{'schemaKey': 'ApproachType', 'name': 'electrophysiological approach'}],
+        'variableMeasured': [{'schemaKey': 'PropertyValue', 'value': 'ElectricalSeries'}],
+        'wasAttributedTo': [
+            {
+                'schemaKey': 'Participant',
+                'identifier': 'a_1',
+                'species': {'schemaKey': 'SpeciesType', 'name': 'Mus musculus'},
+            }
+        ],
+        'wasDerivedFrom': [
+            {
+                'schemaKey': 'BioSample',
+                'identifier': 'cell.1',
+                'sampleType': {'schemaKey': 'SampleType', 'name': 'cell'},
+                'wasDerivedFrom': [
+                    {
+                        'schemaKey': 'BioSample',
+                        'identifier': 'slice-2',
+                        'sampleType': {'schemaKey': 'SampleType', 'name': 'slice'},
+                    }
+                ],
+            }
+        ],
+    }
+
+    # The stats are collected by a copy of a private function of dandischema, so check that it
+    # still behaves the same as the original
+    stats: dict = {}
+    dandischema.metadata._add_asset_to_stats(metadata, stats)
+    assert _asset_stats(metadata) == stats
+
+
 @pytest.mark.django_db
 def test_version_valid_with_valid_asset(version, asset):
     version.assets.add(asset)
@@ -465,6 +602,23 @@ def test_version_rest_retrieve(api_client, version):
     )
 
 
+@pytest.mark.django_db
+def test_version_rest_retrieve_conditional(api_client, draft_version):
+    url = f'/api/dandisets/{draft_version.dandiset.identifier}/versions/{draft_version.version}/'
+    resp = api_client.get(url)
+    assert resp.status_code == 200
+    assert resp['Cache-Control'] == 'no-cache'
+
+    resp = api_client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+    assert resp.status_code == 304
+    assert not resp.content
+
+    # Once the version changes, the old ETag no longer matches
+    etag = resp['ETag']
+    draft_version.save()
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
 @pytest.mark.django_db
 def test_version_rest_info(api_client, version):
     assert api_client.get(
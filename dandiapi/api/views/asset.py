@@ -4,14 +4,17 @@ import re
 from typing import TYPE_CHECKING, cast
 
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django_filters import rest_framework as filters
 from drf_yasg.utils import swagger_auto_schema
+from more_itertools import ichunked
 from rest_framework import serializers, status
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotAuthenticated, NotFound, PermissionDenied
 from rest_framework.generics import get_object_or_404
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ReadOnlyModelViewSet
 from rest_framework_extensions.mixins import DetailSerializerMixin, NestedViewSetMixin
@@ -20,26 +23,33 @@ from dandiapi.api.asset_paths import search_asset_paths
 from dandiapi.api.models import Asset, AssetBlob, Dandiset, Version
 from dandiapi.api.models.asset import validate_asset_path
 from dandiapi.api.services.asset import (
+    AssetOperation,
     add_asset_to_version,
+    apply_asset_operations,
     change_asset,
     remove_asset_from_version,
 )
 from dandiapi.api.services.asset.exceptions import DraftDandisetNotModifiableError
 from dandiapi.api.services.embargo.exceptions import DandisetUnembargoInProgressError
+from dandiapi.api.services.exceptions import DandiError
 from dandiapi.api.services.permissions.dandiset import (
+    get_dandiset_embargo_status,
     is_dandiset_owner,
     is_owned_asset,
     require_dandiset_owner_or_403,
 )
 from dandiapi.api.views.common import (
     ASSET_ID_PARAM,
+    CURSOR_PARAM,
     VERSIONS_DANDISET_PK_PARAM,
     VERSIONS_VERSION_PARAM,
 )
-from dandiapi.api.views.pagination import DandiPagination, LazyPagination
+from dandiapi.api.views.conditional import MetadataValidators
+from dandiapi.api.views.pagination import DandiPagination, KeysetPagination, LazyPagination
 from dandiapi.api.views.serializers import (
     AssetDetailSerializer,
     AssetDownloadQueryParameterSerializer,
+    AssetExportQueryParameterSerializer,
     AssetListSerializer,
     AssetPathsQueryParameterSerializer,
     AssetPathsSerializer,
@@ -49,7 +59,10 @@ from dandiapi.api.views.serializers import (
 from dandiapi.zarr.models import ZarrArchive
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+
     from django.contrib.auth.models import User
+    from django.db.models import QuerySet
 
 
 class AssetFilter(filters.FilterSet):
@@ -80,7 +93,10 @@ class AssetViewSet(DetailSerializerMixin, GenericViewSet):
         if asset_id is None:
             return
 
-        asset = get_object_or_404(Asset.objects.select_related('blob', 'zarr'), asset_id=asset_id)
+        asset = get_object_or_404(
+            Asset.objects.select_related('blob', 'zarr__dandiset').defer('metadata'),
+            asset_id=asset_id,
+        )
         if not asset.is_embargoed:
             return
 
@@ -109,8 +125,27 @@ class AssetViewSet(DetailSerializerMixin, GenericViewSet):
         operation_summary="Get an asset's metadata",
     )
     def retrieve(self, request, **kwargs):
+        # Defer the metadata, so that it's only loaded if the client's copy is stale
+        self.queryset = self.queryset.select_related('blob', 'zarr__dandiset').defer('metadata')
         asset = self.get_object()
-        return Response(asset.full_metadata)
+
+        parts: list[object] = [asset.id, asset.modified, asset.is_embargoed]
+        last_modified = asset.modified
+        if asset.zarr is not None:
+            # The full metadata of a zarr asset includes the checksum and size of the zarr archive
+            parts += [asset.zarr.modified, asset.zarr.checksum]
+            last_modified = max(last_modified, asset.zarr.modified)
+        validators = MetadataValidators(
+            *parts,
+            last_modified=last_modified,
+            immutable=asset.published,
+            private=asset.is_embargoed,
+        )
+        not_modified = validators.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+
+        return validators.add_headers(Response(asset.full_metadata))
 
     @swagger_auto_schema(
         method='GET',
@@ -146,7 +181,7 @@ class AssetViewSet(DetailSerializerMixin, GenericViewSet):
 
         if content_disposition == 'attachment':
             return HttpResponseRedirect(
-                asset_blob.blob.storage.url(
+                asset_blob.blob.storage.cached_url(
                     asset_blob.blob.name,
                     parameters={
                         'ResponseContentDisposition': f'attachment; filename="{asset_basename}"',
@@ -154,7 +189,7 @@ class AssetViewSet(DetailSerializerMixin, GenericViewSet):
                 )
             )
         if content_disposition == 'inline':
-            url = asset_blob.blob.storage.url(
+            url = asset_blob.blob.storage.cached_url(
                 asset_blob.blob.name,
                 parameters={
                     'ResponseContentDisposition': f'inline; filename="{asset_basename}"',
@@ -224,22 +259,54 @@ class AssetRequestSerializer(serializers.Serializer):
         return data
 
 
+class AssetOperationSerializer(AssetRequestSerializer):
+    action = serializers.ChoiceField(choices=['create', 'update', 'delete'])
+    asset_id = serializers.UUIDField(required=False)
+    metadata = serializers.JSONField(required=False)
+
+    def validate(self, data):
+        if data['action'] != 'create' and 'asset_id' not in data:
+            raise serializers.ValidationError(
+                {'asset_id': 'An asset_id must be specified to update or delete an asset.'}
+            )
+        if data['action'] == 'create' and 'asset_id' in data:
+            raise serializers.ValidationError(
+                {'asset_id': 'An asset_id must not be specified to create an asset.'}
+            )
+        if data['action'] == 'delete':
+            return data
+        if 'metadata' not in data:
+            raise serializers.ValidationError({'metadata': 'This field is required.'})
+
+        return super().validate(data)
+
+
+class AssetBatchRequestSerializer(serializers.Serializer):
+    max_operations = 1000
+
+    # Each operation is validated individually with AssetOperationSerializer, so that an invalid
+    # operation is reported in its result, instead of failing the entire request
+    operations = serializers.ListField(
+        child=serializers.DictField(), min_length=1, max_length=max_operations
+    )
+
+
 class NestedAssetViewSet(NestedViewSetMixin, AssetViewSet, ReadOnlyModelViewSet):
     pagination_class = DandiPagination
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = AssetFilter
 
     def raise_if_unauthorized(self):
-        version = get_object_or_404(
-            Version.objects.select_related('dandiset'),
-            dandiset__pk=self.kwargs['versions__dandiset__pk'],
-            version=self.kwargs['versions__version'],
-        )
-        if version.dandiset.embargo_status != Dandiset.EmbargoStatus.OPEN:
+        # The version itself is looked up by the caller, which raises a 404 if it doesn't exist
+        embargo_status = get_dandiset_embargo_status(int(self.kwargs['versions__dandiset__pk']))
+        if embargo_status is None:
+            raise Http404
+        if embargo_status != Dandiset.EmbargoStatus.OPEN:
             if not self.request.user.is_authenticated:
                 # Clients must be authenticated to access it
                 raise NotAuthenticated
-            if not is_dandiset_owner(version.dandiset, self.request.user):
+            dandiset = get_object_or_404(Dandiset, pk=self.kwargs['versions__dandiset__pk'])
+            if not is_dandiset_owner(dandiset, self.request.user):
                 # The user does not have ownership permission
                 raise PermissionDenied
 
@@ -409,7 +476,124 @@ class NestedAssetViewSet(NestedViewSetMixin, AssetViewSet, ReadOnlyModelViewSet)
 
         return Response(None, status=status.HTTP_204_NO_CONTENT)
 
-    @swagger_auto_schema(query_serializer=AssetListSerializer, responses={200: AssetSerializer})
+    @staticmethod
+    def _resolve_batch_operations(
+        version: Version, validated_items: dict[int, dict], results: list[dict | None]
+    ) -> dict[int, AssetOperation]:
+        """
+        Look up the objects referenced by each validated batch operation.
+
+        Everything is fetched at once, rather than per operation. Operations referencing objects
+        that don't exist have their result set, and are left out of those returned.
+        """
+
+        def referenced(field: str) -> set:
+            return {data[field] for data in validated_items.values() if field in data}
+
+        blobs = AssetBlob.objects.in_bulk(referenced('blob_id'), field_name='blob_id')
+        zarr_archives = ZarrArchive.objects.in_bulk(referenced('zarr_id'), field_name='zarr_id')
+        # Lock assets for update/delete
+        assets = (
+            version.assets.select_related('blob', 'zarr')
+            .select_for_update(of=('self',))
+            .in_bulk(referenced('asset_id'), field_name='asset_id')
+        )
+
+        operations: dict[int, AssetOperation] = {}
+        for index, data in validated_items.items():
+            missing = (
+                ('blob_id', 'No blob exists with that ID.', blobs),
+                ('zarr_id', 'No zarr archive exists with that ID.', zarr_archives),
+                ('asset_id', 'No asset with that ID exists in this version.', assets),
+            )
+            errors = {
+                field: message
+                for field, message, found in missing
+                if field in data and data[field] not in found
+            }
+            if errors:
+                results[index] = {'status': 404, 'detail': errors}
+                continue
+
+            operations[index] = {
+                'action': data['action'],
+                'asset': assets.get(data.get('asset_id')),
+                'asset_blob': blobs.get(data.get('blob_id')),
+                'zarr_archive': zarr_archives.get(data.get('zarr_id')),
+                'metadata': data.get('metadata'),
+            }
+
+        return operations
+
+    @swagger_auto_schema(
+        method='POST',
+        request_body=AssetBatchRequestSerializer,
+        responses={200: 'The result of each operation, in the order they were given.'},
+        manual_parameters=[VERSIONS_DANDISET_PK_PARAM, VERSIONS_VERSION_PARAM],
+        operation_summary='Create, update and remove many assets at once.',
+        operation_description='Each operation has an "action" of "create", "update" or "delete".\
+                               Created and updated assets are specified as in the single asset\
+                               endpoints, while updated and deleted assets are specified by\
+                               "asset_id". Operations are applied in order, and the result of\
+                               each one contains its HTTP status code, along with the resulting\
+                               asset or the reason it failed. Failed operations are skipped.\
+                               User must be an owner of the specified dandiset.\
+                               Only draft versions can be modified.',
+    )
+    @action(detail=False, methods=['POST'], filter_backends=[])
+    @require_dandiset_owner_or_403('versions__dandiset__pk')
+    def batch(self, request, versions__dandiset__pk, versions__version):
+        version: Version = get_object_or_404(
+            Version.objects.select_related('dandiset'),
+            dandiset__pk=versions__dandiset__pk,
+            version=versions__version,
+        )
+        if version.version != 'draft':
+            raise DraftDandisetNotModifiableError
+        if version.dandiset.unembargo_in_progress:
+            raise DandisetUnembargoInProgressError
+
+        request_serializer = AssetBatchRequestSerializer(data=request.data)
+        request_serializer.is_valid(raise_exception=True)
+        items: list[dict] = request_serializer.validated_data['operations']
+
+        # Each result is filled in as soon as its operation is known to fail
+        results: list[dict | None] = [None] * len(items)
+        validated_items: dict[int, dict] = {}
+        for index, item in enumerate(items):
+            serializer = AssetOperationSerializer(data=item)
+            try:
+                if serializer.is_valid():
+                    validated_items[index] = serializer.validated_data
+                else:
+                    results[index] = {'status': 400, 'detail': serializer.errors}
+            except DjangoValidationError as e:
+                results[index] = {'status': 400, 'detail': e.messages}
+
+        with transaction.atomic():
+            operations = self._resolve_batch_operations(version, validated_items, results)
+            outcomes = apply_asset_operations(
+                user=request.user, version=version, operations=list(operations.values())
+            )
+
+        for index, outcome in zip(operations, outcomes, strict=True):
+            if outcome is None:
+                results[index] = {'status': 204}
+            elif isinstance(outcome, DandiError):
+                results[index] = {
+                    'status': outcome.http_status_code or 400,
+                    'detail': outcome.message,
+                }
+            else:
+                results[index] = {'status': 200, 'asset': AssetDetailSerializer(outcome).data}
+
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @swagger_auto_schema(
+        query_serializer=AssetListSerializer,
+        manual_parameters=[CURSOR_PARAM],
+        responses={200: AssetSerializer},
+    )
     def list(self, request, *args, **kwargs):
         # Manually call this to ensure user is authorized
         self.raise_if_unauthorized()
@@ -418,7 +602,8 @@ class NestedAssetViewSet(NestedViewSetMixin, AssetViewSet, ReadOnlyModelViewSet)
         serializer.is_valid(raise_exception=True)
 
         # Retrieve version first and then fetch assets, to remove a join
-        version = Version.objects.get(
+        version = get_object_or_404(
+            Version,
             dandiset__pk=self.kwargs['versions__dandiset__pk'],
             version=self.kwargs['versions__version'],
         )
@@ -443,9 +628,19 @@ class NestedAssetViewSet(NestedViewSetMixin, AssetViewSet, ReadOnlyModelViewSet)
 
         # Retrieve just the first N asset IDs, and use them for pagination
         # Use custom pagination class to reduce unnecessary counts of assets
-        paginator = LazyPagination()
-        qs = asset_queryset.values_list('id', flat=True)
-        page_of_asset_ids = paginator.paginate_queryset(qs, request=self.request, view=self)
+        paginator: KeysetPagination | LazyPagination
+        if KeysetPagination.requested(request):
+            # Key on the requested ordering field, using the ID to break ties
+            order: str = (request.query_params.get('order') or 'created').split(',')[0]
+            ordering = (order, '-id' if order.startswith('-') else 'id')
+            paginator = KeysetPagination(ordering=ordering)
+            qs = asset_queryset.values('id', ordering[0].removeprefix('-'))
+            page = paginator.paginate_queryset(qs, request=self.request, view=self)
+            page_of_asset_ids = [row['id'] for row in page]
+        else:
+            paginator = LazyPagination()
+            qs = asset_queryset.values_list('id', flat=True)
+            page_of_asset_ids = paginator.paginate_queryset(qs, request=self.request, view=self)
 
         # Not sure when the page is ever None, but this condition is checked for compatibility with
         # the original implementation: https://github.com/encode/django-rest-framework/blob/f4194c4684420ac86485d9610adf760064db381f/rest_framework/mixins.py#L37-L46
@@ -460,6 +655,9 @@ class NestedAssetViewSet(NestedViewSetMixin, AssetViewSet, ReadOnlyModelViewSet)
             Asset.objects.filter(id__in=page_of_asset_ids).select_related('blob', 'zarr')
         )
 
+        if isinstance(paginator, KeysetPagination):
+            queryset = queryset.order_by(*paginator.ordering)
+
         # Must apply this to the main queryset, since it affects the data returned
         include_metadata = serializer.validated_data['metadata']
         if not include_metadata:
@@ -469,8 +667,61 @@ class NestedAssetViewSet(NestedViewSetMixin, AssetViewSet, ReadOnlyModelViewSet)
         serializer = self.get_serializer(queryset, many=True, metadata=include_metadata)
         return paginator.get_paginated_response(serializer.data)
 
+    # The number of rows fetched from the server-side cursor at a time while exporting
+    EXPORT_CHUNK_SIZE = 2_000
+
+    @staticmethod
+    def _export_lines(queryset: QuerySet[Asset], *, include_metadata: bool) -> Iterator[bytes]:
+        renderer = JSONRenderer()
+        for chunk in ichunked(
+            queryset.iterator(chunk_size=NestedAssetViewSet.EXPORT_CHUNK_SIZE),
+            NestedAssetViewSet.EXPORT_CHUNK_SIZE,
+        ):
+            serializer = AssetSerializer(chunk, many=True, metadata=include_metadata)
+            yield b''.join(renderer.render(asset) + b'\n' for asset in serializer.data)
+
+    @swagger_auto_schema(
+        method='GET',
+        query_serializer=AssetExportQueryParameterSerializer,
+        responses={200: 'One JSON serialized asset per line, ordered by path.'},
+        manual_parameters=[VERSIONS_DANDISET_PK_PARAM, VERSIONS_VERSION_PARAM],
+        operation_summary='Export every asset in a version as newline delimited JSON.',
+    )
+    @action(detail=False, methods=['GET'], filter_backends=[])
+    def export(self, request, versions__dandiset__pk, versions__version):
+        """
+        Stream every asset in a version, one JSON object per line.
+
+        Unlike the paginated asset list, the assets are read through a single server-side cursor
+        ordered by path, so the whole version can be fetched in one request.
+        """
+        query_serializer = AssetExportQueryParameterSerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+
+        # Permission check
+        self.raise_if_unauthorized()
+
+        version = get_object_or_404(
+            Version,
+            dandiset__pk=versions__dandiset__pk,
+            version=versions__version,
+        )
+
+        queryset = version.assets.select_related('blob', 'zarr', 'zarr__dandiset').order_by(
+            'path', 'id'
+        )
+        include_metadata = query_serializer.validated_data['metadata']
+        if not include_metadata:
+            queryset = queryset.defer('metadata')
+
+        return StreamingHttpResponse(
+            self._export_lines(queryset, include_metadata=include_metadata),
+            content_type='application/x-ndjson',
+        )
+
     @swagger_auto_schema(
         query_serializer=AssetPathsQueryParameterSerializer,
+        manual_parameters=[CURSOR_PARAM],
         responses={200: AssetPathsSerializer(many=True)},
     )
     @action(detail=False, methods=['GET'], filter_backends=[])
@@ -501,6 +752,12 @@ class NestedAssetViewSet(NestedViewSetMixin, AssetViewSet, ReadOnlyModelViewSet)
             raise NotFound('Specified path not found.')
 
         # Paginate and return
+        if KeysetPagination.requested(request):
+            paginator = KeysetPagination(ordering=('path', 'id'))
+            page = paginator.paginate_queryset(children_paths, request=request, view=self)
+            serializer = AssetPathsSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
         page = self.paginate_queryset(children_paths)
         if page is not None:
             serializer = AssetPathsSerializer(page, many=True)
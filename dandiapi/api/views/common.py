@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from drf_yasg import openapi
 
-from dandiapi.api.views.pagination import DandiPagination
+from dandiapi.api.views.pagination import DandiPagination, KeysetPagination
 
 ASSET_ID_PARAM = openapi.Parameter(
     'asset_id',
@@ -48,6 +48,15 @@ VERSIONS_VERSION_PARAM = openapi.Parameter(
 )
 
 
+CURSOR_PARAM = openapi.Parameter(
+    KeysetPagination.cursor_query_param,
+    openapi.IN_QUERY,
+    'Opt in to cursor pagination. Pass an empty value for the first page, and follow the "next"'
+    ' link for the rest. When set, the page number is ignored.',
+    type=openapi.TYPE_STRING,
+    required=False,
+)
+
 PAGINATION_PARAMS = [
     openapi.Parameter(
         DandiPagination.page_query_param,
@@ -65,4 +74,5 @@ PAGINATION_PARAMS = [
         required=False,
         default=DandiPagination.page_size,
     ),
+    CURSOR_PARAM,
 ]
@@ -0,0 +1,62 @@
+"""
+Conditional GET support for metadata endpoints.
+
+Metadata responses carry a strong ETag and a Last-Modified date, derived from values which change
+whenever the metadata does. These can be checked against the request before the metadata itself
+is loaded, so that a client revalidating its copy gets a 304 without any serialization.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+if TYPE_CHECKING:
+    from django.http import HttpResponse
+    from rest_framework.request import Request
+
+# Published objects never change, so clients may keep them for as long as they like
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class MetadataValidators:
+    """The validators of a metadata response, used to answer conditional requests."""
+
+    def __init__(
+        self,
+        *parts: object,
+        last_modified: datetime,
+        immutable: bool = False,
+        private: bool = False,
+    ) -> None:
+        self.etag = quote_etag(
+            '-'.join(
+                str(int(part.timestamp() * 1_000_000)) if isinstance(part, datetime) else str(part)
+                for part in parts
+            )
+        )
+        self.last_modified = last_modified
+        self.immutable = immutable
+        self.private = private
+
+    def get_not_modified_response(self, request: Request) -> HttpResponse | None:
+        """Return a 304 response if the client's copy is current, or `None` otherwise."""
+        response = get_conditional_response(
+            request, etag=self.etag, last_modified=int(self.last_modified.timestamp())
+        )
+        return None if response is None else self.add_headers(response)
+
+    def add_headers(self, response: HttpResponse) -> HttpResponse:
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified.timestamp())
+        if self.immutable:
+            patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+        else:
+            # Let clients keep a copy, as long as they revalidate it before each use
+            patch_cache_control(response, no_cache=True)
+        if self.private:
+            patch_cache_control(response, private=True)
+        return response
@@ -6,12 +6,11 @@ from typing import TYPE_CHECKING
 from allauth.socialaccount.models import SocialAccount
 from dandischema.conf import get_instance_config
 from django.contrib.auth.models import User
-from django.contrib.postgres.lookups import Unaccent
 from django.db import transaction
-from django.db.models import Count, Max, OuterRef, QuerySet, Subquery, Sum, TextField
-from django.db.models.functions import Cast, Coalesce
+from django.db.models import Count, F, Max, OuterRef, QuerySet, Subquery, Sum
 from django.db.models.query_utils import Q
 from django.http import Http404
+from django.utils.functional import cached_property
 from drf_yasg.utils import no_body, swagger_auto_schema
 from rest_framework import filters, status
 from rest_framework.decorators import action
@@ -49,8 +48,8 @@ from dandiapi.api.services.permissions.dandiset import (
     replace_dandiset_owners,
     require_dandiset_owner_or_403,
 )
-from dandiapi.api.views.common import DANDISET_PK_PARAM
-from dandiapi.api.views.pagination import DandiPagination
+from dandiapi.api.views.common import CURSOR_PARAM, DANDISET_PK_PARAM
+from dandiapi.api.views.pagination import DandiPagination, KeysetPagination
 from dandiapi.api.views.serializers import (
     CreateDandisetQueryParameterSerializer,
     DandisetDetailSerializer,
@@ -63,7 +62,9 @@ from dandiapi.api.views.serializers import (
     UserSerializer,
     VersionMetadataSerializer,
 )
-from dandiapi.search.models import AssetSearch
+from dandiapi.search.documents import search_documents, search_rank
+from dandiapi.search.facets import get_facet_counts
+from dandiapi.search.models import AssetSearch, VersionSearchDocument
 
 if TYPE_CHECKING:
     from rest_framework.request import Request
@@ -73,11 +74,13 @@ if TYPE_CHECKING:
 
 
 class DandisetOrderingFilter(filters.OrderingFilter):
-    ordering_fields = ['id', 'name', 'modified', 'size', 'stars']
+    ordering_fields = ['id', 'name', 'modified', 'size', 'stars', 'relevance']
     ordering_description = (
         'Which field to use when ordering the results. '
-        'Options are id, -id, name, -name, modified, -modified, size, -size, stars, -stars.'
+        'Options are id, -id, name, -name, modified, -modified, size, -size, stars, -stars, '
+        'relevance, -relevance. Ordering by relevance puts the best matches of the search first.'
     )
+    listing_fields = {'name': 'name', 'modified': 'modified', 'size': 'size', 'stars': 'star_count'}
 
     def filter_queryset(self, request, queryset, view):
         orderings = self.get_ordering(request, queryset, view)
@@ -87,50 +90,35 @@ class DandisetOrderingFilter(filters.OrderingFilter):
 
         # ordering can be either 'created' or '-created', so test for both
         if ordering.endswith('id'):
-            queryset = queryset.order_by(ordering)
-        elif ordering.endswith('name'):
-            # name refers to the name of the most recent version, so a subquery is required
-            latest_version = Version.objects.filter(dandiset=OuterRef('pk')).order_by('-created')[
-                :1
-            ]
-            queryset = queryset.annotate(
-                name=Subquery(latest_version.values('metadata__name'))
-            ).order_by(ordering)
-        elif ordering.endswith('modified'):
-            # modified refers to the modification timestamp of the most
-            # recent version, so a subquery is required
-            latest_version = Version.objects.filter(dandiset=OuterRef('pk')).order_by('-created')[
-                :1
-            ]
-            # get the `modified` field of the most recent version.
-            # '_version' is appended because the Dandiset model already has a `modified` field
-            queryset = queryset.annotate(
-                modified_version=Subquery(latest_version.values('modified'))
-            ).order_by(f'{ordering}_version')
-        elif ordering.endswith('size'):
-            latest_version = Version.objects.filter(dandiset=OuterRef('pk')).order_by('-created')[
-                :1
-            ]
-            queryset = queryset.annotate(
-                size=Subquery(
-                    latest_version.annotate(
-                        size=Coalesce(
-                            Sum(
-                                'asset_paths__aggregate_size',
-                                filter=~Q(asset_paths__path__contains='/'),
-                            ),
-                            0,
-                        )
-                    ).values('size')
-                )
-            ).order_by(ordering)
-        elif ordering.endswith('stars'):
-            prefix = '-' if ordering.startswith('-') else ''
-            queryset = queryset.annotate(stars_count=Count('stars')).order_by(
-                f'{prefix}stars_count'
-            )
+            return queryset.order_by(ordering)
 
-        return queryset
+        if ordering.endswith('relevance'):
+            return self._order_by_relevance(request, queryset, descending=ordering[0] != '-')
+
+        # The other fields refer to the most recent version of each dandiset, and are kept in its
+        # listing, so that sorting by them doesn't require any subqueries
+        prefix = '-' if ordering.startswith('-') else ''
+        listing_field = self.listing_fields[ordering.removeprefix('-')]
+        return queryset.order_by(f'{prefix}listing__{listing_field}')
+
+    @staticmethod
+    def _order_by_relevance(request, queryset, *, descending: bool):
+        # Without a search term, every dandiset is equally relevant
+        rank = search_rank(DandisetSearchFilter().get_search_term(request).split())
+        if rank is None:
+            return queryset
+
+        # A dandiset is as relevant as its most relevant version
+        best_rank = (
+            VersionSearchDocument.objects.filter(version__dandiset=OuterRef('pk'))
+            .annotate(rank=rank)
+            .order_by('-rank')
+            .values('rank')[:1]
+        )
+        queryset = queryset.annotate(search_rank=Subquery(best_rank))
+        return queryset.order_by(
+            F('search_rank').desc(nulls_last=True) if descending else F('search_rank').asc()
+        )
 
 
 class DandisetSearchFilter(filters.BaseFilterBackend):
@@ -147,19 +135,9 @@ class DandisetSearchFilter(filters.BaseFilterBackend):
 
         # Split search term into individual words and apply AND logic
         # so that all words must be present (in any order)
-        search_words = search_term.split()
-
-        # Build a Q object that requires all words to be present
-        q_filter = Q()
-        for word in search_words:
-            q_filter &= Q(search_field__icontains=word)
-
-        # We must formulate the filter using a separate query first, as otherwise
-        # the generated SQL is incompatible previously generated clauses
         matching_dandiset_ids = (
-            Version.objects.alias(search_field=Unaccent(Cast('metadata', TextField())))
-            .filter(q_filter)
-            .values_list('dandiset_id', flat=True)
+            search_documents(search_term.split())
+            .values_list('version__dandiset_id', flat=True)
             .distinct()
         )
 
@@ -367,6 +345,7 @@ class DandisetViewSet(ReadOnlyModelViewSet):
             relevant_assets = relevant_assets.filter(query_filter)
         qs = self.get_queryset()
         dandisets = self.filter_queryset(qs).filter(id__in=relevant_assets.values('dandiset_id'))
+        facet_counts = get_facet_counts(dandisets)
         dandisets = self.paginate_queryset(dandisets)
         dandiset_stars = self._get_dandiset_star_context(dandisets)
         dandisets_to_versions = self._get_dandiset_to_version_map(dandisets)
@@ -396,10 +375,31 @@ class DandisetViewSet(ReadOnlyModelViewSet):
                 'stars': dandiset_stars,
             },
         )
-        return self.get_paginated_response(serializer.data)
+        response = self.get_paginated_response(serializer.data)
+        # Facets count every asset of the matching dandisets, not only the ones matching the filters
+        response.data['facets'] = facet_counts
+        return response
+
+    @cached_property
+    def paginator(self):
+        if self.action == 'list' and KeysetPagination.requested(self.request):
+            return self._keyset_paginator()
+        return super().paginator
+
+    def _keyset_paginator(self) -> KeysetPagination:
+        """Return a keyset paginator, keyed on creation time unless ordering by ID."""
+        ordering = DandisetOrderingFilter().get_ordering(self.request, None, self)
+        if not ordering:
+            return KeysetPagination(ordering=('created', 'id'))
+        if ordering[0] in {'id', '-id'}:
+            return KeysetPagination(ordering=(ordering[0],))
+        raise ValidationError(
+            {'ordering': 'Only ordering by id is supported when paginating by cursor.'}
+        )
 
     @swagger_auto_schema(
         query_serializer=DandisetQueryParameterSerializer,
+        manual_parameters=[CURSOR_PARAM],
         responses={200: DandisetListSerializer(many=True)},
     )
     def list(self, request, *args, **kwargs):
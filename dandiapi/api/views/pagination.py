@@ -1,11 +1,25 @@
 from __future__ import annotations
 
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
 from collections import OrderedDict
+import json
+from typing import TYPE_CHECKING, Any
 
 from django.core.paginator import Page, Paginator
+from django.db.models import Q
 from django.utils.functional import cached_property
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import replace_query_param
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from django.db.models import QuerySet
+    from rest_framework.request import Request
 
 
 class DandiPagination(PageNumberPagination):
@@ -107,3 +121,112 @@ class LazyPagination(PageNumberPagination):
         )
 
         return Response(page_dict)
+
+
+class KeysetPagination(BasePagination):
+    """
+    An opt-in pagination scheme which seeks past the previous page, rather than using OFFSET.
+
+    The `cursor` query parameter holds the ordering key of the last row of the previous page, so
+    every page is fetched with an indexed range scan, no matter how deep it is. An empty cursor
+    requests the first page. The response has the same shape as `LazyPagination`, with `count`
+    only included on the first page. Only forward pagination is supported, so `previous` is
+    always null.
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering: Sequence[str]):
+        # The ordering must be unique, so it should end with the primary key
+        self.ordering = tuple(ordering)
+        self.request: Request | None = None
+        self.page: list | None = None
+
+    @classmethod
+    def requested(cls, request: Request) -> bool:
+        """Return whether the request opted in to keyset pagination."""
+        return cls.cursor_query_param in request.query_params
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request: Request) -> list[Any] | None:
+        encoded = request.query_params.get(self.cursor_query_param, '')
+        if not encoded:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+        except (UnicodeError, binascii.Error, ValueError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, row) -> str:
+        position = [
+            row[field] if isinstance(row, dict) else getattr(row, field)
+            for field in self._ordering_fields
+        ]
+        return urlsafe_b64encode(json.dumps(position, cls=JSONEncoder).encode()).decode()
+
+    @cached_property
+    def _ordering_fields(self) -> list[str]:
+        return [field.removeprefix('-') for field in self.ordering]
+
+    def _seek_filter(self, position: list[Any]) -> Q:
+        """Filter rows that come after the given position, i.e. a lexicographic comparison."""
+        seek = Q()
+        for i, field in enumerate(self.ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            preceding = dict(zip(self._ordering_fields[:i], position[:i], strict=True))
+            seek |= Q(**preceding, **{f'{self._ordering_fields[i]}__{lookup}': position[i]})
+        return seek
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> list:
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        self.count = queryset.count() if position is None else None
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(position))
+
+        # Intentionally fetch one extra to see if there are any more pages left
+        rows = list(queryset[: page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_link(self) -> str | None:
+        if self.request is None or self.page is None:
+            raise RuntimeError('Paginator is uninitialized.')
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data) -> Response:
+        page_dict = OrderedDict(
+            [
+                ('count', self.count),
+                ('next', self.get_next_link()),
+                ('previous', None),
+                ('results', data),
+            ]
+        )
+
+        return Response(page_dict)
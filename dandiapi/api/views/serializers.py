@@ -11,8 +11,9 @@ from drf_yasg.utils import swagger_serializer_method
 from rest_framework import serializers
 from rest_framework.validators import ValidationError
 
+from dandiapi.api.asset_metadata import AssetMetadataAssembler
 from dandiapi.api.models import Asset, AssetBlob, AssetPath, Dandiset, Upload, Version
-from dandiapi.search.models import AssetSearch
+from dandiapi.search.models import DandisetFacetValue
 
 if TYPE_CHECKING:
     from collections import OrderedDict
@@ -323,7 +324,9 @@ class DandisetSearchQueryParameterSerializer(DandisetQueryParameterSerializer):
         # The queryset can't be evaluated at compile time, so we evaluate it here
         # in the __init__ method
         self.fields['species'].choices = list(
-            AssetSearch.objects.exclude(species='').values_list('species', flat=True).distinct()
+            DandisetFacetValue.objects.filter(facet=DandisetFacetValue.Facet.SPECIES)
+            .values_list('value', flat=True)
+            .distinct()
         )
 
     def validate(self, data: OrderedDict[str, Any]) -> OrderedDict[str, Any]:
@@ -418,6 +421,19 @@ class AssetDownloadQueryParameterSerializer(serializers.Serializer):
     content_disposition = serializers.ChoiceField(['attachment', 'inline'], default='attachment')
 
 
+class AssetMetadataField(serializers.JSONField):
+    """The full metadata of an asset, assembled with an assembler shared by the whole serializer."""
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, value: Asset) -> dict:
+        assembler = self.context.get('asset_metadata_assembler')
+        if assembler is None:
+            assembler = self.context['asset_metadata_assembler'] = AssetMetadataAssembler()
+        return assembler.full_metadata(value)
+
+
 class AssetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Asset
@@ -435,7 +451,7 @@ class AssetSerializer(serializers.ModelSerializer):
 
     blob = serializers.SlugRelatedField(slug_field='blob_id', read_only=True)
     zarr = serializers.SlugRelatedField(slug_field='zarr_id', read_only=True)
-    metadata = serializers.JSONField(source='full_metadata')
+    metadata = AssetMetadataField()
 
     def __init__(self, *args, metadata=True, **kwargs):
         # Instantiate the superclass normally
@@ -457,6 +473,10 @@ class AssetListSerializer(serializers.Serializer):
     zarr = serializers.BooleanField(required=False, default=False)
 
 
+class AssetExportQueryParameterSerializer(serializers.Serializer):
+    metadata = serializers.BooleanField(required=False, default=False)
+
+
 class AssetPathsQueryParameterSerializer(serializers.Serializer):
     path_prefix = serializers.CharField(default='')
 
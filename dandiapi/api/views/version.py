@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from django.db import transaction
+from django.http import Http404
 from django_filters import rest_framework as filters
 from drf_yasg.utils import no_body, swagger_auto_schema
 from rest_framework import status
@@ -15,12 +16,14 @@ from dandiapi.api.models import Dandiset, Version
 from dandiapi.api.services import audit
 from dandiapi.api.services.embargo.exceptions import DandisetUnembargoInProgressError
 from dandiapi.api.services.permissions.dandiset import (
+    get_dandiset_embargo_status,
     is_dandiset_owner,
     require_dandiset_owner_or_403,
 )
 from dandiapi.api.services.publish import publish_dandiset
 from dandiapi.api.tasks import delete_doi_task
 from dandiapi.api.views.common import DANDISET_PK_PARAM, VERSION_PARAM
+from dandiapi.api.views.conditional import MetadataValidators
 from dandiapi.api.views.pagination import DandiPagination
 from dandiapi.api.views.serializers import (
     VersionDetailSerializer,
@@ -53,11 +56,14 @@ class VersionViewSet(NestedViewSetMixin, DetailSerializerMixin, ReadOnlyModelVie
     def get_queryset(self):
         # We need to check the dandiset to see if it's embargoed, and if so whether or not the
         # user has ownership
-        dandiset = get_object_or_404(Dandiset, pk=self.kwargs['dandiset__pk'])
-        if dandiset.embargo_status != Dandiset.EmbargoStatus.OPEN:
+        embargo_status = get_dandiset_embargo_status(int(self.kwargs['dandiset__pk']))
+        if embargo_status is None:
+            raise Http404
+        if embargo_status != Dandiset.EmbargoStatus.OPEN:
             if not self.request.user.is_authenticated:
                 # Clients must be authenticated to access it
                 raise NotAuthenticated
+            dandiset = get_object_or_404(Dandiset, pk=self.kwargs['dandiset__pk'])
             if not is_dandiset_owner(dandiset, self.request.user):
                 # The user does not have ownership permission
                 raise PermissionDenied
@@ -70,8 +76,23 @@ class VersionViewSet(NestedViewSetMixin, DetailSerializerMixin, ReadOnlyModelVie
         manual_parameters=[DANDISET_PK_PARAM, VERSION_PARAM],
     )
     def retrieve(self, request, **kwargs):
+        # Defer the metadata, so that it's only loaded if the client's copy is stale
+        self.queryset = self.queryset.defer('metadata')
         version = self.get_object()
-        return Response(version.metadata, status=status.HTTP_200_OK)
+
+        # The DOI of a published version is added to its metadata shortly after publishing
+        validators = MetadataValidators(
+            version.id,
+            version.modified,
+            last_modified=version.modified,
+            immutable=version.version != 'draft' and bool(version.doi),
+            private=version.dandiset.embargo_status != Dandiset.EmbargoStatus.OPEN,
+        )
+        not_modified = validators.get_not_modified_response(request)
+        if not_modified is not None:
+            return not_modified
+
+        return validators.add_headers(Response(version.metadata, status=status.HTTP_200_OK))
 
     @swagger_auto_schema(
         manual_parameters=[DANDISET_PK_PARAM, VERSION_PARAM],
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.decorators import api_view
@@ -12,7 +13,7 @@ from dandiapi.api.models.asset_paths import AssetPath
 from dandiapi.api.models.version import Version
 from dandiapi.api.services.permissions.dandiset import is_dandiset_owner
 from dandiapi.api.views.common import PAGINATION_PARAMS
-from dandiapi.api.views.pagination import DandiPagination
+from dandiapi.api.views.pagination import DandiPagination, KeysetPagination
 
 from .serializers import AtPathQuerySerializer, PathResultSerializer
 
@@ -48,14 +49,15 @@ def get_atpath_queryset(*, version: Version, path: str, children: bool) -> Query
     if asset_path.asset is not None or not children:
         return qs
 
-    # Now we know path is a folder, and we should show its children
-    children_paths = (
-        get_path_children(asset_path).select_related(None).select_related(*select_related_clauses)
+    # Now we know path is a folder, and we should show its children. This is expressed as a filter
+    # rather than a union, so that the result can still be filtered when paginating by cursor.
+    children_path_ids = get_path_children(asset_path).order_by().values('id')
+    return (
+        AssetPath.objects.select_related(*select_related_clauses)
+        .filter(Q(id=asset_path.id) | Q(id__in=children_path_ids))
+        .order_by('path')
     )
 
-    # Must include an additional order clause here to ensure correct ordering
-    return qs.union(children_paths).order_by('path')
-
 
 @swagger_auto_schema(
     query_serializer=AtPathQuerySerializer,
@@ -97,7 +99,11 @@ def atpath(request: Request):
             raise NotFound(detail=f'Folder not found at {path}')
 
     # Paginate
-    paginator = DandiPagination()
+    paginator = (
+        KeysetPagination(ordering=('path', 'id'))
+        if KeysetPagination.requested(request)
+        else DandiPagination()
+    )
     result_page = paginator.paginate_queryset(qs, request=request)
     serializer = PathResultSerializer(
         instance=result_page, many=True, context={'metadata': params['metadata']}
@@ -4,6 +4,7 @@ from rest_framework import serializers
 
 from dandiapi.api.models.asset import Asset
 from dandiapi.api.models.asset_paths import AssetPath
+from dandiapi.api.views.serializers import AssetMetadataField
 
 
 class PathFolderSerializer(serializers.ModelSerializer):
@@ -36,7 +37,7 @@ class PathAssetSerializer(serializers.ModelSerializer):
 
     blob = serializers.UUIDField(source='blob.blob_id', allow_null=True)
     zarr = serializers.UUIDField(source='zarr.zarr_id', allow_null=True)
-    metadata = serializers.JSONField(source='full_metadata')
+    metadata = AssetMetadataField()
 
     def __init__(self, *args, include_metadata=False, **kwargs):
         if not include_metadata:
@@ -56,7 +57,9 @@ class PathResultSerializer(serializers.Serializer):
 
     def get_resource(self, obj: AssetPath):
         if obj.asset is not None:
-            return PathAssetSerializer(obj.asset, include_metadata=self.context['metadata']).data
+            return PathAssetSerializer(
+                obj.asset, include_metadata=self.context['metadata'], context=self.context
+            ).data
         return PathFolderSerializer(obj).data
 
 
@@ -0,0 +1,98 @@
+"""
+Incremental maintenance of the `asset_search` table.
+
+The table holds a row for every asset with a blob in any version of a dandiset. Rather than
+recomputing it from scratch, the rows of a dandiset are upserted and deleted whenever its assets
+change, so that searches always reflect the current state of the archive. The facet counts of
+the dandiset are updated along with its rows.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.db import connection
+
+from dandiapi.api.models.asset import Asset, AssetBlob
+from dandiapi.api.models.version import Version
+from dandiapi.search.facets import add_facet_values, remove_facet_values
+from dandiapi.search.models import AssetSearch
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+# Restrict the statements below to some assets, rather than every asset of the dandiset
+_ASSET_FILTER_SQL = 'AND asset.id = ANY(%(asset_ids)s)'
+_ASSET_SEARCH_FILTER_SQL = """
+    AND asset_search.asset_id IN (SELECT asset_id FROM {asset} WHERE id = ANY(%(asset_ids)s))
+"""
+
+# The same asset may be in several versions of a dandiset, so only insert it once. Rows which
+# are already up to date are left alone, rather than rewritten.
+_UPSERT_ASSET_SEARCH_SQL = """
+INSERT INTO {asset_search} AS asset_search
+    (dandiset_id, asset_id, asset_metadata, species, asset_size)
+SELECT DISTINCT
+    version.dandiset_id,
+    asset.asset_id,
+    asset.metadata,
+    COALESCE(asset.metadata->'wasAttributedTo'->0->'species'->>'name', ''),
+    blob.size
+FROM {asset} asset
+JOIN {asset_blob} blob ON blob.id = asset.blob_id
+JOIN {version_asset} version_asset ON version_asset.asset_id = asset.id
+JOIN {version} version ON version.id = version_asset.version_id
+WHERE version.dandiset_id = %(dandiset_id)s {asset_filter}
+ON CONFLICT (dandiset_id, asset_id) DO UPDATE SET
+    asset_metadata = EXCLUDED.asset_metadata,
+    species = EXCLUDED.species,
+    asset_size = EXCLUDED.asset_size
+WHERE (asset_search.asset_metadata, asset_search.species, asset_search.asset_size)
+    IS DISTINCT FROM (EXCLUDED.asset_metadata, EXCLUDED.species, EXCLUDED.asset_size)
+"""
+
+_DELETE_ASSET_SEARCH_SQL = """
+DELETE FROM {asset_search} asset_search
+WHERE asset_search.dandiset_id = %(dandiset_id)s {asset_search_filter}
+    AND NOT EXISTS (
+        SELECT 1
+        FROM {asset} asset
+        JOIN {version_asset} version_asset ON version_asset.asset_id = asset.id
+        JOIN {version} version ON version.id = version_asset.version_id
+        WHERE asset.asset_id = asset_search.asset_id
+            AND version.dandiset_id = asset_search.dandiset_id
+    )
+"""
+
+
+def sync_asset_search(dandiset_id: int, asset_ids: Iterable[int] | None = None) -> None:
+    """
+    Bring the search rows of some assets of a dandiset up to date.
+
+    Rows are added or updated for the assets which are in a version of the dandiset, and deleted
+    for the ones which no longer are. If no asset IDs are given, every asset of the dandiset is
+    brought up to date.
+    """
+    tables = {
+        'asset_search': AssetSearch._meta.db_table,
+        'asset': Asset._meta.db_table,
+        'asset_blob': AssetBlob._meta.db_table,
+        'version_asset': Version.assets.through._meta.db_table,
+        'version': Version._meta.db_table,
+    }
+    params: dict = {'dandiset_id': dandiset_id}
+    filters = {'asset_filter': '', 'asset_search_filter': ''}
+    if asset_ids is not None:
+        params['asset_ids'] = list(asset_ids)
+        if not params['asset_ids']:
+            return
+        filters = {
+            'asset_filter': _ASSET_FILTER_SQL,
+            'asset_search_filter': _ASSET_SEARCH_FILTER_SQL.format(**tables),
+        }
+
+    with connection.cursor() as cursor:
+        remove_facet_values(cursor, filters['asset_search_filter'], params)
+        for statement in (_UPSERT_ASSET_SEARCH_SQL, _DELETE_ASSET_SEARCH_SQL):
+            cursor.execute(statement.format(**filters, **tables), params)
+        add_facet_values(cursor, filters['asset_search_filter'], params)
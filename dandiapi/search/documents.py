@@ -0,0 +1,69 @@
+"""
+Full text search of version metadata.
+
+Every version has a `VersionSearchDocument`, holding its metadata as lowercase, unaccented text,
+which is trigram indexed so that substrings can be matched without scanning every version. The
+same text is also parsed into a tsvector, used to rank the matching versions.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+from django.contrib.postgres.lookups import Unaccent
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Func, Q, Value
+from django.db.models.functions import Lower
+
+from dandiapi.api.models.version import Version
+from dandiapi.search.models import VersionSearchDocument
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from django.db.models import QuerySet
+
+# The "simple" configuration neither stems nor drops words, as metadata is mostly names and terms
+_REFRESH_DOCUMENTS_SQL = """
+INSERT INTO {document} (version_id, text, vector)
+SELECT version.id, document.text, to_tsvector('simple', document.text)
+FROM {version} version,
+    LATERAL (SELECT lower(unaccent(version.metadata::text)) AS text) AS document
+WHERE version.id = ANY(%(version_ids)s)
+ON CONFLICT (version_id) DO UPDATE SET text = EXCLUDED.text, vector = EXCLUDED.vector
+"""
+
+
+def refresh_version_search_documents(version_ids: Iterable[int]) -> None:
+    """Rebuild the search documents of some versions, after their metadata changed."""
+    tables = {
+        'document': VersionSearchDocument._meta.db_table,
+        'version': Version._meta.db_table,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(_REFRESH_DOCUMENTS_SQL.format(**tables), {'version_ids': list(version_ids)})
+
+
+def search_documents(words: Iterable[str]) -> QuerySet[VersionSearchDocument]:
+    """Return the search documents which contain every word, ignoring case and accents."""
+    q_filter = Q()
+    for word in words:
+        q_filter &= Q(text__contains=Lower(Unaccent(Value(word))))
+
+    return VersionSearchDocument.objects.filter(q_filter)
+
+
+def search_rank(words: Iterable[str]) -> SearchRank | None:
+    """Return the rank of a search document for some words, which may be prefixes of its words."""
+    # Only use the alphanumeric parts of each word, so that the query is always well formed
+    tokens = [token for word in words for token in re.findall(r'[^\W_]+', word)]
+    if not tokens:
+        return None
+
+    query = ' & '.join(f'{token}:*' for token in tokens)
+    return SearchRank(
+        F('vector'),
+        SearchQuery(Func(Value(query), function='unaccent'), config='simple', search_type='raw'),
+    )
@@ -0,0 +1,120 @@
+"""
+Pre-aggregated facet counts of dandiset search.
+
+Every dandiset has a `DandisetFacetValue` row for each distinct value of a search facet among its
+assets, holding the number of assets with that value. The rows are updated along with the
+`asset_search` table, so that facet counts can be served without scanning it.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from django.db.models import Count, Sum
+
+from dandiapi.search.models import AssetSearch, DandisetFacetValue
+
+if TYPE_CHECKING:
+    from django.db.backends.utils import CursorWrapper
+    from django.db.models import QuerySet
+
+    from dandiapi.api.models import Dandiset
+
+# The lower bounds of the asset size buckets, in bytes
+SIZE_FACET_BUCKETS = [0, 10**6, 10**8, 10**9, 10**10, 10**11]
+
+# The maximum number of values returned for each facet, in descending order of asset count
+FACET_VALUE_LIMIT = 20
+
+# The facet values of the asset_search rows of a dandiset, counted per dandiset
+_FACET_VALUES_SQL = """
+SELECT asset_search.dandiset_id, facet.facet, facet.value, count(*) AS count
+FROM {asset_search} asset_search
+CROSS JOIN LATERAL (
+    SELECT 'species', asset_search.species
+    UNION ALL
+    SELECT 'genotype', asset_search.asset_metadata #>> '{{wasAttributedTo,0,genotype}}'
+    UNION ALL
+    SELECT 'encodingFormat', asset_search.asset_metadata->>'encodingFormat'
+    UNION ALL
+    (
+        SELECT DISTINCT 'measurementTechnique', technique->>'name'
+        FROM jsonb_array_elements(
+            CASE jsonb_typeof(asset_search.asset_metadata->'measurementTechnique')
+                WHEN 'array' THEN asset_search.asset_metadata->'measurementTechnique'
+                ELSE '[]'::jsonb
+            END
+        ) AS technique
+    )
+    UNION ALL
+    SELECT 'size', (%(size_buckets)s::bigint[])[
+        width_bucket(asset_search.asset_size, %(size_buckets)s::bigint[])
+    ]::text
+) AS facet(facet, value)
+WHERE asset_search.dandiset_id = %(dandiset_id)s {asset_search_filter}
+    AND facet.value <> ''
+GROUP BY asset_search.dandiset_id, facet.facet, facet.value
+"""
+
+_ADD_FACET_VALUES_SQL = """
+INSERT INTO {facet_value} (dandiset_id, facet, value, count)
+SELECT change.dandiset_id, change.facet, change.value, change.count FROM ({changes}) AS change
+ON CONFLICT (dandiset_id, facet, value)
+    DO UPDATE SET count = {facet_value}.count + EXCLUDED.count
+"""
+
+# Values being removed must already be counted, so they can be updated in place
+_REMOVE_FACET_VALUES_SQL = """
+UPDATE {facet_value} AS facet_value
+SET count = facet_value.count - change.count
+FROM ({changes}) AS change
+WHERE facet_value.dandiset_id = change.dandiset_id
+    AND facet_value.facet = change.facet
+    AND facet_value.value = change.value
+"""
+
+
+def _apply_facet_values(
+    cursor: CursorWrapper, statement: str, asset_search_filter: str, params: dict
+) -> None:
+    changes = _FACET_VALUES_SQL.format(
+        asset_search=AssetSearch._meta.db_table, asset_search_filter=asset_search_filter
+    )
+    cursor.execute(
+        statement.format(facet_value=DandisetFacetValue._meta.db_table, changes=changes),
+        {**params, 'size_buckets': SIZE_FACET_BUCKETS},
+    )
+
+
+def add_facet_values(cursor: CursorWrapper, asset_search_filter: str, params: dict) -> None:
+    """Count the facet values of some asset_search rows of a dandiset."""
+    _apply_facet_values(cursor, _ADD_FACET_VALUES_SQL, asset_search_filter, params)
+
+
+def remove_facet_values(cursor: CursorWrapper, asset_search_filter: str, params: dict) -> None:
+    """Stop counting the facet values of some asset_search rows of a dandiset."""
+    if not asset_search_filter:
+        # Every row of the dandiset is being removed, so there is nothing left to count
+        DandisetFacetValue.objects.filter(dandiset_id=params['dandiset_id']).delete()
+        return
+
+    _apply_facet_values(cursor, _REMOVE_FACET_VALUES_SQL, asset_search_filter, params)
+    DandisetFacetValue.objects.filter(dandiset_id=params['dandiset_id'], count=0).delete()
+
+
+def get_facet_counts(dandisets: QuerySet[Dandiset]) -> dict[str, list[dict]]:
+    """Return the most common values of every facet among the assets of some dandisets."""
+    facet_values = (
+        DandisetFacetValue.objects.filter(dandiset__in=dandisets.order_by().values('id'))
+        .values('facet', 'value')
+        .annotate(assets=Sum('count'), dandisets=Count('dandiset_id'))
+        .order_by('facet', '-assets', 'value')
+    )
+
+    facet_counts: dict[str, list[dict]] = {facet: [] for facet in DandisetFacetValue.Facet.values}
+    for facet_value in facet_values:
+        counts = facet_counts[facet_value.pop('facet')]
+        if len(counts) < FACET_VALUE_LIMIT:
+            counts.append(facet_value)
+
+    return facet_counts
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:16
+from __future__ import annotations
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_VERSION_SEARCH_DOCUMENTS_SQL = """
+INSERT INTO search_versionsearchdocument (version_id, text, vector)
+SELECT version.id, document.text, to_tsvector('simple', document.text)
+FROM api_version version,
+    LATERAL (SELECT lower(unaccent(version.metadata::text)) AS text) AS document
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('api', '0032_dandiset_listing'),
+        ('search', '0002_denormalize_species'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionSearchDocument',
+            fields=[
+                (
+                    'version',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='search_document',
+                        serialize=False,
+                        to='api.version',
+                    ),
+                ),
+                ('text', models.TextField()),
+                ('vector', django.contrib.postgres.search.SearchVectorField()),
+            ],
+            options={
+                'indexes': [
+                    django.contrib.postgres.indexes.GinIndex(
+                        django.contrib.postgres.indexes.OpClass('text', name='gin_trgm_ops'),
+                        name='version_search_text_trgm_idx',
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=['vector'], name='version_search_vector_idx'
+                    ),
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_VERSION_SEARCH_DOCUMENTS_SQL, migrations.RunSQL.noop),
+    ]
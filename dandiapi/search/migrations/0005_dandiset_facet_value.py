@@ -0,0 +1,90 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:25
+
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_FACET_VALUES_SQL = """
+INSERT INTO search_dandisetfacetvalue (dandiset_id, facet, value, count)
+SELECT asset_search.dandiset_id, facet.facet, facet.value, count(*)
+FROM asset_search
+CROSS JOIN LATERAL (
+    SELECT 'species', asset_search.species
+    UNION ALL
+    SELECT 'genotype', asset_search.asset_metadata #>> '{wasAttributedTo,0,genotype}'
+    UNION ALL
+    SELECT 'encodingFormat', asset_search.asset_metadata->>'encodingFormat'
+    UNION ALL
+    (
+        SELECT DISTINCT 'measurementTechnique', technique->>'name'
+        FROM jsonb_array_elements(
+            CASE jsonb_typeof(asset_search.asset_metadata->'measurementTechnique')
+                WHEN 'array' THEN asset_search.asset_metadata->'measurementTechnique'
+                ELSE '[]'::jsonb
+            END
+        ) AS technique
+    )
+    UNION ALL
+    SELECT 'size', (ARRAY[0, 1e6, 1e8, 1e9, 1e10, 1e11]::bigint[])[
+        width_bucket(asset_search.asset_size, ARRAY[0, 1e6, 1e8, 1e9, 1e10, 1e11]::bigint[])
+    ]::text
+) AS facet(facet, value)
+WHERE facet.value <> ''
+GROUP BY asset_search.dandiset_id, facet.facet, facet.value
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('api', '0032_dandiset_listing'),
+        ('search', '0004_asset_search_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DandisetFacetValue',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'facet',
+                    models.CharField(
+                        choices=[
+                            ('species', 'Species'),
+                            ('genotype', 'Genotype'),
+                            ('encodingFormat', 'Encoding Format'),
+                            ('measurementTechnique', 'Measurement Technique'),
+                            ('size', 'Size'),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ('value', models.TextField()),
+                ('count', models.PositiveIntegerField()),
+                (
+                    'dandiset',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='facet_values',
+                        to='api.dandiset',
+                    ),
+                ),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['facet', 'value'], name='search_dand_facet_683713_idx')
+                ],
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('dandiset', 'facet', 'value'), name='unique-dandiset-facet-value'
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_FACET_VALUES_SQL, migrations.RunSQL.noop),
+    ]
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.db.models import OuterRef, Q, Subquery
 
@@ -12,16 +14,22 @@ if TYPE_CHECKING:
     from django.contrib.auth.models import User
 
 
+def _visible_to(user: User, embargo_status: str) -> Q:
+    """Return a filter matching the rows of dandisets which the user is allowed to view."""
+    return Q(**{embargo_status: Dandiset.EmbargoStatus.OPEN}) | Q(
+        dandiset_id__in=get_owned_dandisets(user)
+    )
+
+
 class AssetSearchManager(models.Manager):
     def visible_to(self, user: User) -> models.QuerySet[AssetSearch]:
         """Filter out AssetSearch objects that the user doesn't have permission to view."""
         embargo_statuses_query = Dandiset.objects.filter(id=OuterRef('dandiset_id')).values(
             'embargo_status'
         )
-        owned_dandisets_query = get_owned_dandisets(user)
 
         return self.alias(embargo_status=Subquery(embargo_statuses_query)).filter(
-            Q(embargo_status=Dandiset.EmbargoStatus.OPEN) | Q(dandiset_id__in=owned_dandisets_query)
+            _visible_to(user, 'embargo_status')
         )
 
 
@@ -45,3 +53,63 @@ class AssetSearch(models.Model):
 
     def __str__(self) -> str:
         return f'{self.dandiset_id}:{self.asset_id}'
+
+
+class VersionSearchDocument(models.Model):
+    """The searchable text of a version's metadata, kept up to date as the metadata changes."""
+
+    version = models.OneToOneField(
+        'api.Version', primary_key=True, related_name='search_document', on_delete=models.CASCADE
+    )
+
+    # The metadata as lowercase, unaccented JSON, for substring matching
+    text = models.TextField()
+    # The words of the text, for ranking
+    vector = SearchVectorField()
+
+    class Meta:
+        indexes = [
+            GinIndex(OpClass('text', name='gin_trgm_ops'), name='version_search_text_trgm_idx'),
+            GinIndex(fields=['vector'], name='version_search_vector_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return str(self.version_id)
+
+
+class DandisetFacetValueManager(models.Manager):
+    def visible_to(self, user: User) -> models.QuerySet[DandisetFacetValue]:
+        """Filter out the facet values of dandisets the user doesn't have permission to view."""
+        return self.filter(_visible_to(user, 'dandiset__embargo_status'))
+
+
+class DandisetFacetValue(models.Model):
+    """The number of assets of a dandiset which have some value of a search facet."""
+
+    class Facet(models.TextChoices):
+        SPECIES = 'species'
+        GENOTYPE = 'genotype'
+        ENCODING_FORMAT = 'encodingFormat'
+        MEASUREMENT_TECHNIQUE = 'measurementTechnique'
+        # The value is the lower bound of a size bucket, in bytes
+        SIZE = 'size'
+
+    dandiset = models.ForeignKey(
+        'api.Dandiset', related_name='facet_values', on_delete=models.CASCADE
+    )
+    facet = models.CharField(max_length=32, choices=Facet.choices)
+    value = models.TextField()
+    count = models.PositiveIntegerField()
+
+    objects = DandisetFacetValueManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dandiset', 'facet', 'value'], name='unique-dandiset-facet-value'
+            )
+        ]
+        indexes = [models.Index(fields=['facet', 'value'])]
+
+    def __str__(self) -> str:
+        return f'{self.dandiset_id}: {self.facet}={self.value}'
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import connection
+import pytest
+
+from dandiapi.api.services.asset import add_asset_to_version, remove_asset_from_version
+from dandiapi.api.tests.factories import DraftVersionFactory, UserFactory
+from dandiapi.search.asset_search import sync_asset_search
+from dandiapi.search.models import AssetSearch
+
+
+@pytest.mark.django_db
+def test_asset_search_follows_assets(asset_blob_factory):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    asset_blob = asset_blob_factory(size=123)
+    asset = add_asset_to_version(
+        user=user,
+        version=draft_version,
+        asset_blob=asset_blob,
+        metadata={
+            'path': 'foo/bar.nwb',
+            'schemaVersion': settings.DANDI_SCHEMA_VERSION,
+            'wasAttributedTo': [{'species': {'name': 'Mus musculus'}}],
+        },
+    )
+
+    asset_search = AssetSearch.objects.get()
+    assert asset_search.dandiset_id == draft_version.dandiset_id
+    assert asset_search.asset_id == asset.asset_id
+    assert asset_search.species == 'Mus musculus'
+    assert asset_search.asset_size == 123
+
+    remove_asset_from_version(user=user, asset=asset, version=draft_version)
+    assert not AssetSearch.objects.exists()
+
+
+@pytest.mark.django_db
+def test_asset_search_sync_skips_unchanged_rows(asset_blob_factory):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    add_asset_to_version(
+        user=user,
+        version=draft_version,
+        asset_blob=asset_blob_factory(),
+        metadata={'path': 'foo/bar.nwb', 'schemaVersion': settings.DANDI_SCHEMA_VERSION},
+    )
+
+    def row_location():
+        # Updating a row writes a new version of it, at a new location
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT ctid FROM asset_search')
+            return cursor.fetchone()[0]
+
+    location = row_location()
+    sync_asset_search(draft_version.dandiset_id)
+    assert row_location() == location
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from django.conf import settings
+import pytest
+
+from dandiapi.api.services.asset import add_asset_to_version, remove_asset_from_version
+from dandiapi.api.tests.factories import DraftVersionFactory, UserFactory
+from dandiapi.search.models import DandisetFacetValue
+
+
+def _asset_metadata(path: str) -> dict:
+    return {
+        'path': path,
+        'schemaVersion': settings.DANDI_SCHEMA_VERSION,
+        'encodingFormat': 'application/x-nwb',
+        'measurementTechnique': [
+            {'name': 'spike sorting technique'},
+            {'name': 'spike sorting technique'},
+            {'name': 'surgical technique'},
+        ],
+        'wasAttributedTo': [{'species': {'name': 'Mus musculus'}, 'genotype': 'wild type'}],
+    }
+
+
+@pytest.mark.django_db
+def test_facet_values_follow_assets(asset_blob_factory):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    assets = [
+        add_asset_to_version(
+            user=user,
+            version=draft_version,
+            asset_blob=asset_blob_factory(size=size),
+            metadata=_asset_metadata(f'foo/{size}.nwb'),
+        )
+        for size in (100, 2 * 10**8)
+    ]
+
+    assert set(
+        DandisetFacetValue.objects.filter(dandiset=draft_version.dandiset).values_list(
+            'facet', 'value', 'count'
+        )
+    ) == {
+        ('species', 'Mus musculus', 2),
+        ('genotype', 'wild type', 2),
+        ('encodingFormat', 'application/x-nwb', 2),
+        ('measurementTechnique', 'spike sorting technique', 2),
+        ('measurementTechnique', 'surgical technique', 2),
+        ('size', '0', 1),
+        ('size', str(10**8), 1),
+    }
+
+    remove_asset_from_version(user=user, asset=assets[0], version=draft_version)
+    assert set(DandisetFacetValue.objects.filter(facet='size').values_list('value', 'count')) == {
+        (str(10**8), 1)
+    }
+    assert DandisetFacetValue.objects.get(facet='species').count == 1
+
+    remove_asset_from_version(user=user, asset=assets[1], version=draft_version)
+    assert not DandisetFacetValue.objects.exists()
+
+
+@pytest.mark.django_db
+def test_search_rest_facets(api_client, asset_blob_factory):
+    user = UserFactory.create()
+    draft_version = DraftVersionFactory.create(dandiset__owners=[user])
+    add_asset_to_version(
+        user=user,
+        version=draft_version,
+        asset_blob=asset_blob_factory(size=100),
+        metadata=_asset_metadata('foo/bar.nwb'),
+    )
+
+    facets = api_client.get('/api/dandisets/search/').json()['facets']
+    assert facets['species'] == [{'value': 'Mus musculus', 'assets': 1, 'dandisets': 1}]
+    assert facets['size'] == [{'value': '0', 'assets': 1, 'dandisets': 1}]
+
+    resp = api_client.get('/api/search/species/')
+    assert resp.json()['results'] == ['Mus musculus']
+    assert api_client.get('/api/search/genotypes/', {'genotype': 'wild'}).json() == ['wild type']
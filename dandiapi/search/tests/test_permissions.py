@@ -1,23 +1,26 @@
 from __future__ import annotations
 
-from django.db import connection
+from django.conf import settings
 import pytest
 
 from dandiapi.api.models.dandiset import Dandiset
+from dandiapi.api.services.asset import add_asset_to_version
 from dandiapi.api.tests.factories import DraftVersionFactory, UserFactory
 from dandiapi.search.models import AssetSearch
 
 
 @pytest.mark.django_db
-def test_assetsearch_visible_to_permissions(draft_asset_factory):
-    asset = draft_asset_factory()
+def test_assetsearch_visible_to_permissions(embargoed_asset_blob):
+    user = UserFactory.create()
     draft_version = DraftVersionFactory.create(
-        dandiset__embargo_status=Dandiset.EmbargoStatus.EMBARGOED
+        dandiset__embargo_status=Dandiset.EmbargoStatus.EMBARGOED, dandiset__owners=[user]
+    )
+    add_asset_to_version(
+        user=user,
+        version=draft_version,
+        asset_blob=embargoed_asset_blob,
+        metadata={'path': 'foo/bar.nwb', 'schemaVersion': settings.DANDI_SCHEMA_VERSION},
     )
-    draft_version.assets.add(asset)
-
-    with connection.cursor() as cursor:
-        cursor.execute('REFRESH MATERIALIZED VIEW asset_search;')
 
     assert AssetSearch.objects.count() == 1
     other_user = UserFactory.create()
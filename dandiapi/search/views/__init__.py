@@ -10,7 +10,7 @@ from rest_framework.permissions import AllowAny
 import sentry_sdk
 
 from dandiapi.api.views.common import DandiPagination
-from dandiapi.search.models import AssetSearch
+from dandiapi.search.models import DandisetFacetValue
 
 if TYPE_CHECKING:
     from django.contrib.auth.models import User
@@ -18,29 +18,25 @@ if TYPE_CHECKING:
 
 
 class SearchSerializer(serializers.Serializer):
-    def to_queryset(self, user: User) -> QuerySet[AssetSearch]:
-        return AssetSearch.objects.visible_to(user)
+    facet: DandisetFacetValue.Facet
+
+    def to_queryset(self, user: User) -> QuerySet[DandisetFacetValue]:
+        # Empty values are never counted, so they don't need to be filtered out
+        return DandisetFacetValue.objects.visible_to(user).filter(facet=self.facet)
 
 
 class GenotypeSearchSerializer(SearchSerializer):
+    facet = DandisetFacetValue.Facet.GENOTYPE
     genotype = serializers.CharField(required=False)
 
-    def to_queryset(self, user: User) -> QuerySet[AssetSearch]:
+    def to_queryset(self, user: User) -> QuerySet[DandisetFacetValue]:
         qs = super().to_queryset(user)
 
         genotype: str | None = self.validated_data.get('genotype')
         if genotype:
-            # TODO: take advantage of trigram index?
-            qs = qs.filter(asset_metadata__wasAttributedTo__0__genotype__icontains=genotype)
-
-        # Filter out empty string genotype
-        qs = qs.exclude(asset_metadata__wasAttributedTo__0__genotype__exact='')
+            qs = qs.filter(value__icontains=genotype)
 
-        return (
-            qs.order_by('asset_metadata__wasAttributedTo__0__genotype')
-            .values_list('asset_metadata__wasAttributedTo__0__genotype', flat=True)
-            .distinct()[:10]
-        )
+        return qs.order_by('value').values_list('value', flat=True).distinct()[:10]
 
 
 @swagger_auto_schema(methods=['GET'], auto_schema=None)
@@ -54,19 +50,17 @@ def search_genotypes(request):
 
 
 class SpeciesSearchSerializer(SearchSerializer):
+    facet = DandisetFacetValue.Facet.SPECIES
     species = serializers.CharField(required=False)
 
-    def to_queryset(self, user: User) -> QuerySet[AssetSearch]:
+    def to_queryset(self, user: User) -> QuerySet[DandisetFacetValue]:
         qs = super().to_queryset(user)
 
         species: str | None = self.validated_data.get('species')
         if species:
-            qs = qs.filter(species__icontains=species)
-
-        # Filter out empty string species
-        qs = qs.exclude(species__exact='')
+            qs = qs.filter(value__icontains=species)
 
-        return qs.order_by('species').values_list('species', flat=True).distinct()
+        return qs.order_by('value').values_list('value', flat=True).distinct()
 
 
 @swagger_auto_schema(methods=['GET'], auto_schema=None)
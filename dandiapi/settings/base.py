@@ -78,6 +78,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     # Add username middleware after authentication to capture username for gunicorn access logs
     'dandiapi.api.middleware.GunicornUsernameMiddleware',
+    'dandiapi.api.middleware.OwnershipCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
@@ -94,6 +95,13 @@ DATABASES = {
 }
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+CACHES = {
+    # Permission lookups are only cached across requests by a cache which every process shares,
+    # such as "redis://..." (with the "redis" package installed), as each process would otherwise
+    # miss the invalidations of the others
+    'default': env.cache_url('DJANGO_CACHE_URL', default='locmemcache://'),
+}
+
 STORAGES: dict[str, dict[str, Any]] = {
     # Inject the "default" storage in particular run configurations
     'staticfiles': {
@@ -199,6 +207,16 @@ DANDI_DOI_PUBLISH: bool = env.bool('DJANGO_DANDI_DOI_PUBLISH', default=False)
 
 DANDI_VALIDATION_JOB_INTERVAL: int = env.int('DJANGO_DANDI_VALIDATION_JOB_INTERVAL', default=60)
 
+# The number of threads listing the objects of a zarr archive in parallel while it's ingested
+DANDI_ZARR_INGEST_WORKERS: int = env.int('DJANGO_DANDI_ZARR_INGEST_WORKERS', default=8)
+
+# The most files a zarr archive can have for its listings to be indexed in the database. Each file
+# takes roughly 250 bytes plus twice the length of its path, across its row and indexes.
+DANDI_ZARR_INDEX_MAX_FILES: int = env.int('DJANGO_DANDI_ZARR_INDEX_MAX_FILES', default=1_000_000)
+
+# The number of threads removing the embargoed tag from objects while a dandiset is unembargoed
+DANDI_UNEMBARGO_TAG_WORKERS: int = env.int('DJANGO_DANDI_UNEMBARGO_TAG_WORKERS', default=16)
+
 DANDI_AUTO_APPROVE_USERS = False
 
 DANDI_DEV_EMAIL: str
@@ -1,22 +1,89 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from functools import cached_property
 import hashlib
+import hmac
 import io
 import json
+import threading
+import time
 from typing import TYPE_CHECKING, Any
-from urllib.parse import ParseResult, urlencode
+from urllib.parse import (
+    ParseResult,
+    parse_qsl,
+    quote,
+    urlencode,
+    urlparse,
+    urlsplit,
+    urlunparse,
+)
 
 from botocore.config import Config
 from botocore.exceptions import ClientError
+from more_itertools import chunked
 from storages.backends.s3 import S3Storage
 from storages.utils import clean_name
 
 if TYPE_CHECKING:
-    from collections.abc import Mapping
+    from collections.abc import Callable, Hashable, Iterable, Mapping
 
     from mypy_boto3_s3.client import S3Client
     from mypy_boto3_s3.service_resource import S3ServiceResource
 
+# An object name which is presigned once, to find the URL of the bucket
+_UNSIGNED_URL_PLACEHOLDER = 'unsigned-url-placeholder'
+
+# Stands in for the name and MD5 of each object, when presigning URLs for many objects
+_PRESIGN_PLACEHOLDER = 'presign-placeholder'
+
+# The most objects which S3 deletes in a single request
+DELETE_OBJECTS_BATCH_SIZE = 1000
+
+# The maximum number of presigned URLs kept by each storage
+PRESIGNED_URL_CACHE_SIZE = 10_000
+
+
+def _presign_signed_headers(tags: Mapping[str, str] | None) -> str:
+    """Return the headers signed in a presigned PUT URL, which batch presigning reproduces."""
+    return 'content-md5;host' if tags is None else 'content-md5;host;x-amz-tagging'
+
+
+class PresignedUrlCache:
+    """
+    A bounded LRU cache of presigned URLs.
+
+    URLs are only kept for a fraction of their lifetime, so that any URL handed out from the cache
+    is still valid for most of the time a fresh one would be.
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._urls: OrderedDict[Hashable, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, create: Callable[[], str]) -> str:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._urls.get(key)
+            if entry is not None and entry[0] > now:
+                self._urls.move_to_end(key)
+                return entry[1]
+
+        # Presign outside of the lock, as it's the slow part
+        url = create()
+        with self._lock:
+            self._urls[key] = (now + self.ttl, url)
+            self._urls.move_to_end(key)
+            while len(self._urls) > self.maxsize:
+                self._urls.popitem(last=False)
+        return url
+
+    def clear(self) -> None:
+        with self._lock:
+            self._urls.clear()
+
 
 class _WritableSha256(io.RawIOBase):
     """File-like object that calculates the SHA256 of everything written to it."""
@@ -42,6 +109,7 @@ class DandiS3Storage(S3Storage):
     This class additionally:
     * Does not transform original filenames
     * Allows unsigned URLs to be generated
+    * Caches presigned GET URLs which are requested repeatedly
     * Provides an API to generate presigned PUT URLs
     * Provides an API to get the ETag of an object
     * Provides an API to tag objects
@@ -88,15 +156,20 @@ class DandiS3Storage(S3Storage):
     def generate_filename(self, filename: str) -> str:
         return filename
 
-    def _url_unsigned(self, name: str) -> str:
-        # TODO: Remove this method once https://github.com/jschneier/django-storages/pull/1536
-        #  is released.
+    @cached_property
+    def _unsigned_url_prefix(self) -> str:
+        # Presign a placeholder object once, so that unsigned URLs take exactly the form that the
+        # client gives presigned ones, and strip it down to the URL of the bucket
+        parsed = urlparse(self.url(_UNSIGNED_URL_PLACEHOLDER))
+        name = self._normalize_name(clean_name(_UNSIGNED_URL_PLACEHOLDER))
+        path = parsed.path.removesuffix(quote(name, safe='/~'))
+        return urlunparse((parsed.scheme, parsed.netloc, path, '', '', ''))
+
+    def unsigned_url(self, name: str) -> str:
+        """Return the URL of an object, without the cost of presigning it."""
         name = self._normalize_name(clean_name(name))
-        if self.endpoint_url:
-            # Assume only path-style requests are supported, as this is probably MinIO
-            return f'{self.endpoint_url}/{self.bucket_name}/{name}'
-        # https://docs.aws.amazon.com/AmazonS3/latest/userguide/VirtualHosting.html#virtual-hosted-style-access
-        return f'https://{self.bucket_name}.s3.{self.region_name}.amazonaws.com/{name}'
+        # Quote the name the same way as in a presigned URL
+        return self._unsigned_url_prefix + quote(name, safe='/~')
 
     def url(
         self,
@@ -109,8 +182,19 @@ class DandiS3Storage(S3Storage):
     ) -> str:
         if signed:
             return super().url(name, parameters=parameters, expire=expire, http_method=http_method)
-        name = self._normalize_name(clean_name(name))
-        return self._url_unsigned(name)
+        return self.unsigned_url(name)
+
+    @cached_property
+    def presigned_url_cache(self) -> PresignedUrlCache:
+        # Keep each URL for a quarter of its lifetime
+        return PresignedUrlCache(maxsize=PRESIGNED_URL_CACHE_SIZE, ttl=self.querystring_expire / 4)
+
+    def cached_url(self, name: str, *, parameters: Mapping[str, str] | None = None) -> str:
+        """Return a presigned URL of an object, reusing a recent one with the same parameters."""
+        key = (name, frozenset((parameters or {}).items()))
+        return self.presigned_url_cache.get_or_create(
+            key, lambda: self.url(name, parameters=parameters)
+        )
 
     def generate_presigned_put_object_url(
         self,
@@ -143,6 +227,104 @@ class DandiS3Storage(S3Storage):
             ExpiresIn=expire,
         )
 
+    def generate_presigned_put_object_urls(
+        self,
+        objects: Iterable[tuple[str, str]],
+        *,
+        expire: int | None = None,
+        tags: Mapping[str, str] | None = None,
+    ) -> list[str]:
+        """
+        Generate presigned PUT URLs for many objects, each given by its name and base64 MD5.
+
+        This is equivalent to calling `generate_presigned_put_object_url` for each object, but
+        much faster. Only a placeholder object is presigned by boto3, and the URLs of the actual
+        objects reuse everything but its signature: the bucket URL, the date, the credential scope
+        and the signed headers. Their signatures are then computed with a single signing key.
+        """
+
+        def presign_each() -> list[str]:
+            return [
+                self.generate_presigned_put_object_url(
+                    name, expire=expire, content_md5=content_md5, tags=tags
+                )
+                for name, content_md5 in objects
+            ]
+
+        # The credentials are private to boto3's request signer, so if they can't be found there,
+        # presign each object separately
+        credentials = getattr(
+            getattr(self.s3_client, '_request_signer', None), '_credentials', None
+        )
+        if credentials is None:
+            return presign_each()
+        credentials = credentials.get_frozen_credentials()
+
+        template = urlsplit(
+            self.generate_presigned_put_object_url(
+                _PRESIGN_PLACEHOLDER, expire=expire, content_md5=_PRESIGN_PLACEHOLDER, tags=tags
+            )
+        )
+        query = parse_qsl(template.query, keep_blank_values=True)
+        params = dict(query)
+        access_key, scope = params['X-Amz-Credential'].split('/', 1)
+        signed_headers = params['X-Amz-SignedHeaders']
+        if access_key != credentials.access_key or signed_headers != _presign_signed_headers(tags):
+            # Either the credentials were refreshed while presigning, or boto3 signed headers which
+            # the signatures below wouldn't include, so presign each object separately
+            return presign_each()
+
+        signing_key = f'AWS4{credentials.secret_key}'.encode()
+        for part in scope.split('/'):
+            signing_key = hmac.digest(signing_key, part.encode(), 'sha256')
+
+        bucket_path = template.path.removesuffix(
+            quote(self._normalize_name(clean_name(_PRESIGN_PLACEHOLDER)), safe='/~')
+        )
+        canonical_query = '&'.join(
+            f'{quote(key, safe="-_.~")}={quote(value, safe="-_.~")}'
+            for key, value in sorted(query)
+            if key != 'X-Amz-Signature'
+        )
+        # The signed headers which are the same for every object, following "content-md5"
+        other_headers = f'host:{template.netloc}\n'
+        if tags is not None:
+            other_headers += f'x-amz-tagging:{urlencode(tags)}\n'
+        string_to_sign_prefix = f'AWS4-HMAC-SHA256\n{params["X-Amz-Date"]}\n{scope}\n'
+        url_prefix = f'{template.scheme}://{template.netloc}{bucket_path}'
+        url_query = template.query.split('&X-Amz-Signature=')[0]
+
+        urls = []
+        for name, content_md5 in objects:
+            path = quote(self._normalize_name(clean_name(name)), safe='/~')
+            canonical_request = (
+                f'PUT\n{bucket_path}{path}\n{canonical_query}\n'
+                f'content-md5:{content_md5.strip()}\n{other_headers}\n'
+                f'{signed_headers}\nUNSIGNED-PAYLOAD'
+            )
+            string_to_sign = (
+                string_to_sign_prefix + hashlib.sha256(canonical_request.encode()).hexdigest()
+            )
+            signature = hmac.new(signing_key, string_to_sign.encode(), 'sha256').hexdigest()
+            urls.append(f'{url_prefix}{path}?{url_query}&X-Amz-Signature={signature}')
+        return urls
+
+    def create_shared_s3_client(self, *, max_pool_connections: int) -> S3Client:
+        """
+        Create an S3 client for sharing between threads.
+
+        `s3_client` belongs to the current thread, so a pool of threads using it creates a client
+        per thread. A shared client instead keeps one pool of connections, of the given size.
+        """
+        return self._create_session().client(
+            's3',
+            region_name=self.region_name,
+            use_ssl=self.use_ssl,
+            endpoint_url=self.endpoint_url,
+            config=self.client_config.merge(Config(max_pool_connections=max_pool_connections)),
+            verify=self.verify,
+        )
+
     def e_tag(self, name: str) -> str | None:
         name = self._normalize_name(clean_name(name))
         """Return the ETag (entity tag) for an uploaded object, or `None` if it's unavailable."""
@@ -176,6 +358,54 @@ class DandiS3Storage(S3Storage):
         name = self._normalize_name(clean_name(name))
         self.s3_client.delete_object_tagging(Bucket=self.bucket_name, Key=name)
 
+    def existing_names(self, names: Iterable[str]) -> set[str]:
+        """
+        Return which of some objects exist, by listing them rather than checking each one.
+
+        Neighbouring objects are found by the same listing, so checking many objects in the same
+        directory takes about one request per thousand of them.
+        """
+        keys = {self._normalize_name(clean_name(name)): name for name in names}
+        sorted_keys = sorted(keys)
+        existing: set[str] = set()
+        start_after = ''
+        i = 0
+        while i < len(sorted_keys):
+            key = sorted_keys[i]
+            prefix = key[: key.rfind('/') + 1]
+            # Start just before the key, or after everything already listed
+            start_after = max(start_after, key[:-1])
+            listing = self.s3_client.list_objects_v2(
+                Bucket=self.bucket_name, Prefix=prefix, StartAfter=start_after
+            )
+            listed = {obj['Key'] for obj in listing.get('Contents', [])}
+            # The listing covers every key up to the last one in it, or all the rest of the prefix
+            end = max(listed) if listing['IsTruncated'] else None
+            while (
+                i < len(sorted_keys)
+                and sorted_keys[i].startswith(prefix)
+                and (end is None or sorted_keys[i] <= end)
+            ):
+                if sorted_keys[i] in listed:
+                    existing.add(keys[sorted_keys[i]])
+                i += 1
+            if end is not None:
+                start_after = end
+        return existing
+
+    def delete_objects(self, names: Iterable[str]) -> dict[str, str]:
+        """Delete some objects in batches, returning the error for each one which wasn't deleted."""
+        keys = {self._normalize_name(clean_name(name)): name for name in names}
+        errors: dict[str, str] = {}
+        for batch in chunked(keys, DELETE_OBJECTS_BATCH_SIZE):
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+            )
+            for error in response.get('Errors', []):
+                errors[keys[error['Key']]] = error.get('Message', error['Code'])
+        return errors
+
     def sha256_checksum(self, name: str) -> str:
         """Efficiently compute the SHA256 checksum of an object."""
         name = self._normalize_name(clean_name(name))
@@ -261,12 +491,6 @@ class MinioDandiS3Storage(DandiS3Storage):
             )
         return self._connections.media_connection
 
-    def _url_unsigned(self, name: str) -> str:
-        if self.media_url:
-            name = self._normalize_name(clean_name(name))
-            return f'{self.media_url.scheme}://{self.media_url.hostname}:{self.media_url.port}/{self.bucket_name}/{name}'
-        return super()._url_unsigned(name)
-
     def url(
         self,
         name: str,
@@ -294,7 +518,7 @@ class MinioDandiS3Storage(DandiS3Storage):
                     ExpiresIn=expire,
                     HttpMethod=http_method,
                 )
-            return self._url_unsigned(name)
+            return self.unsigned_url(name)
         return super().url(
             name, parameters=parameters, expire=expire, http_method=http_method, signed=signed
         )
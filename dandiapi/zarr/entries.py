@@ -0,0 +1,362 @@
+"""
+An index of the objects and directories of each zarr archive.
+
+Ingesting a zarr archive already lists every one of its objects in S3, to compute its checksum,
+so the key, size, ETag and modification time of each object are recorded along the way as a
+`ZarrArchiveEntry`, and the checksum of each directory as a `ZarrArchiveDirectory`. Once the
+archive is complete, file listings are served from these rows, rather than from S3.
+
+Each entry takes roughly 250 bytes plus twice the length of its path, across its row and indexes,
+so an archive of a million files takes about 300MB. Archives with more files than
+`DANDI_ZARR_INDEX_MAX_FILES` aren't indexed at all, and are always listed from S3.
+
+When the archive is ingested again, only the paths which may have been uploaded or deleted since
+are checked in S3, and only the directories containing them are checksummed again. Everything else
+is taken from the index.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from functools import partial
+from itertools import pairwise
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from more_itertools import chunked
+from zarr_checksum.checksum import ZarrChecksum, ZarrChecksumManifest
+from zarr_checksum.generators import ZarrArchiveFile
+from zarr_checksum.tree import ZarrChecksumNode, ZarrChecksumTree
+
+from dandiapi.api.models import AuditRecord
+from dandiapi.zarr.models import (
+    ZarrArchive,
+    ZarrArchiveDirectory,
+    ZarrArchiveEntry,
+    ZarrArchiveStatus,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from datetime import datetime
+
+    from mypy_boto3_s3.client import S3Client
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+    from zarr_checksum.checksum import ZarrDirectoryDigest
+
+# The number of entries inserted at once while ingesting
+INDEX_BATCH_SIZE = 5000
+
+# The number of objects listed by each request to S3
+LIST_PAGE_SIZE = 1000
+
+# An upper bound on how long after an upload of files is recorded their URLs can be presigned,
+# including any difference between the clocks of the servers recording and indexing them
+UPLOAD_RECORD_MARGIN = timedelta(hours=1)
+
+# How many times a range of keys is split into smaller ranges when ingesting in parallel
+MAX_SPLIT_DEPTH = 2
+
+
+def clear_zarr_index(zarr: ZarrArchive) -> None:
+    """Delete the index of a zarr archive, which is about to be ingested from scratch."""
+    ZarrArchiveEntry.objects.filter(zarr=zarr).delete()
+    ZarrArchiveDirectory.objects.filter(zarr=zarr).delete()
+
+
+def _parent(path: str) -> str:
+    return path.rpartition('/')[0]
+
+
+def _name(path: str) -> str:
+    return path.rpartition('/')[2]
+
+
+def _entries(zarr: ZarrArchive, objects: Iterable[ObjectTypeDef]) -> list[ZarrArchiveEntry]:
+    base_path = zarr.s3_path('')
+    return [
+        ZarrArchiveEntry(
+            zarr=zarr,
+            key=(key := obj['Key'].removeprefix(base_path)),
+            directory=_parent(key),
+            size=obj['Size'],
+            etag=obj['ETag'].strip('"'),
+            last_modified=obj['LastModified'],
+        )
+        for obj in objects
+    ]
+
+
+def _save_entries(zarr: ZarrArchive, objects: Iterable[ObjectTypeDef]) -> list[ZarrArchiveEntry]:
+    return ZarrArchiveEntry.objects.bulk_create(
+        _entries(zarr, objects),
+        update_conflicts=True,
+        unique_fields=['zarr', 'key'],
+        update_fields=['directory', 'size', 'etag', 'last_modified'],
+    )
+
+
+def _iter_objects(client: S3Client, bucket: str, prefix: str) -> Iterator[ObjectTypeDef]:
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        yield from page.get('Contents', [])
+
+
+def _list_page(
+    client: S3Client, bucket: str, prefix: str, after: str | None, end: str | None
+) -> tuple[list[ObjectTypeDef], str | None]:
+    """
+    List a page of the objects after one key, up to and including another.
+
+    Return the objects, and the key of the last one if there may be more in the range.
+    """
+    kwargs = {'Bucket': bucket, 'Prefix': prefix, 'MaxKeys': LIST_PAGE_SIZE}
+    if after is not None:
+        kwargs['StartAfter'] = after
+    response = client.list_objects_v2(**kwargs)
+    objects = response.get('Contents', [])
+    if end is not None and objects and objects[-1]['Key'] >= end:
+        return [obj for obj in objects if obj['Key'] <= end], None
+    if not response['IsTruncated'] or not objects:
+        return objects, None
+    return objects, objects[-1]['Key']
+
+
+def _split_key_range(
+    prefix: str, objects: list[ObjectTypeDef], after: str, end: str | None
+) -> list[tuple[str | None, str | None]]:
+    """
+    Split the keys after one key, up to and including another, into smaller ranges.
+
+    The keys are split where any character of the last key could be followed by a greater one,
+    using the characters of a page of keys already listed. For example, a flat directory of chunks
+    listed up to "0.0.1999" is split into "0.0.2..." to "0.0.9...", as well as into any arrays
+    after "0". The ranges always cover every key, however the keys are actually distributed.
+    """
+    alphabet = sorted({char for obj in objects for char in obj['Key'].removeprefix(prefix)})
+    boundaries = sorted(
+        {
+            after[:i] + char
+            for i in range(len(prefix), len(after))
+            for char in alphabet
+            if char > after[i]
+        }
+    )
+    if end is not None:
+        boundaries = [boundary for boundary in boundaries if boundary < end]
+    return list(pairwise([after, *boundaries, end]))
+
+
+def _list_zarr_objects(zarr: ZarrArchive, *, workers: int) -> Iterator[ObjectTypeDef]:
+    bucket = zarr.storage.bucket_name
+    prefix = zarr.s3_path('')
+    if workers <= 1:
+        yield from _iter_objects(zarr.storage.s3_client, bucket, prefix)
+        return
+
+    # Each range of keys is listed a page at a time. Once a page shows that a range has more keys
+    # than fit in a page, what's left of it is split into smaller ranges, which are listed in
+    # parallel. Every key is in exactly one range, so the order of the listings doesn't matter.
+    client = zarr.storage.create_shared_s3_client(max_pool_connections=workers)
+    list_page = partial(_list_page, client, bucket, prefix)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(list_page, None, None): (None, 0)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                end, depth = pending.pop(future)
+                objects, last_key = future.result()
+                yield from objects
+                if last_key is None:
+                    continue
+
+                if depth < MAX_SPLIT_DEPTH:
+                    key_ranges = _split_key_range(prefix, objects, last_key, end)
+                    depth += 1
+                else:
+                    key_ranges = [(last_key, end)]
+                for after, range_end in key_ranges:
+                    pending[executor.submit(list_page, after, range_end)] = (range_end, depth)
+
+
+def should_index_zarr(file_count: int) -> bool:
+    """Return whether a zarr archive with some number of files is small enough to be indexed."""
+    return file_count <= settings.DANDI_ZARR_INDEX_MAX_FILES
+
+
+def index_zarr_files(zarr: ZarrArchive, *, workers: int = 1) -> Iterator[ZarrArchiveFile]:
+    """
+    Yield the files of a zarr archive for its checksum, adding each one to its index.
+
+    With more than one worker, the directories of the archive are listed in parallel threads. The
+    files are then yielded in no particular order, which doesn't affect the checksum. If the
+    archive turns out to be too large to be indexed, its index is dropped, and the rest of its
+    files are only yielded.
+    """
+    file_count = 0
+    for objects in chunked(_list_zarr_objects(zarr, workers=workers), INDEX_BATCH_SIZE):
+        indexing = should_index_zarr(file_count)
+        file_count += len(objects)
+        if should_index_zarr(file_count):
+            batch = _save_entries(zarr, objects)
+        else:
+            if indexing:
+                clear_zarr_index(zarr)
+            batch = _entries(zarr, objects)
+        for entry in batch:
+            yield ZarrArchiveFile(path=Path(entry.key), size=entry.size, digest=entry.etag)
+
+
+def _process_tree(tree: ZarrChecksumTree) -> Iterator[tuple[str, ZarrDirectoryDigest]]:
+    # The same as ZarrChecksumTree.process, except that the digest of every directory is yielded,
+    # ending with the root, whose path is empty
+    node = ZarrChecksumNode(path=Path(), checksums=ZarrChecksumManifest())
+    while not tree.empty:
+        node = tree.pop_deepest()
+        if node.path in (Path(), Path('/')):
+            break
+
+        directory_digest = node.checksums.generate_digest()
+        tree.add_node(path=node.path, size=directory_digest.size, digest=directory_digest.digest)
+        yield str(node.path), directory_digest
+
+    yield '', node.checksums.generate_digest()
+
+
+def index_zarr_archive(zarr: ZarrArchive, *, workers: int = 1) -> ZarrDirectoryDigest:
+    """Index every object and directory of a zarr archive, returning its checksum."""
+    tree = ZarrChecksumTree()
+    file_count = 0
+    for file in index_zarr_files(zarr, workers=workers):
+        tree.add_leaf(path=file.path, size=file.size, digest=file.digest)
+        file_count += 1
+
+    indexing = should_index_zarr(file_count)
+    for batch in chunked(_process_tree(tree), INDEX_BATCH_SIZE):
+        if not indexing:
+            continue
+        ZarrArchiveDirectory.objects.bulk_create(
+            ZarrArchiveDirectory(
+                zarr=zarr, path=path, parent=_parent(path), digest=digest.digest, size=digest.size
+            )
+            for path, digest in batch
+            if path
+        )
+    # The root is always last
+    _, checksum = batch[-1]
+    return checksum
+
+
+def _changed_paths(zarr: ZarrArchive, since: datetime) -> set[str]:
+    # Objects can be uploaded for as long as the presigned URLs handed out for them are valid, so
+    # any upload requested that long before the index was built may have happened after it. The
+    # URLs are presigned after their upload is recorded, so they expire a little later than that.
+    since -= timedelta(seconds=zarr.storage.querystring_expire) + UPLOAD_RECORD_MARGIN
+    records = AuditRecord.objects.filter(
+        timestamp__gte=since,
+        record_type__in=['upload_zarr_chunks', 'delete_zarr_chunks'],
+        details__zarr_id=str(zarr.zarr_id),
+    ).values_list('details__paths', flat=True)
+    return {path for paths in records for path in paths}
+
+
+def _stat_object(client: S3Client, bucket: str, key: str) -> ObjectTypeDef | None:
+    # Listing, rather than a HEAD request, gives the same modification time as a full listing
+    listing = client.list_objects_v2(Bucket=bucket, Prefix=key, MaxKeys=1)
+    objects = [obj for obj in listing.get('Contents', []) if obj['Key'] == key]
+    return objects[0] if objects else None
+
+
+def _checksum_directory(zarr: ZarrArchive, path: str) -> ZarrDirectoryDigest:
+    manifest = ZarrChecksumManifest(
+        files=[
+            ZarrChecksum(digest=etag, name=_name(key), size=size)
+            for key, etag, size in zarr.entries.filter(directory=path).values_list(
+                'key', 'etag', 'size'
+            )
+        ],
+        directories=[
+            ZarrChecksum(digest=digest, name=_name(directory_path), size=size)
+            for directory_path, digest, size in zarr.directories.filter(parent=path).values_list(
+                'path', 'digest', 'size'
+            )
+        ],
+    )
+    directory_digest = manifest.generate_digest()
+    if not path:
+        return directory_digest
+
+    if manifest.is_empty:
+        zarr.directories.filter(path=path).delete()
+    else:
+        ZarrArchiveDirectory.objects.update_or_create(
+            zarr=zarr,
+            path=path,
+            defaults={
+                'parent': _parent(path),
+                'digest': directory_digest.digest,
+                'size': directory_digest.size,
+            },
+        )
+    return directory_digest
+
+
+def update_zarr_index(
+    zarr: ZarrArchive, *, since: datetime, workers: int = 1
+) -> ZarrDirectoryDigest:
+    """
+    Update the index of a zarr archive for the paths changed since it was built.
+
+    Only the changed paths are checked in S3, and only the directories containing them are
+    checksummed again. Return the checksum of the archive.
+    """
+    paths = sorted(_changed_paths(zarr, since))
+    keys = [zarr.s3_path(path) for path in paths]
+    client = zarr.storage.create_shared_s3_client(max_pool_connections=workers)
+    stat = partial(_stat_object, client, zarr.storage.bucket_name)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        objects = list(executor.map(stat, keys))
+
+    for batch in chunked((obj for obj in objects if obj is not None), INDEX_BATCH_SIZE):
+        _save_entries(zarr, batch)
+    deleted = [path for path, obj in zip(paths, objects, strict=True) if obj is None]
+    for batch in chunked(deleted, INDEX_BATCH_SIZE):
+        zarr.entries.filter(key__in=batch).delete()
+
+    # Checksum every directory containing a changed path, deepest first, so that the
+    # subdirectories of each one are up to date by the time it's checksummed
+    directories = {''}
+    for path in paths:
+        while path := _parent(path):
+            directories.add(path)
+    for path in sorted(directories, key=lambda path: path.count('/') + bool(path), reverse=True):
+        checksum = _checksum_directory(zarr, path)
+    return checksum
+
+
+def is_zarr_indexed(zarr: ZarrArchive) -> bool:
+    """Return whether the index of a zarr archive matches its objects in S3."""
+    return zarr.status == ZarrArchiveStatus.COMPLETE and zarr.indexed is not None
+
+
+def list_zarr_entries(
+    zarr: ZarrArchive, *, prefix: str, after: str, limit: int
+) -> tuple[list[dict], bool]:
+    """
+    List the objects of an indexed zarr archive, as S3 would.
+
+    Keys are relative to the root of the archive. Return up to `limit` objects whose key starts
+    with `prefix` and comes after `after`, and whether there are any more.
+    """
+    entries = list(
+        zarr.entries.filter(key__startswith=prefix, key__gt=after)
+        .order_by('key')
+        .values_list('key', 'last_modified', 'etag', 'size')[: limit + 1]
+    )
+    results = [
+        {'Key': key, 'LastModified': last_modified, 'ETag': etag, 'Size': size}
+        for key, last_modified, etag, size in entries[:limit]
+    ]
+    return results, bool(results) and len(entries) > limit
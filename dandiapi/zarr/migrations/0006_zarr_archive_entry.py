@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:01
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('zarr', '0005_remove_zarrarchive_embargoed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZarrArchiveEntry',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('key', models.TextField(db_collation='C')),
+                ('size', models.BigIntegerField()),
+                ('etag', models.CharField(max_length=128)),
+                ('last_modified', models.DateTimeField()),
+                (
+                    'zarr',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='entries',
+                        to='zarr.zarrarchive',
+                    ),
+                ),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('zarr', 'key'), name='unique-zarr-archive-entry-key'
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:08
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('zarr', '0006_zarr_archive_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZarrArchiveDirectory',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                ('path', models.TextField(db_collation='C')),
+                ('parent', models.TextField(blank=True, db_collation='C')),
+                ('digest', models.CharField(max_length=512)),
+                ('size', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='zarrarchive',
+            name='indexed',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='zarrarchiveentry',
+            name='directory',
+            field=models.TextField(blank=True, db_collation='C'),
+        ),
+        migrations.RunSQL(
+            "UPDATE zarr_zarrarchiveentry SET directory = regexp_replace(key, '/?[^/]*$', '')",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='zarrarchiveentry',
+            index=models.Index(fields=['zarr', 'directory'], name='zarr_zarrar_zarr_id_283f5b_idx'),
+        ),
+        migrations.AddField(
+            model_name='zarrarchivedirectory',
+            name='zarr',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='directories',
+                to='zarr.zarrarchive',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='zarrarchivedirectory',
+            index=models.Index(fields=['zarr', 'parent'], name='zarr_zarrar_zarr_id_83846a_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='zarrarchivedirectory',
+            constraint=models.UniqueConstraint(
+                fields=('zarr', 'path'), name='unique-zarr-archive-directory-path'
+            ),
+        ),
+    ]
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import logging
 from typing import TYPE_CHECKING
-from urllib.parse import urlparse, urlunparse
 from uuid import uuid4
 
 from django.conf import settings
@@ -70,6 +69,9 @@ class ZarrArchive(TimeStampedModel):
         choices=ZarrArchiveStatus,
         default=ZarrArchiveStatus.PENDING,
     )
+    # When the last ingestion started listing the archive, if its entries and directories are
+    # still those which it recorded
+    indexed = models.DateTimeField(null=True, blank=True, default=None)
 
     @property
     def embargoed(self):
@@ -81,10 +83,7 @@ class ZarrArchive(TimeStampedModel):
 
     @property
     def s3_url(self):
-        signed_url = self.storage.url(self.s3_path(''))
-        # Strip off the query parameters from the presigning, as they are different every time
-        parsed = urlparse(signed_url)
-        return urlunparse((parsed[0], parsed[1], parsed[2], '', '', ''))
+        return self.storage.unsigned_url(self.s3_path(''))
 
     def s3_path(self, zarr_path: str) -> str:
         """Generate a full S3 object path from a path in this zarr_archive."""
@@ -96,13 +95,62 @@ class ZarrArchive(TimeStampedModel):
         self.file_count = 0
         self.size = 0
 
-    def delete_files(self, paths: list[str]):
-        for path in paths:
-            if not self.storage.exists(self.s3_path(path)):
-                raise ValidationError(f'File {self.s3_path(path)} does not exist.')
-        for path in paths:
-            self.storage.delete(self.s3_path(path))
+    def check_files_exist(self, paths: list[str]) -> None:
+        """Raise a `ValidationError` unless all of some files exist."""
+        existing = self.storage.existing_names(self.s3_path(path) for path in paths)
+        missing = [self.s3_path(path) for path in paths if self.s3_path(path) not in existing]
+        if missing:
+            raise ValidationError([f'File {key} does not exist.' for key in missing])
+
+    def delete_files(self, paths: list[str]) -> dict[str, str]:
+        """Delete some files, returning the error for each path which couldn't be deleted."""
+        errors = self.storage.delete_objects(self.s3_path(path) for path in paths)
 
         # Files deleted, mark pending
         self.mark_pending()
         self.save()
+        return {path: errors[self.s3_path(path)] for path in paths if self.s3_path(path) in errors}
+
+
+class ZarrArchiveEntry(models.Model):
+    """An object of a zarr archive in S3, as of its last ingestion."""
+
+    zarr = models.ForeignKey(ZarrArchive, related_name='entries', on_delete=models.CASCADE)
+    # The path of the object within the zarr, compared bytewise like S3 compares keys
+    key = models.TextField(db_collation='C')
+    # The path of the directory containing the object, which is empty for the root of the zarr
+    directory = models.TextField(db_collation='C', blank=True)
+    size = models.BigIntegerField()
+    etag = models.CharField(max_length=128)
+    last_modified = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['zarr', 'key'], name='unique-zarr-archive-entry-key')
+        ]
+        indexes = [models.Index(fields=['zarr', 'directory'])]
+
+    def __str__(self) -> str:
+        return f'{self.zarr_id}: {self.key}'
+
+
+class ZarrArchiveDirectory(models.Model):
+    """The checksum of a directory within a zarr archive, as of its last ingestion."""
+
+    zarr = models.ForeignKey(ZarrArchive, related_name='directories', on_delete=models.CASCADE)
+    path = models.TextField(db_collation='C')
+    # The path of the directory containing this one, which is empty for the root of the zarr
+    parent = models.TextField(db_collation='C', blank=True)
+    digest = models.CharField(max_length=512)
+    size = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['zarr', 'path'], name='unique-zarr-archive-directory-path'
+            )
+        ]
+        indexes = [models.Index(fields=['zarr', 'parent'])]
+
+    def __str__(self) -> str:
+        return f'{self.zarr_id}: {self.path}/'
@@ -2,13 +2,20 @@ from __future__ import annotations
 
 from celery import shared_task
 from celery.utils.log import get_task_logger
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
-from zarr_checksum import compute_zarr_checksum
-from zarr_checksum.generators import S3ClientOptions, yield_files_s3
 
 from dandiapi.api.asset_paths import add_zarr_paths, delete_zarr_paths
+from dandiapi.api.assets_summary import invalidate_assets_summaries
+from dandiapi.api.dandiset_listing import touch_dandiset_listings
 from dandiapi.api.models.version import Version
+from dandiapi.zarr.entries import (
+    clear_zarr_index,
+    index_zarr_archive,
+    should_index_zarr,
+    update_zarr_index,
+)
 from dandiapi.zarr.models import ZarrArchive, ZarrArchiveStatus
 
 logger = get_task_logger(__name__)
@@ -23,30 +30,32 @@ def ingest_zarr_archive(zarr_id: str, *, force: bool = False):
             logger.info('Zarrs must be in an UPLOADED state to begin ingestion. Exiting...')
             return
 
-        # Set as ingesting
+        # Set as ingesting. The index is only updated in place if it's complete, and it can't be
+        # relied upon again until this ingestion finishes.
+        indexed = None if force else zarr.indexed
         zarr.status = ZarrArchiveStatus.INGESTING
         zarr.checksum = None
-        zarr.save(update_fields=['status', 'checksum'])
+        zarr.indexed = None
+        zarr.save(update_fields=['status', 'checksum', 'indexed'])
+
+        if indexed is None:
+            clear_zarr_index(zarr)
 
-    # Instantiate updater and add files as they come in.
     # Compute the checksum before starting the transaction to avoid long lived locks.
-    logger.info('Computing checksum for zarr %s...', zarr.zarr_id)
-    checksum = compute_zarr_checksum(
-        yield_files_s3(
-            bucket=zarr.storage.bucket_name,
-            prefix=zarr.s3_path(''),
-            client_options=S3ClientOptions(
-                region_name=zarr.storage.region_name,
-                use_ssl=zarr.storage.use_ssl,
-                verify=zarr.storage.verify,
-                endpoint_url=zarr.storage.endpoint_url,
-                aws_access_key_id=zarr.storage.access_key,
-                aws_secret_access_key=zarr.storage.secret_key,
-                aws_session_token=zarr.storage.security_token,
-                config=zarr.storage.client_config,
-            ),
-        )
-    )
+    started = timezone.now()
+    workers = settings.DANDI_ZARR_INGEST_WORKERS
+    if indexed is None:
+        logger.info('Computing checksum for zarr %s...', zarr.zarr_id)
+        checksum = index_zarr_archive(zarr, workers=workers)
+    else:
+        logger.info('Updating checksum for zarr %s...', zarr.zarr_id)
+        checksum = update_zarr_index(zarr, since=indexed, workers=workers)
+
+    # Archives which have grown too large to be indexed are listed from S3 instead
+    indexable = should_index_zarr(checksum.count)
+    if not indexable:
+        clear_zarr_index(zarr)
+
     # Zarr is in correct state, lock until ingestion finishes
     with transaction.atomic():
         zarr = (
@@ -63,15 +72,19 @@ def ingest_zarr_archive(zarr_id: str, *, force: bool = False):
         zarr.file_count = checksum.count
         zarr.size = checksum.size
         zarr.status = ZarrArchiveStatus.COMPLETE
+        zarr.indexed = started if indexable else None
         zarr.save()
 
         # Add asset paths after ingest is finished
         add_zarr_paths(zarr)
 
         # Set version status back to PENDING, and update modified.
-        Version.objects.filter(id=zarr.dandiset.draft_version.id).update(
-            status=Version.Status.PENDING, modified=timezone.now()
-        )
+        draft_versions = Version.objects.filter(id=zarr.dandiset.draft_version.id)
+        draft_versions.update(status=Version.Status.PENDING, modified=timezone.now())
+        touch_dandiset_listings(draft_versions)
+
+        # The size of the zarr has changed, so its assets contribute different totals
+        invalidate_assets_summaries(draft_versions)
 
 
 def ingest_dandiset_zarrs(dandiset_id: int, **kwargs):
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+from datetime import timedelta
+
 from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
 import pytest
+import requests
+from zarr_checksum import compute_zarr_checksum
 from zarr_checksum.checksum import EMPTY_CHECKSUM
+from zarr_checksum.generators import S3ClientOptions, yield_files_s3
 
-from dandiapi.api.models import AssetPath
+from dandiapi.api.models import AssetPath, AuditRecord
 from dandiapi.api.models.version import Version
+from dandiapi.api.services import audit
 from dandiapi.api.services.asset import add_asset_to_version
 from dandiapi.api.tests.factories import DandisetFactory, DraftVersionFactory, UserFactory
+from dandiapi.zarr import entries
 from dandiapi.zarr.models import ZarrArchive, ZarrArchiveStatus
 from dandiapi.zarr.tasks import ingest_dandiset_zarrs, ingest_zarr_archive
 
@@ -41,6 +50,164 @@ def test_ingest_zarr_archive(zarr_archive_factory, zarr_file_factory):
     assert zarr.status == ZarrArchiveStatus.COMPLETE
 
 
+def _baseline_checksum(zarr: ZarrArchive) -> str:
+    # The checksum computed by a single listing of the whole archive, as before it was indexed
+    return compute_zarr_checksum(
+        yield_files_s3(
+            bucket=zarr.storage.bucket_name,
+            prefix=zarr.s3_path(''),
+            client_options=S3ClientOptions(
+                region_name=zarr.storage.region_name,
+                use_ssl=zarr.storage.use_ssl,
+                verify=zarr.storage.verify,
+                endpoint_url=zarr.storage.endpoint_url,
+                aws_access_key_id=zarr.storage.access_key,
+                aws_secret_access_key=zarr.storage.secret_key,
+                aws_session_token=zarr.storage.security_token,
+                config=zarr.storage.client_config,
+            ),
+        )
+    ).digest
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('workers', [2, 64])
+def test_ingest_zarr_archive_parallel(zarr_archive_factory, zarr_file_factory, mocker, workers):
+    zarr: ZarrArchive = zarr_archive_factory(status=ZarrArchiveStatus.UPLOADED)
+    paths = [
+        '.zattrs',
+        '0/.zarray',
+        # A flat directory of chunks, which can only be split by the names of its chunks
+        *[f'0/0.0.{i}' for i in range(25)],
+        '0/1/0',
+        '1/0/0/0',
+        '1/0/0/1',
+        '1/0/1/0',
+        '1/1/0',
+        '2/a b/c',
+    ]
+    for path in paths:
+        zarr_file_factory(zarr_archive=zarr, path=path)
+
+    # List a few objects at a time, so that the keys are split into ranges as a large archive's are
+    mocker.patch.object(entries, 'LIST_PAGE_SIZE', 3)
+    split_key_range = mocker.spy(entries, '_split_key_range')
+    listed = [obj['Key'] for obj in entries._list_zarr_objects(zarr, workers=workers)]
+    assert sorted(listed) == sorted(zarr.s3_path(path) for path in paths)
+    assert split_key_range.call_count > 1
+
+    # Listing the archive in parallel gives exactly the same result as listing it serially
+    with override_settings(DANDI_ZARR_INGEST_WORKERS=workers):
+        ingest_zarr_archive(str(zarr.zarr_id))
+
+    zarr.refresh_from_db()
+    assert zarr.checksum == _baseline_checksum(zarr)
+    assert zarr.entries.count() == len(paths)
+
+
+def _zarr_index(zarr: ZarrArchive) -> tuple[list, list]:
+    return (
+        list(
+            zarr.entries.order_by('key').values_list(
+                'key', 'directory', 'size', 'etag', 'last_modified'
+            )
+        ),
+        list(zarr.directories.order_by('path').values_list('path', 'parent', 'digest', 'size')),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_zarr_archive_incremental(
+    api_client, zarr_archive_factory, zarr_file_factory, mocker
+):
+    user = UserFactory.create()
+    api_client.force_authenticate(user=user)
+    zarr: ZarrArchive = zarr_archive_factory(
+        dandiset__owners=[user], status=ZarrArchiveStatus.UPLOADED
+    )
+    for path in ['.zattrs', '0/0/0', '0/0/1', '0/1/0', '1/0']:
+        zarr_file_factory(zarr_archive=zarr, path=path)
+    ingest_zarr_archive(str(zarr.zarr_id))
+
+    # Overwrite a chunk, add one in a new directory, and delete the only chunk of another
+    resp = api_client.post(
+        f'/api/zarr/{zarr.zarr_id}/files/',
+        [{'path': path, 'base64md5': 'DMF1ucDxtqgxw5niaXcmYQ=='} for path in ['0/0/0', '0/2/0']],
+    )
+    for url in resp.json():
+        requests.put(url, data=b'a', headers={'Content-MD5': 'DMF1ucDxtqgxw5niaXcmYQ=='}, timeout=5)
+    api_client.delete(f'/api/zarr/{zarr.zarr_id}/files/', [{'path': '1/0'}])
+
+    # Only the changed paths are checked in S3
+    list_zarr_objects = mocker.spy(entries, '_list_zarr_objects')
+    assert api_client.post(f'/api/zarr/{zarr.zarr_id}/finalize/').status_code == 204
+    assert not list_zarr_objects.called
+    zarr.refresh_from_db()
+    assert zarr.file_count == 5
+    incremental = zarr.checksum, _zarr_index(zarr)
+    assert '1' not in [path for path, *_ in incremental[1][1]]
+
+    # The result is exactly the same as ingesting the whole archive again
+    ingest_zarr_archive(str(zarr.zarr_id), force=True)
+    assert list_zarr_objects.called
+    zarr.refresh_from_db()
+    assert (zarr.checksum, _zarr_index(zarr)) == incremental
+
+
+@pytest.mark.django_db
+def test_ingest_zarr_archive_incremental_changed_paths(zarr_archive_factory):
+    zarr: ZarrArchive = zarr_archive_factory()
+    user = UserFactory.create()
+    indexed = timezone.now()
+    expire = timedelta(seconds=zarr.storage.querystring_expire)
+    for path, recorded in [
+        ('late', indexed - expire - timedelta(seconds=10)),
+        ('old', indexed - expire - entries.UPLOAD_RECORD_MARGIN - timedelta(seconds=10)),
+    ]:
+        record = audit.upload_zarr_chunks(
+            dandiset=zarr.dandiset, user=user, zarr_archive=zarr, paths=[path]
+        )
+        AuditRecord.objects.filter(id=record.id).update(timestamp=recorded)
+
+    # The URLs of an upload are presigned after it is recorded, so they may still have been valid
+    assert entries._changed_paths(zarr, indexed) == {'late'}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_ingest_zarr_archive_too_large_to_index(zarr_archive_factory, zarr_file_factory, mocker):
+    zarr: ZarrArchive = zarr_archive_factory(status=ZarrArchiveStatus.UPLOADED)
+    for path in ['.zattrs', '0/0/0', '0/0/1', '0/1/0', '1/0']:
+        zarr_file_factory(zarr_archive=zarr, path=path)
+    ingest_zarr_archive(str(zarr.zarr_id))
+    zarr.refresh_from_db()
+    indexed_checksum = zarr.checksum
+
+    # The index is dropped part of the way through listing the archive
+    mocker.patch.object(entries, 'INDEX_BATCH_SIZE', 2)
+    with override_settings(DANDI_ZARR_INDEX_MAX_FILES=3):
+        ingest_zarr_archive(str(zarr.zarr_id), force=True)
+    zarr.refresh_from_db()
+    assert zarr.checksum == indexed_checksum
+    assert zarr.file_count == 5
+    assert zarr.indexed is None
+    assert _zarr_index(zarr) == ([], [])
+
+    # An indexed archive which grows too large is no longer indexed either
+    with override_settings(DANDI_ZARR_INDEX_MAX_FILES=5):
+        ingest_zarr_archive(str(zarr.zarr_id), force=True)
+    zarr.refresh_from_db()
+    assert zarr.indexed is not None
+    assert zarr.entries.count() == 5
+
+    ZarrArchive.objects.filter(id=zarr.id).update(status=ZarrArchiveStatus.UPLOADED, checksum=None)
+    with override_settings(DANDI_ZARR_INDEX_MAX_FILES=4):
+        ingest_zarr_archive(str(zarr.zarr_id))
+    zarr.refresh_from_db()
+    assert zarr.checksum == indexed_checksum
+    assert zarr.indexed is None
+    assert _zarr_index(zarr) == ([], [])
+
+
 @pytest.mark.django_db(transaction=True)
 def test_ingest_zarr_archive_empty(zarr_archive_factory):
     zarr: ZarrArchive = zarr_archive_factory(status=ZarrArchiveStatus.UPLOADED)
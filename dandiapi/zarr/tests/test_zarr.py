@@ -433,6 +433,56 @@ def test_zarr_rest_delete_missing_file(
     assert zarr_archive.size == zarr_file.size
 
 
+@pytest.mark.django_db
+def test_zarr_rest_delete_files_failed(api_client, zarr_file_factory, mocker):
+    user = UserFactory.create()
+    api_client.force_authenticate(user=user)
+    zarr_archive = ZarrArchiveFactory.create(dandiset__owners=[user])
+    zarr_files = [zarr_file_factory(zarr_archive=zarr_archive) for _ in range(2)]
+    paths = [str(zarr_file.path) for zarr_file in zarr_files]
+
+    mocker.patch.object(
+        ZarrArchive.storage.s3_client,
+        'delete_objects',
+        return_value={
+            'Errors': [
+                {
+                    'Key': zarr_archive.s3_path(paths[1]),
+                    'Code': 'AccessDenied',
+                    'Message': 'Access Denied',
+                }
+            ]
+        },
+    )
+    resp = api_client.delete(
+        f'/api/zarr/{zarr_archive.zarr_id}/files/', [{'path': path} for path in paths]
+    )
+    assert resp.status_code == 502
+    assert resp.json() == {paths[1]: 'Access Denied'}
+    zarr_archive.refresh_from_db()
+    assert zarr_archive.status == ZarrArchiveStatus.PENDING
+
+
+@pytest.mark.django_db
+def test_storage_existing_names(zarr_file_factory, mocker):
+    zarr_archive = ZarrArchiveFactory.create()
+    for path in ['a/0', 'a/1', 'a/3', 'a/b/0', 'a/b/2', 'c']:
+        zarr_file_factory(zarr_archive=zarr_archive, path=path)
+    paths = ['a/0', 'a/2', 'a/3', 'a/b/0', 'a/b/1', 'a/b/2', 'b', 'c', 'd/0']
+
+    # Make the listings short enough that checking the files takes several of them
+    storage = zarr_archive.storage
+    list_objects = storage.s3_client.list_objects_v2
+    mocker.patch.object(
+        storage.s3_client,
+        'list_objects_v2',
+        side_effect=lambda **kwargs: list_objects(**kwargs, MaxKeys=2),
+    )
+    assert storage.existing_names(zarr_archive.s3_path(path) for path in paths) == {
+        zarr_archive.s3_path(path) for path in ['a/0', 'a/3', 'a/b/0', 'a/b/2', 'c']
+    }
+
+
 @pytest.mark.django_db
 def test_zarr_file_list(api_client, zarr_file_factory):
     zarr_archive = ZarrArchiveFactory.create()
@@ -485,6 +535,32 @@ def test_zarr_file_list(api_client, zarr_file_factory):
     assert f'/test-zarr/{zarr_archive.zarr_id}/foo/bar/a.txt?' in resp.headers['Location']
 
 
+@pytest.mark.django_db
+def test_zarr_file_list_indexed(api_client, zarr_file_factory, mocker):
+    zarr_archive = ZarrArchiveFactory.create()
+    for file in ['foo/bar/a.txt', 'foo/bar/b.txt', 'foo/baz.txt', 'foo2.txt', 'bar/a.txt']:
+        zarr_file_factory(zarr_archive=zarr_archive, path=file)
+
+    queries = [{}, {'prefix': 'foo/'}, {'prefix': 'foo', 'after': 'foo/bar/a.txt', 'limit': 2}]
+    url = f'/api/zarr/{zarr_archive.zarr_id}/files/'
+    live = [api_client.get(url, query).json() for query in queries]
+
+    ingest_zarr_archive(zarr_archive.zarr_id, force=True)
+    assert zarr_archive.entries.count() == 5
+
+    # Once ingested, the same listings are served without going to S3
+    list_objects = mocker.spy(ZarrArchive.storage.s3_client, 'list_objects_v2')
+    assert [api_client.get(url, query).json() for query in queries] == live
+    assert not list_objects.called
+    assert live[2]['next'] is not None
+
+    # Until the archive is ingested again, listings go back to S3
+    zarr_archive.refresh_from_db()
+    zarr_archive.delete_files(['foo2.txt'])
+    assert 'foo2.txt' not in [x['Key'] for x in api_client.get(url).json()['results']]
+    assert list_objects.called
+
+
 @pytest.mark.django_db
 def test_zarr_explore_head(api_client):
     zarr_archive = ZarrArchiveFactory.create()
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from datetime import UTC, datetime
+from urllib.parse import parse_qs, urlsplit
+
 import pytest
 import requests
 from zarr_checksum.checksum import EMPTY_CHECKSUM
@@ -7,6 +10,7 @@ from zarr_checksum.checksum import EMPTY_CHECKSUM
 from dandiapi.api.models.dandiset import Dandiset
 from dandiapi.api.tests.factories import UserFactory
 from dandiapi.api.tests.fuzzy import HTTP_URL_RE
+from dandiapi.storage import DandiS3Storage
 from dandiapi.zarr.models import ZarrArchive, ZarrArchiveStatus
 from dandiapi.zarr.tests.factories import ZarrArchiveFactory
 
@@ -117,3 +121,77 @@ def test_zarr_rest_finalize_already_ingested(api_client):
     api_client.post(f'/api/zarr/{zarr_archive.zarr_id}/finalize/')
     resp = api_client.post(f'/api/zarr/{zarr_archive.zarr_id}/finalize/')
     assert resp.status_code == 400
+
+
+@pytest.mark.parametrize('tags', [None, {'embargoed': 'true'}])
+def test_generate_presigned_put_object_urls(mocker, tags):
+    mocker.patch(
+        'botocore.auth.get_current_datetime', return_value=datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC)
+    )
+    objects = [
+        ('test-zarr/abc/0.0', 'DMF1ucDxtqgxw5niaXcmYQ=='),
+        ('test-zarr/abc/a b~c+d=é', '1B2M2Y8AsgTpgAmY7PhCfg=='),
+    ]
+
+    storage = ZarrArchive.storage
+    expected = [
+        storage.generate_presigned_put_object_url(name, content_md5=md5, tags=tags)
+        for name, md5 in objects
+    ]
+
+    # Batch presigning relies on boto3 signing exactly these headers, with these credentials
+    assert parse_qs(urlsplit(expected[0]).query)['X-Amz-SignedHeaders'] == [
+        'content-md5;host' if tags is None else 'content-md5;host;x-amz-tagging'
+    ]
+    assert storage.s3_client._request_signer._credentials is not None
+
+    # Batch presigning must give exactly the URLs boto3 would, while only presigning one URL
+    presign = mocker.spy(storage, 'generate_presigned_put_object_url')
+    assert storage.generate_presigned_put_object_urls(objects, tags=tags) == expected
+    assert presign.call_count == 1
+
+
+class _ClientWithoutSigner:
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        if name == '_request_signer':
+            raise AttributeError(name)
+        return getattr(self._client, name)
+
+
+def test_generate_presigned_put_object_urls_without_credentials(mocker):
+    storage = ZarrArchive.storage
+    mocker.patch.object(
+        DandiS3Storage,
+        's3_client',
+        new_callable=mocker.PropertyMock,
+        return_value=_ClientWithoutSigner(storage.s3_client),
+    )
+    objects = [('test-zarr/abc/0.0', 'DMF1ucDxtqgxw5niaXcmYQ=='), ('test-zarr/abc/0.1', '')]
+
+    # The credentials can't be found, so each object is presigned separately
+    presign = mocker.spy(storage, 'generate_presigned_put_object_url')
+    storage.generate_presigned_put_object_urls(objects)
+    assert [call.args[0] for call in presign.call_args_list] == [name for name, _ in objects]
+
+
+def test_generate_presigned_put_object_urls_unexpected_signed_headers(mocker):
+    storage = ZarrArchive.storage
+    presign = storage.generate_presigned_put_object_url
+
+    def presign_more_headers(name, **kwargs):
+        return presign(name, **kwargs).replace(
+            'X-Amz-SignedHeaders=content-md5%3Bhost', 'X-Amz-SignedHeaders=content-md5%3Bfoo%3Bhost'
+        )
+
+    mocker.patch.object(
+        storage, 'generate_presigned_put_object_url', side_effect=presign_more_headers
+    )
+    objects = [('test-zarr/abc/0.0', 'DMF1ucDxtqgxw5niaXcmYQ=='), ('test-zarr/abc/0.1', '')]
+
+    # The URLs can't be reproduced, so each object is presigned separately
+    assert storage.generate_presigned_put_object_urls(objects) == [
+        presign_more_headers(name, content_md5=md5) for name, md5 in objects
+    ]
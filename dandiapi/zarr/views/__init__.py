@@ -19,6 +19,7 @@ from dandiapi.api.services import audit
 from dandiapi.api.services.exceptions import DandiError
 from dandiapi.api.services.permissions.dandiset import get_visible_dandisets, is_dandiset_owner
 from dandiapi.api.views.pagination import DandiPagination
+from dandiapi.zarr.entries import is_zarr_indexed, list_zarr_entries
 from dandiapi.zarr.models import ZarrArchive, ZarrArchiveStatus
 from dandiapi.zarr.tasks import ingest_zarr_archive
 
@@ -236,28 +237,38 @@ class ZarrViewSet(ReadOnlyModelViewSet):
         if download:
             return HttpResponseRedirect(zarr_archive.storage.url(zarr_archive.s3_path(raw_prefix)))
 
-        # Retrieve file listing
-        listing = zarr_archive.storage.s3_client.list_objects_v2(
-            Bucket=zarr_archive.storage.bucket_name,
-            Prefix=full_prefix,
-            StartAfter=after,
-            MaxKeys=limit,
-        )
+        if is_zarr_indexed(zarr_archive):
+            # Serve the listing from the index, without going to S3
+            results, is_truncated = list_zarr_entries(
+                zarr_archive,
+                prefix=raw_prefix.rstrip('/'),
+                after=raw_after.rstrip('/'),
+                limit=limit,
+            )
+        else:
+            # Retrieve file listing
+            listing = zarr_archive.storage.s3_client.list_objects_v2(
+                Bucket=zarr_archive.storage.bucket_name,
+                Prefix=full_prefix,
+                StartAfter=after,
+                MaxKeys=limit,
+            )
 
-        # Map/filter listing
-        results = [
-            {
-                'Key': obj['Key'].removeprefix(base_path),
-                'LastModified': obj['LastModified'],
-                'ETag': obj['ETag'].strip('"'),
-                'Size': obj['Size'],
-            }
-            for obj in listing.get('Contents', [])
-        ]
+            # Map/filter listing
+            results = [
+                {
+                    'Key': obj['Key'].removeprefix(base_path),
+                    'LastModified': obj['LastModified'],
+                    'ETag': obj['ETag'].strip('"'),
+                    'Size': obj['Size'],
+                }
+                for obj in listing.get('Contents', [])
+            ]
+            is_truncated = listing['IsTruncated']
 
         # Create next listing if necessary
         next_link = None
-        if listing['IsTruncated']:
+        if is_truncated:
             url = self.request.build_absolute_uri()
             next_link = replace_query_param(url, 'after', results[-1]['Key'])
 
@@ -297,18 +308,8 @@ class ZarrViewSet(ReadOnlyModelViewSet):
             serializer.is_valid(raise_exception=True)
             paths = serializer.validated_data
 
-            # Generate presigned urls
+            # Set status back to pending, since with the URLs below the zarr could be changed
             logger.info('Beginning upload to zarr archive %s', zarr_archive.zarr_id)
-            urls = [
-                zarr_archive.storage.generate_presigned_put_object_url(
-                    zarr_archive.s3_path(o['path']),
-                    content_md5=o['base64md5'],
-                    tags={'embargoed': 'true'} if zarr_archive.embargoed else None,
-                )
-                for o in paths
-            ]
-
-            # Set status back to pending, since with these URLs the zarr could have been changed
             zarr_archive.mark_pending()
             zarr_archive.save()
 
@@ -319,6 +320,12 @@ class ZarrViewSet(ReadOnlyModelViewSet):
                 paths=[p['path'] for p in paths],
             )
 
+        # Generate presigned urls, once the archive is no longer locked
+        urls = zarr_archive.storage.generate_presigned_put_object_urls(
+            ((zarr_archive.s3_path(o['path']), o['base64md5']) for o in paths),
+            tags={'embargoed': 'true'} if zarr_archive.embargoed else None,
+        )
+
         # Return presigned urls
         logger.info(
             'Presigned %d URLs to upload to zarr archive %s', len(urls), zarr_archive.zarr_id
@@ -330,25 +337,36 @@ class ZarrViewSet(ReadOnlyModelViewSet):
         responses={
             200: ZarrSerializer(many=True),
             400: ZarrArchive.INGEST_ERROR_MSG,
+            502: 'The error for each path which could not be deleted',
         },
         operation_summary='Delete files from a zarr archive.',
     )
     @files.mapping.delete
     def delete_files(self, request, zarr_id):
         """Delete files from a zarr archive."""
+        zarr_archive: ZarrArchive = get_object_or_404(self.get_queryset(), zarr_id=zarr_id)
+        if zarr_archive.status in [ZarrArchiveStatus.UPLOADED, ZarrArchiveStatus.INGESTING]:
+            return Response(ZarrArchive.INGEST_ERROR_MSG, status=status.HTTP_400_BAD_REQUEST)
+
+        if not is_dandiset_owner(zarr_archive.dandiset, self.request.user):
+            # The user does not have ownership permission
+            raise PermissionDenied
+        serializer = ZarrDeleteFileRequestSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        paths = [file['path'] for file in serializer.validated_data]
+        # Listing the files is the slow part of checking them, so do it before taking the lock
+        zarr_archive.check_files_exist(paths)
+
         queryset = self.get_queryset().select_for_update()
         with transaction.atomic():
-            zarr_archive: ZarrArchive = get_object_or_404(queryset, zarr_id=zarr_id)
+            zarr_archive = get_object_or_404(queryset, zarr_id=zarr_id)
+            # The archive may have been finalized while its files were being checked
             if zarr_archive.status in [ZarrArchiveStatus.UPLOADED, ZarrArchiveStatus.INGESTING]:
                 return Response(ZarrArchive.INGEST_ERROR_MSG, status=status.HTTP_400_BAD_REQUEST)
 
-            if not is_dandiset_owner(zarr_archive.dandiset, self.request.user):
-                # The user does not have ownership permission
-                raise PermissionDenied
-            serializer = ZarrDeleteFileRequestSerializer(data=request.data, many=True)
-            serializer.is_valid(raise_exception=True)
-            paths = [file['path'] for file in serializer.validated_data]
-            zarr_archive.delete_files(paths)
+            # The files are deleted while the lock is held, so that the archive can't be ingested
+            # while some of them are still there
+            errors = zarr_archive.delete_files(paths)
 
             audit.delete_zarr_chunks(
                 dandiset=zarr_archive.dandiset,
@@ -357,4 +375,6 @@ class ZarrViewSet(ReadOnlyModelViewSet):
                 paths=paths,
             )
 
+        if errors:
+            return Response(errors, status=status.HTTP_502_BAD_GATEWAY)
         return Response(None, status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,66 @@
+"""
+Compare the cost of presigned and unsigned S3 URLs.
+
+Asset metadata includes the S3 URL of every asset, which used to be found by presigning the URL
+and then stripping off the signature. This times that against `DandiS3Storage.unsigned_url`, for
+as many object names as there are assets in a large manifest.
+
+No requests are made to S3, so any credentials will do.
+"""
+
+from __future__ import annotations
+
+import time
+from urllib.parse import urlparse, urlunparse
+import uuid
+
+import click
+from django.conf import settings
+
+
+def _presigned_s3_url(storage, name: str) -> str:
+    parsed = urlparse(storage.url(name))
+    return urlunparse((parsed[0], parsed[1], parsed[2], '', '', ''))
+
+
+def _time(label: str, func, names: list[str]) -> float:
+    start = time.perf_counter()
+    for name in names:
+        func(name)
+    elapsed = time.perf_counter() - start
+    click.echo(
+        f'{label}: {elapsed:.2f}s total, {elapsed / len(names) * 1_000_000:.1f}µs per object'
+    )
+    return elapsed
+
+
+@click.command()
+@click.option('--count', default=100_000, show_default=True, help='The number of object names')
+@click.option('--bucket', default='dandiarchive', show_default=True, help='The bucket name')
+@click.option('--region', default='us-east-2', show_default=True, help='The bucket region')
+def cli(*, count: int, bucket: str, region: str):
+    settings.configure()
+    # The storage reads Django settings, so it can only be imported once they are configured
+    from dandiapi.storage import DandiS3Storage
+
+    storage = DandiS3Storage(
+        bucket_name=bucket,
+        region_name=region,
+        access_key='benchmark',
+        secret_key='benchmark',  # noqa: S106
+    )
+    names = [f'blobs/{uuid.uuid4()}' for _ in range(count)]
+
+    presigned = _time('presigned', lambda name: _presigned_s3_url(storage, name), names)
+    unsigned = _time('unsigned', storage.unsigned_url, names)
+    click.echo(f'speedup: {presigned / unsigned:.0f}x')
+
+    mismatches = sum(
+        _presigned_s3_url(storage, name) != storage.unsigned_url(name) for name in names[:1000]
+    )
+    if mismatches:
+        raise click.ClickException(f'{mismatches} of the first 1000 URLs differ')
+
+
+if __name__ == '__main__':
+    cli()